@@ -1,20 +1,109 @@
 # app/crud/reading.py
+import base64
+from datetime import datetime
+from typing import AsyncIterator
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
 from sqlalchemy.orm import Session
 from app.db.models.reading import Reading
 from app.db.schemas.reading import ReadingCreate
+from app.services.cost_cache import readings_changed
+from app.services.net_energy import refresh_net_energy
+from app.services.reading_cache import mark_stale, reading_cache
+from app.services.reading_rollup import refresh_daily_rollup
 
 def create_reading(db: Session, data: ReadingCreate):
     reading = Reading(**data.dict())
     db.add(reading)
+    db.flush()
+    spans = {reading.utility_id: (reading.timestamp, reading.timestamp)}
+    refresh_daily_rollup(db, spans)
+    refresh_net_energy(db, spans)
+    readings_changed(db, spans)
+    mark_stale(db, spans)
     db.commit()
     db.refresh(reading)
     return reading
 
-def get_all_readings(db: Session):
-    return db.query(Reading).order_by(Reading.timestamp).all()
+async def get_all_readings(db: AsyncSession):
+    return (await db.scalars(select(Reading).order_by(Reading.timestamp))).all()
+
+async def get_readings_by_utility(db: AsyncSession, utility_id: int):
+    if reading_cache.enabled:
+        return (await db.run_sync(reading_cache.get, utility_id)).rows(utility_id)
+    return (await db.scalars(
+        select(Reading).where(Reading.utility_id == utility_id).order_by(Reading.timestamp)
+    )).all()
+
+async def get_reading(db: AsyncSession, reading_id: int):
+    return await db.get(Reading, reading_id)
+
+# ---------- keyset listing ----------
+
+def encode_cursor(ts: datetime, reading_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{ts.isoformat()}|{reading_id}".encode()).decode()
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Raises ValueError on anything that is not a cursor we handed out."""
+    try:
+        ts, reading_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(ts), int(reading_id)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+def _readings_select(
+    utility_id: int | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    after: tuple[datetime, int] | None = None,
+):
+    # plain columns, no ORM objects; ordered on (timestamp, id) so the cursor is a strict bound
+    stmt = select(
+        Reading.id, Reading.timestamp, Reading.value, Reading.unit, Reading.source, Reading.utility_id
+    ).order_by(Reading.timestamp, Reading.id)
+    if utility_id is not None:
+        stmt = stmt.where(Reading.utility_id == utility_id)
+    if start is not None:
+        stmt = stmt.where(Reading.timestamp >= start)
+    if end is not None:
+        stmt = stmt.where(Reading.timestamp < end)
+    if after is not None:
+        stmt = stmt.where(tuple_(Reading.timestamp, Reading.id) > tuple_(*after))
+    return stmt
 
-def get_readings_by_utility(db: Session, utility_id: int):
-    return db.query(Reading).filter(Reading.utility_id == utility_id).order_by(Reading.timestamp).all()
+async def get_readings_page(
+    db: AsyncSession,
+    limit: int,
+    utility_id: int | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    cursor: str | None = None,
+) -> tuple[list[dict], str | None]:
+    after = decode_cursor(cursor) if cursor else None
+    if utility_id is not None and reading_cache.enabled:
+        cached = await db.run_sync(reading_cache.get, utility_id)
+        i, j = cached.window(start, end, after)
+        rows = cached.rows(utility_id, i, min(j, i + limit + 1))
+    else:
+        rows = (await db.execute(_readings_select(utility_id, start, end, after).limit(limit + 1))).mappings().all()
+    if len(rows) <= limit:
+        return list(rows), None
+    last = rows[limit - 1]
+    return list(rows[:limit]), encode_cursor(last["timestamp"], last["id"])
 
-def get_reading(db: Session, reading_id: int):
-    return db.query(Reading).filter(Reading.id == reading_id).first()
+async def iter_readings(
+    conn: AsyncConnection,
+    utility_id: int | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    cursor: str | None = None,
+    batch_size: int = 2000,
+) -> AsyncIterator[dict]:
+    """Rows from a server-side cursor, fetched `batch_size` at a time."""
+    after = decode_cursor(cursor) if cursor else None
+    result = await conn.stream(
+        _readings_select(utility_id, start, end, after).execution_options(yield_per=batch_size)
+    )
+    async for row in result.mappings():
+        yield row
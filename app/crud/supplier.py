@@ -1,27 +1,10 @@
 # hive_api/app/db/uicomponent.py
-from contextlib import contextmanager
 from typing import List
 
-from app.db.database import SessionLocal
+from app.db.database import session_scope
 from app.db.models.supplier import Supplier as SupplierModel
 from app.db.schemas.supplier import SupplierCreate
 
-@contextmanager
-def session_scope():
-    """
-    Provide a transactional scope around a series of operations.
-    """
-    session = SessionLocal()
-    try:
-        yield session
-        session.commit()
-    except Exception:
-        session.rollback()
-        raise
-    finally:
-        session.close()
-
-
 # ---------- Public helpers ----------
 
 def get_all_suppliers() -> List[dict]:
@@ -1,27 +1,10 @@
 # hive_api/app/db/uicomponent.py
-from contextlib import contextmanager
 from typing import List
 
-from app.db.database import SessionLocal
+from app.db.database import session_scope
 from app.db.models.uicomponent import UIComponent as UIModel
 from app.db.schemas import UIComponentCreate
 
-@contextmanager
-def session_scope():
-    """
-    Provide a transactional scope around a series of operations.
-    """
-    session = SessionLocal()
-    try:
-        yield session
-        session.commit()
-    except Exception:
-        session.rollback()
-        raise
-    finally:
-        session.close()
-
-
 # ---------- Public helpers ----------
 
 def get_all_uicomponents() -> List[dict]:
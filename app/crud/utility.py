@@ -3,6 +3,8 @@ from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 from app.db.models.utility import Utility
 from app.db.schemas.utility import UtilityCreate, UtilityUpdate
+from app.services.cost_cache import cost_cache
+from app.services.net_energy import refresh_utility_net_energy
 
 def create_utility(db: Session, data: UtilityCreate) -> Utility:
     u = Utility(**data.model_dump())
@@ -19,11 +21,19 @@ def update_utility(db: Session, utility_id: int, data: UtilityUpdate) -> Utility
     if not u:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Utility not found")
 
+    old_contract_id, old_type = u.contract_id, u.type
     payload = data.model_dump(exclude_unset=True)
     for field, value in payload.items():
         setattr(u, field, value)
 
     db.add(u)
+    if (u.contract_id, u.type) != (old_contract_id, old_type):
+        # the stored daily balance sums utilities by type and contract
+        db.flush()
+        refresh_utility_net_energy(db, u.id, old_type)
     db.commit()
     db.refresh(u)
+    # type / contract feed the contract-wide usage of cached costs
+    cost_cache.invalidate_scope(u.id, old_contract_id)
+    cost_cache.invalidate_scope(contract_id=u.contract_id)
     return u
@@ -0,0 +1,110 @@
+# app/db/baseline_schema.py
+"""
+The schema the app had before it used migrations (what Base.metadata.create_all made of
+its models then), frozen as plain tables for the 0001_baseline migration.
+
+Do not edit: later schema changes are migrations of their own, so a fresh database runs
+the same steps as an upgraded one.
+"""
+from sqlalchemy import (
+    DECIMAL, Boolean, CheckConstraint, Column, Date, DateTime, Enum, ForeignKey, Index,
+    Integer, MetaData, Numeric, String, Table, Text, UniqueConstraint,
+)
+
+metadata = MetaData()
+
+Table(
+    "solar_readings", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("production_date", Date, nullable=False),
+    Column("panel_serial_nbr", String, nullable=False),
+    Column("energy_produced", DECIMAL(scale=3), nullable=False),
+    Column("unit", String, nullable=False),
+    Index("ix_solar_readings_id", "id"),
+    Index("ix_solar_readings_panel_serial_nbr", "panel_serial_nbr"),
+)
+
+Table(
+    "suppliers", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", String(100)),
+    Column("address", String(100)),
+    Column("client_number", String(10)),
+    Column("monthly_payment", Numeric(5, 2)),
+    Index("ix_suppliers_id", "id"),
+)
+
+Table(
+    "ui_components", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("is_visible", Boolean),
+    UniqueConstraint("name"),
+    Index("ix_ui_components_id", "id"),
+)
+
+Table(
+    "users", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("username", String, nullable=False),
+    Column("hashed_password", String, nullable=False),
+    Index("ix_users_id", "id"),
+    Index("ix_users_username", "username", unique=True),
+)
+
+Table(
+    "contract", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", String(255)),
+    Column("description", String(255)),
+    Column("start_date", Date),
+    Column("end_date", Date),
+    Column("monthly_payment", Numeric(5, 2)),
+    Column("settlement_pdf", Text),
+    Column("contract_pdf", Text),
+    Column("supplier_id", Integer, ForeignKey("suppliers.id")),
+    Index("ix_contract_id", "id"),
+)
+
+Table(
+    "utilities", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("type", String(20)),
+    Column("text", String(255)),
+    Column("description", String(255)),
+    Column("start_reading", Numeric(10, 3)),
+    Column("end_reading", Numeric(10, 3)),
+    Column("start_reading_reduced", Numeric(10, 3)),
+    Column("end_reading_reduced", Numeric(10, 3)),
+    Column("estimated_use", Numeric(10, 3)),
+    Column("contract_id", Integer, ForeignKey("contract.id")),
+)
+
+Table(
+    "readings", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("timestamp", DateTime, nullable=False),
+    Column("value", Numeric(10, 3), nullable=False),
+    Column("unit", String(10)),
+    Column("source", String(50)),
+    Column("utility_id", Integer, ForeignKey("utilities.id"), nullable=False),
+)
+
+Table(
+    "tariffs", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("description", String(100), nullable=False),
+    Column("amount", Numeric(12, 4), nullable=False),
+    Column("tariff_sort", Enum(
+        "PERCENTAGE", "SINGLE", "NORMAL", "REDUCED", "FIXED", "VARIABLE", "TAX", "NETWORK",
+        name="tariff_sort_enum",
+    ), nullable=False),
+    Column("frequency", Enum("DAY", "KWH", "M3", "MONTH", "YEAR", name="tariff_freq_enum"), nullable=False),
+    Column("start_date", Date),
+    Column("end_date", Date),
+    Column("is_active", Boolean, nullable=False),
+    Column("contract_id", Integer, ForeignKey("contract.id")),
+    Column("utility_id", Integer, ForeignKey("utilities.id")),
+    CheckConstraint("(contract_id IS NOT NULL) <> (utility_id IS NOT NULL)", name="ck_tariff_exactly_one_scope"),
+    Index("ix_tariffs_id", "id"),
+)
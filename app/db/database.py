@@ -1,10 +1,14 @@
 # app/db/database.py
 
 import os
+from contextlib import contextmanager
 from dotenv import load_dotenv
 from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base, Session
 
+from app.db.pool import MeteredAsyncQueuePool, MeteredQueuePool
+
 # Load environment variables from .env file
 # load_dotenv()
 # Load environment variables from a known path
@@ -25,13 +29,46 @@ if not all(required):
 SQLALCHEMY_DATABASE_URL = (
     f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 )
+ASYNC_DATABASE_URL = (
+    f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+)
+
+# Pool settings (per engine, per process)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))           # seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))           # seconds; -1 keeps connections forever
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))  # 0 = no limit
+
+_pool_kwargs = dict(
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+)
 
 # Create the engine
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    poolclass=MeteredQueuePool,
+    connect_args={"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"} if DB_STATEMENT_TIMEOUT_MS else {},
+    **_pool_kwargs,
+)
 
 # Create a session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for the read-heavy routes; they wait on Postgres without holding a threadpool thread
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    poolclass=MeteredAsyncQueuePool,
+    connect_args={"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}} if DB_STATEMENT_TIMEOUT_MS else {},
+    **_pool_kwargs,
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # Declarative base class
 Base = declarative_base()
 
@@ -43,6 +80,25 @@ def get_db():
     finally:
         db.close()
 
+@contextmanager
+def session_scope():
+    """
+    Provide a transactional scope around a series of operations.
+    """
+    session = SessionLocal()
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 # Optional: Connection test at startup
 if __name__ == "__main__":
     with engine.connect() as conn:
@@ -0,0 +1,112 @@
+# app/db/migrations.py
+"""
+Ordered, run-once schema migrations.
+
+Each migration is a function of a Connection registered with @migration("NNNN_name").
+run_migrations() applies the ones not yet listed in `schema_migrations`, in order,
+in one transaction guarded by an advisory lock so parallel workers do not race.
+"""
+from typing import Callable
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from app.db import baseline_schema
+from app.db.models.energy_net_daily import EnergyNetDaily
+from app.db.models.import_ledger import ImportLedger
+from app.db.models.reading_daily import ReadingDaily
+from app.db.models.solar import SolarPanelAnomaly, SolarPanelMonthly
+
+MIGRATIONS: list[tuple[str, Callable[[Connection], None]]] = []
+
+_LOCK_KEY = 0x6574726B  # arbitrary, shared by every app process
+
+def migration(version: str):
+    def register(fn: Callable[[Connection], None]):
+        MIGRATIONS.append((version, fn))
+        return fn
+    return register
+
+# ---------- migrations ----------
+
+@migration("0001_baseline")
+def _baseline(conn: Connection) -> None:
+    # what lifespan used to do, with the models as they were then; skips existing tables
+    baseline_schema.metadata.create_all(bind=conn)
+
+@migration("0002_readings_utility_timestamp_unique")
+def _readings_utility_timestamp_unique(conn: Connection) -> None:
+    # the old importer could insert the same (utility, timestamp) twice; keep the newest row
+    conn.execute(text("""
+        DELETE FROM readings a
+        USING readings b
+        WHERE a.utility_id = b.utility_id
+          AND a.timestamp = b.timestamp
+          AND a.id < b.id
+    """))
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_readings_utility_timestamp ON readings (utility_id, timestamp)"
+    ))
+    # rebuilt from the de-duplicated readings by ensure_daily_rollup on startup
+    ReadingDaily.__table__.create(conn, checkfirst=True)
+    conn.execute(text("DELETE FROM reading_daily"))
+
+@migration("0003_solar_panel_day_unique_and_import_ledger")
+def _solar_panel_day_unique(conn: Connection) -> None:
+    # re-uploads used to duplicate every panel row; keep the newest one per panel and day
+    conn.execute(text("""
+        DELETE FROM solar_readings a
+        USING solar_readings b
+        WHERE a.production_date = b.production_date
+          AND a.panel_serial_nbr = b.panel_serial_nbr
+          AND a.id < b.id
+    """))
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_solar_readings_date_panel ON solar_readings (production_date, panel_serial_nbr)"
+    ))
+    ImportLedger.__table__.create(conn, checkfirst=True)
+
+@migration("0004_solar_panel_date_index_and_monthly_rollup")
+def _solar_panel_monthly(conn: Connection) -> None:
+    # (panel, date) serves per-panel ranges and covers the old panel-only index
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_solar_readings_panel_date ON solar_readings (panel_serial_nbr, production_date)"
+    ))
+    conn.execute(text("DROP INDEX IF EXISTS ix_solar_readings_panel_serial_nbr"))
+    # filled by ensure_panel_monthly on startup
+    SolarPanelMonthly.__table__.create(conn, checkfirst=True)
+
+@migration("0005_solar_panel_anomalies")
+def _solar_panel_anomalies(conn: Connection) -> None:
+    SolarPanelAnomaly.__table__.create(conn, checkfirst=True)
+
+@migration("0006_energy_net_daily")
+def _energy_net_daily(conn: Connection) -> None:
+    # filled by ensure_net_energy on startup
+    EnergyNetDaily.__table__.create(conn, checkfirst=True)
+
+@migration("0007_energy_net_daily_per_contract")
+def _energy_net_daily_per_contract(conn: Connection) -> None:
+    # derived data keyed by day only; refilled per contract by ensure_net_energy on startup
+    conn.execute(text("DROP TABLE IF EXISTS energy_net_daily"))
+    EnergyNetDaily.__table__.create(conn)
+
+# ---------- runner ----------
+
+def run_migrations(engine: Engine) -> None:
+    with engine.begin() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _LOCK_KEY})
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version VARCHAR(100) PRIMARY KEY,
+                applied_at TIMESTAMP NOT NULL DEFAULT now()
+            )
+        """))
+        applied = set(conn.execute(text("SELECT version FROM schema_migrations")).scalars())
+
+        for version, fn in MIGRATIONS:
+            if version in applied:
+                continue
+            fn(conn)
+            conn.execute(text("INSERT INTO schema_migrations (version) VALUES (:version)"), {"version": version})
+            print(f"✅ Applied migration {version}")
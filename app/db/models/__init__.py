@@ -6,3 +6,6 @@ from .reading import Reading
 from .supplier import Supplier
 from .contract import Contract
 from .utility import Utility
+from .reading_daily import ReadingDaily
+from .import_ledger import ImportLedger
+from .energy_net_daily import EnergyNetDaily
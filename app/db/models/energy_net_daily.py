@@ -0,0 +1,12 @@
+# app/db/models/energy_net_daily.py
+from sqlalchemy import Column, Date, Integer, Numeric
+from app.db.database import Base
+
+class EnergyNetDaily(Base):
+    """Electricity balance inputs per contract and day, kept current by the write paths (kWh)."""
+    __tablename__ = "energy_net_daily"
+
+    contract_id = Column(Integer, primary_key=True)  # contract of the utilities summed
+    day = Column(Date, primary_key=True)
+    net_import = Column(Numeric(12, 3), nullable=False)  # NORMAL + REDUCED stand deltas
+    production = Column(Numeric(12, 3), nullable=False)  # SOLAR daily totals
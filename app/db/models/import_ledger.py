@@ -0,0 +1,18 @@
+# app/db/models/import_ledger.py
+from sqlalchemy import Column, Integer, DateTime, String, UniqueConstraint, func
+from app.db.database import Base
+
+class ImportLedger(Base):
+    """Content hashes of imported files and chunks; a hash listed here is skipped on re-import."""
+    __tablename__ = "import_ledger"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(50), nullable=False)    # "meter-readings" | "solar-readings"
+    scope = Column(String(10), nullable=False)   # "file" | "chunk"
+    digest = Column(String(64), nullable=False)  # sha256 hex
+    rows = Column(Integer, nullable=False)
+    imported_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("kind", "scope", "digest", name="ux_import_ledger_kind_scope_digest"),
+    )
@@ -1,5 +1,5 @@
 # app/db/models/reading.py
-from sqlalchemy import Column, Integer, DateTime, Numeric, String, ForeignKey
+from sqlalchemy import Column, Integer, DateTime, Numeric, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.db.database import Base
 
@@ -15,6 +15,11 @@ class Reading(Base):
     utility_id = Column(Integer, ForeignKey("utilities.id"), nullable=False)
     utility = relationship("Utility", back_populates="readings")
 
+    # one stand per utility per moment; also serves every "latest reading before ts" probe
+    __table_args__ = (
+        Index("ux_readings_utility_timestamp", "utility_id", "timestamp", unique=True),
+    )
+
 
 # app/db/models/utility.py (extend your Utility model)
 readings = relationship("Reading", back_populates="utility", cascade="all, delete-orphan")
@@ -0,0 +1,18 @@
+# app/db/models/reading_daily.py
+from sqlalchemy import Column, Integer, DateTime, Date, Numeric, String, ForeignKey
+from app.db.database import Base
+
+class ReadingDaily(Base):
+    """Per utility, per unit, per day rollup of `readings`, kept current by the write paths."""
+    __tablename__ = "reading_daily"
+
+    utility_id = Column(Integer, ForeignKey("utilities.id", ondelete="CASCADE"), primary_key=True)
+    unit = Column(String(10), primary_key=True)  # lower-cased readings.unit ('' when NULL)
+    day = Column(Date, primary_key=True)
+
+    first_ts = Column(DateTime, nullable=False)
+    first_value = Column(Numeric(10, 3), nullable=False)
+    last_ts = Column(DateTime, nullable=False)
+    last_value = Column(Numeric(10, 3), nullable=False)
+    delta = Column(Numeric(10, 3), nullable=False)  # last_value - first_value within the day
+    reading_count = Column(Integer, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, DECIMAL, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, DECIMAL, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.db.database import Base
 
@@ -7,6 +7,33 @@ class SolarReading(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     production_date = Column(Date, nullable=False)
-    panel_serial_nbr = Column(String, nullable=False, index=True)
+    panel_serial_nbr = Column(String, nullable=False)
     energy_produced = Column(DECIMAL(scale=3), nullable=False)
-    unit = Column(String, nullable=False)
\ No newline at end of file
+    unit = Column(String, nullable=False)
+
+    __table_args__ = (
+        # one row per panel per day; re-imports upsert on it
+        Index("ux_solar_readings_date_panel", "production_date", "panel_serial_nbr", unique=True),
+        # per-panel date ranges (daily series, edges of the monthly rollup)
+        Index("ix_solar_readings_panel_date", "panel_serial_nbr", "production_date"),
+    )
+
+class SolarPanelMonthly(Base):
+    """Per panel, per month rollup of `solar_readings`, kept current by the solar importer."""
+    __tablename__ = "solar_panel_monthly"
+
+    panel_serial_nbr = Column(String, primary_key=True)
+    month = Column(Date, primary_key=True)  # first day of the month
+    energy = Column(DECIMAL(scale=3), nullable=False)
+    days = Column(Integer, nullable=False)  # days with a reading
+
+class SolarPanelAnomaly(Base):
+    """A panel-day flagged by app.services.solar_anomalies; only flagged days are stored."""
+    __tablename__ = "solar_panel_anomalies"
+
+    day = Column(Date, primary_key=True)
+    panel_serial_nbr = Column(String, primary_key=True)
+    energy = Column(DECIMAL(scale=3), nullable=False)
+    ratio = Column(Float, nullable=False)        # energy / median of all panels that day
+    z_score = Column(Float, nullable=True)       # ratio against the panel's own trailing window
+    low_days = Column(Integer, nullable=False)   # consecutive low days up to and including this one
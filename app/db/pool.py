@@ -0,0 +1,78 @@
+# app/db/pool.py
+"""
+Queue pools that count checkouts and how long callers waited for a connection,
+so the pool can be sized from /metrics/db-pool instead of guessed.
+"""
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+class PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.saturated = 0       # checkouts that found every connection (incl. overflow) in use
+        self.timeouts = 0        # checkouts that gave up after pool_timeout
+        self.wait_total_s = 0.0
+        self.wait_max_s = 0.0
+
+    def record(self, waited_s: float, saturated: bool, timed_out: bool = False) -> None:
+        with self._lock:
+            self.checkouts += 0 if timed_out else 1
+            self.saturated += 1 if saturated else 0
+            self.timeouts += 1 if timed_out else 0
+            self.wait_total_s += waited_s
+            self.wait_max_s = max(self.wait_max_s, waited_s)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "saturated_checkouts": self.saturated,
+                "timeouts": self.timeouts,
+                "wait_total_ms": round(self.wait_total_s * 1000, 3),
+                "wait_avg_ms": round(self.wait_total_s * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max_s * 1000, 3),
+            }
+
+class _MeteredPool:
+    """Mixin over QueuePool._do_get, the single place a checkout waits for a free connection."""
+
+    def __init__(self, *args, **kw):
+        super().__init__(*args, **kw)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        saturated = self.checkedout() >= self.size() + max(self._max_overflow, 0)
+        t0 = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record(time.perf_counter() - t0, saturated, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - t0, saturated)
+        return conn
+
+    def recreate(self):
+        # keep counting across invalidation / dispose()
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def metrics(self) -> dict:
+        return {
+            "pool_size": self.size(),
+            "max_overflow": self._max_overflow,
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": self.overflow(),
+            **self.stats.snapshot(),
+        }
+
+class MeteredQueuePool(_MeteredPool, QueuePool):
+    pass
+
+class MeteredAsyncQueuePool(_MeteredPool, AsyncAdaptedQueuePool):
+    pass
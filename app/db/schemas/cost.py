@@ -1,8 +1,8 @@
 # app/db/schemas/cost.py
-from datetime import date
-from pydantic import BaseModel
+from datetime import date, datetime
+from pydantic import BaseModel, model_validator
 from decimal import Decimal
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 class TariffSpecItem(BaseModel):
     sort: str
@@ -25,3 +25,77 @@ class CostRead(BaseModel):
     discount: Decimal
     total: Decimal
     specification: List[TariffSpecItem]
+
+def cost_read(cost) -> dict:
+    """CostRead fields of a services.tariff_calculators.Cost."""
+    return {
+        "gas": cost.gas, "stand_i": cost.stand_i, "stand_ii": cost.stand_ii,
+        "single": cost.single, "fixed": cost.fixed, "variable": cost.variable,
+        "tax": cost.tax, "network": cost.network, "discount": cost.discount,
+        "total": cost.total,
+        "specification": cost.tariff_specification,
+    }
+
+class CostPeriod(BaseModel):
+    start: date
+    end: date
+
+class CostBatchRequest(BaseModel):
+    utility_ids: List[int]
+    # either explicit periods, or start/end cut into buckets
+    periods: Optional[List[CostPeriod]] = None
+    start: Optional[date] = None
+    end: Optional[date] = None
+    bucket: Optional[Literal["month", "quarter", "year"]] = None
+    include_contract: bool = True
+
+    @model_validator(mode="after")
+    def check_periods(self):
+        if self.periods is None and (self.start is None or self.end is None or self.bucket is None):
+            raise ValueError("Provide periods, or start, end and bucket")
+        if self.periods is not None and self.bucket is not None:
+            raise ValueError("Provide either periods or a bucket, not both")
+        return self
+
+class CostCell(BaseModel):
+    utility_id: int
+    start: date
+    end: date
+    cost: CostRead
+
+class CostBatchRead(BaseModel):
+    cells: List[CostCell]
+
+class CostTimelinePoint(BaseModel):
+    start: datetime
+    end: datetime
+    usage: Decimal               # meter delta of the utility itself
+    gas: Decimal
+    stand_i: Decimal
+    stand_ii: Decimal
+    single: Decimal
+    fixed: Decimal
+    variable: Decimal
+    tax: Decimal
+    network: Decimal
+    discount: Decimal
+    total: Decimal               # not rounded, so the points add up to the aggregate
+
+class CostTimelineRead(BaseModel):
+    utility_id: int
+    start: date
+    end: date                    # clipped to today
+    resolution: Literal["day", "hour"]
+    unit: str
+    points: List[CostTimelinePoint]
+
+class ContractCostUtility(BaseModel):
+    utility_id: int
+    cost: CostRead               # the utility's own tariffs
+
+class ContractCostRead(BaseModel):
+    contract_id: int
+    start: date
+    end: date
+    utilities: List[ContractCostUtility]
+    combined: CostRead           # all utilities plus the contract tariffs
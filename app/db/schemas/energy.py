@@ -0,0 +1,24 @@
+# app/db/schemas/energy.py
+from datetime import date
+from decimal import Decimal
+from typing import List, Optional
+from pydantic import BaseModel
+
+class EnergyBalance(BaseModel):
+    net_import: Decimal          # electric meter stand deltas
+    production: Decimal          # solar
+    consumption: Decimal         # net_import + production
+    self_consumption: Decimal    # production used on site (netted per day)
+    grid_import: Decimal
+    export: Decimal
+
+class EnergyNetPoint(EnergyBalance):
+    day: date
+
+class EnergyNetRead(BaseModel):
+    start: date
+    end: date
+    contract_id: Optional[int]  # None: the household, all contracts netted per day
+    unit: str
+    totals: EnergyBalance
+    points: List[EnergyNetPoint]
@@ -18,3 +18,7 @@ class ReadingRead(ReadingBase):
 
     class Config:
         orm_mode = True
+
+class ReadingPage(BaseModel):
+    items: list[ReadingRead]
+    next_cursor: str | None = None  # pass back as ?cursor= for the next page; None on the last page
@@ -1,6 +1,7 @@
 # app/db/schemas/reading.py
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import date, datetime
+from typing import List, Optional
 from decimal import Decimal
 
 class SolarBase(BaseModel):
@@ -18,3 +19,50 @@ class SolarRead(SolarBase):
 
     class Config:
         orm_mode = True
+
+# ---------- analytics ----------
+
+class SolarPanelTotal(BaseModel):
+    panel_serial_nbr: str
+    energy: Decimal
+    days: int                    # days with a reading
+    daily_average: Decimal
+
+class SolarPanelRank(SolarPanelTotal):
+    rank: int
+    relative_to_median: Optional[float]   # daily average / fleet median
+
+class SolarDailyPoint(BaseModel):
+    day: date
+    energy: Decimal
+
+class SolarPanelSeries(BaseModel):
+    panel_serial_nbr: str
+    start: date
+    end: date
+    points: List[SolarDailyPoint]
+
+class SolarPanelDegradation(BaseModel):
+    panel_serial_nbr: str
+    months: int
+    relative_yield: float                 # mean of monthly yield / fleet median
+    trend_pct_per_year: Optional[float]   # None below the minimum number of months
+
+class SolarPanelAnomalyRead(BaseModel):
+    day: date
+    panel_serial_nbr: str
+    energy: Decimal
+    ratio: float                 # energy / median of all panels that day
+    z_score: Optional[float]     # against the panel's own trailing window
+    low_days: int                # consecutive low days so far
+
+    class Config:
+        from_attributes = True
+
+class SolarAnomalyRun(BaseModel):
+    start: date
+    end: date
+    panels: int
+    flagged: int                 # flagged panel-days
+    flagged_panels: int
+    elapsed_ms: float
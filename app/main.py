@@ -8,13 +8,19 @@ from datetime import datetime, date
 
 from app.crud import contract
 from app.db.database import Base, engine, SessionLocal
+from app.db.migrations import run_migrations
 from app.db.models import UIComponent as UIModel, User as UserModel, Supplier as SupplierModel, Contract as ContractModel, UIComponent as UIModel
 from app.db.models.utility import Utility as UtilityModel
 from app.db.models.tariff import Tariff  # and enums if you defined them
 
 from app.core.security import get_password_hash
+from app.services import parallel_parse
+from app.services.import_jobs import import_jobs
+from app.services.net_energy import ensure_net_energy
+from app.services.reading_rollup import ensure_daily_rollup
+from app.services.solar_rollup import ensure_panel_monthly
 
-from app.routes import import_readings, reading, auth, tariff, uicomponent, contract, supplier, utility
+from app.routes import import_readings, reading, auth, tariff, uicomponent, contract, supplier, utility, export, metrics, solar_analytics, energy
 from decimal import Decimal
 
 @asynccontextmanager
@@ -38,9 +44,15 @@ async def lifespan(app: FastAPI):
         print("⚠️ debugpy not installed, skipping remote debugging")
             
     # yield
-    # 🛠️ Create tables
+    # 🛠️ Create / migrate tables
     print("🔍 Registered tables:", Base.metadata.tables.keys())
-    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+    # 📈 Backfill the daily reading, solar panel and net energy rollups once; the write paths keep them current
+    with SessionLocal() as db:
+        ensure_daily_rollup(db)
+        ensure_panel_monthly(db)
+        ensure_net_energy(db)
 
     # 🧬 Seed data
     db = SessionLocal()
@@ -716,6 +728,10 @@ async def lifespan(app: FastAPI):
 
     yield  # Let the app run
 
+    # 🧹 Drop import jobs that have not started yet; running ones finish on their own
+    import_jobs.shutdown()
+    parallel_parse.shutdown()
+
 # 🚀 Create the FastAPI app using the lifespan
 app = FastAPI(lifespan=lifespan)
 
@@ -728,6 +744,10 @@ app.include_router(contract.router)
 app.include_router(utility.router)
 app.include_router(import_readings.router)
 app.include_router(tariff.router)
+app.include_router(export.router)
+app.include_router(metrics.router)
+app.include_router(solar_analytics.router)
+app.include_router(energy.router)
 
 # 🌐 CORS
 origins = [
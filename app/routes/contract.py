@@ -1,13 +1,19 @@
 # app/routes/contract.py
+from datetime import date
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.db.database import get_db
+from app.db.database import get_async_db, get_db
 from app.db.models.contract import Contract
 from app.db.models.tariff import Tariff
 from app.db.models.utility import Utility
 from app.db.schemas.contract import ContractCreate, ContractRead, ContractUpdate
+from app.db.schemas.cost import ContractCostRead, cost_read
 from app.db.schemas.tariff import TariffCreate, TariffRead
+from app.services.cost_calculator import compute_contract_cost
+from app.services.cost_cache import cost_cache
+from app.services.tariff_index import tariff_indexes
 from app.crud import contract as crud
 from app.db.schemas.utility import UtilityRead
 
@@ -55,6 +61,8 @@ def create_tariff_for_contract(contract_id: int, body: TariffCreate, db: Session
     db.add(tariff)
     db.commit()
     db.refresh(tariff)
+    tariff_indexes.invalidate_tariff(tariff)
+    cost_cache.invalidate_scope(tariff.utility_id, tariff.contract_id)
     return tariff
 
 @router.get("/{contract_id}/utilities", response_model=List[UtilityRead])
@@ -63,3 +71,22 @@ def list_utilities_for_contract(contract_id: int, db: Session = Depends(get_db))
     if not contract:
         raise HTTPException(status_code=404, detail="Contract not found")
     return db.query(Utility).filter(Utility.contract_id == contract_id).all()
+
+@router.get("/{contract_id}/cost", response_model=ContractCostRead)
+async def get_contract_cost(
+    contract_id: int,
+    start: date = Query(..., description="Start date (YYYY-MM-DD)"),
+    end: date = Query(..., description="End date (YYYY-MM-DD)"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if not await db.get(Contract, contract_id):
+        raise HTTPException(status_code=404, detail="Contract not found")
+
+    per_utility, combined = await db.run_sync(compute_contract_cost, contract_id, start, end)
+    return {
+        "contract_id": contract_id,
+        "start": start,
+        "end": end,
+        "utilities": [{"utility_id": uid, "cost": cost_read(cost)} for uid, cost in per_utility.items()],
+        "combined": cost_read(combined),
+    }
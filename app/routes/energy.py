@@ -0,0 +1,25 @@
+# app/routes/energy.py
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.db.database import get_db
+from app.db.schemas.energy import EnergyNetRead
+from app.services.net_energy import net_energy
+
+router = APIRouter(prefix="/energy", tags=["Energy"])
+
+@router.get("/net", response_model=EnergyNetRead)
+def get_net_energy(
+    start: date = Query(..., description="First day (YYYY-MM-DD)"),
+    end: date = Query(..., description="Last day, inclusive (YYYY-MM-DD)"),
+    contract_id: int | None = Query(None, description="One contract's utilities; all contracts when omitted"),
+    db: Session = Depends(get_db),
+):
+    """Grid import, solar production and self-consumption per day, from the stored daily balance."""
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    if (end - start).days > 3660:
+        raise HTTPException(status_code=400, detail="Ranges are limited to 10 years")
+    return net_energy(db, start, end, contract_id)
@@ -0,0 +1,52 @@
+# app/routes/export.py
+from datetime import date
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from app.db.database import engine
+from app.services import columnar_export
+from app.services.columnar_export import ExportFormat
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+def _respond(stream_fn, name: str, fmt: ExportFormat, **filters) -> StreamingResponse:
+    if not columnar_export.available():
+        raise HTTPException(status_code=501, detail="Columnar export needs pyarrow installed on the server")
+
+    def body():
+        # the stream owns its connection; the response outlives the request scope
+        with engine.connect() as conn:
+            yield from stream_fn(conn, fmt, **filters)
+
+    ext = "parquet" if fmt == "parquet" else "arrow"
+    return StreamingResponse(
+        body(),
+        media_type=columnar_export.MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{ext}"'},
+    )
+
+@router.get("/readings")
+def export_readings(
+    format: ExportFormat = "arrow",
+    utility_id: int | None = None,
+    contract_id: int | None = None,
+    start: date | None = Query(None, description="inclusive"),
+    end: date | None = Query(None, description="exclusive"),
+):
+    return _respond(
+        columnar_export.stream_readings, "readings", format,
+        utility_id=utility_id, contract_id=contract_id, start=start, end=end,
+    )
+
+@router.get("/solar-readings")
+def export_solar_readings(
+    format: ExportFormat = "arrow",
+    utility_id: int | None = None,
+    contract_id: int | None = None,
+    start: date | None = Query(None, description="inclusive"),
+    end: date | None = Query(None, description="exclusive"),
+):
+    return _respond(
+        columnar_export.stream_solar_readings, "solar_readings", format,
+        utility_id=utility_id, contract_id=contract_id, start=start, end=end,
+    )
@@ -0,0 +1,23 @@
+# app/routes/metrics.py
+from fastapi import APIRouter
+from app.db.database import async_engine, engine
+from app.services.cost_cache import cost_cache
+from app.services.reading_cache import reading_cache
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+@router.get("/db-pool")
+def db_pool():
+    """Checkout counters per engine; a rising saturated_checkouts / wait_max_ms means the pool is too small."""
+    return {
+        "sync": engine.pool.metrics(),
+        "async": async_engine.sync_engine.pool.metrics(),
+    }
+
+@router.get("/cost-cache")
+def cost_cache_metrics():
+    return cost_cache.metrics()
+
+@router.get("/reading-cache")
+def reading_cache_metrics():
+    return reading_cache.metrics()
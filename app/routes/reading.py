@@ -1,27 +1,88 @@
 # app/routes/reading.py
-from fastapi import APIRouter, Depends, HTTPException
+import json
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.db.database import get_db
-from app.db.schemas.reading import ReadingCreate, ReadingRead
+from app.db.database import async_engine, get_async_db, get_db
+from app.db.schemas.reading import ReadingCreate, ReadingPage, ReadingRead
 from app.crud import reading as crud
 
 router = APIRouter(prefix="/readings", tags=["Readings"])
 
+FOREIGN_KEY_VIOLATION = "23503"  # SQLSTATE, e.g. a utility_id that does not exist
+
 @router.post("/", response_model=ReadingRead)
 def create(data: ReadingCreate, db: Session = Depends(get_db)):
-    return crud.create_reading(db, data)
+    try:
+        return crud.create_reading(db, data)
+    except IntegrityError as e:
+        db.rollback()
+        diag = getattr(e.orig, "diag", None)
+        if getattr(diag, "constraint_name", None) == "ux_readings_utility_timestamp":
+            raise HTTPException(status_code=409, detail="A reading for this utility and timestamp already exists")
+        if getattr(e.orig, "pgcode", None) == FOREIGN_KEY_VIOLATION:
+            raise HTTPException(status_code=404, detail="Utility not found")
+        raise
 
 @router.get("/", response_model=list[ReadingRead])
-def list_all(db: Session = Depends(get_db)):
-    return crud.get_all_readings(db)
+async def list_all(db: AsyncSession = Depends(get_async_db)):
+    return await crud.get_all_readings(db)
+
+@router.get("/page", response_model=ReadingPage)
+async def list_page(
+    utility_id: int | None = None,
+    start: datetime | None = Query(None, description="inclusive"),
+    end: datetime | None = Query(None, description="exclusive"),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(500, ge=1, le=10000),
+    db: AsyncSession = Depends(get_async_db),
+):
+    try:
+        items, next_cursor = await crud.get_readings_page(db, limit, utility_id, start, end, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/stream")
+async def stream(
+    utility_id: int | None = None,
+    start: datetime | None = Query(None, description="inclusive"),
+    end: datetime | None = Query(None, description="exclusive"),
+    cursor: str | None = None,
+):
+    """All matching readings as NDJSON, one object per line, ordered on (timestamp, id)."""
+    try:
+        if cursor:
+            crud.decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def lines():
+        # the request-scoped session is closed before the body is sent; the stream owns its connection
+        async with async_engine.connect() as conn:
+            async for r in crud.iter_readings(conn, utility_id, start, end, cursor):
+                yield json.dumps({
+                    "id": r["id"],
+                    "timestamp": r["timestamp"].isoformat(),
+                    "value": str(r["value"]),
+                    "unit": r["unit"],
+                    "source": r["source"],
+                    "utility_id": r["utility_id"],
+                }) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 @router.get("/utility/{utility_id}", response_model=list[ReadingRead])
-def list_by_utility(utility_id: int, db: Session = Depends(get_db)):
-    return crud.get_readings_by_utility(db, utility_id)
+async def list_by_utility(utility_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await crud.get_readings_by_utility(db, utility_id)
 
 @router.get("/{reading_id}", response_model=ReadingRead)
-def get_one(reading_id: int, db: Session = Depends(get_db)):
-    reading = crud.get_reading(db, reading_id)
+async def get_one(reading_id: int, db: AsyncSession = Depends(get_async_db)):
+    reading = await crud.get_reading(db, reading_id)
     if not reading:
         raise HTTPException(status_code=404, detail="Reading not found")
     return reading
@@ -0,0 +1,99 @@
+# app/routes/solar_analytics.py
+from datetime import date, timedelta
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import exists, select
+from sqlalchemy.orm import Session
+
+from app.db.database import get_db
+from app.db.models.solar import SolarReading
+from app.db.schemas.solar import (
+    SolarAnomalyRun, SolarPanelAnomalyRead, SolarPanelDegradation, SolarPanelRank, SolarPanelSeries, SolarPanelTotal,
+)
+from app.services.solar_analytics import panel_daily, panel_degradation, panel_ranking, panel_totals
+from app.services.solar_anomalies import ANOMALY_RUN_DAYS, detect_anomalies, latest_day, stored_anomalies
+
+router = APIRouter(prefix="/solar", tags=["Solar"])
+
+def _check_range(start: date, end: date) -> None:
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+
+@router.get("/panels", response_model=List[SolarPanelTotal])
+def get_panel_totals(
+    start: date = Query(..., description="First production date (YYYY-MM-DD)"),
+    end: date = Query(..., description="Last production date, inclusive (YYYY-MM-DD)"),
+    db: Session = Depends(get_db),
+):
+    _check_range(start, end)
+    return panel_totals(db, start, end)
+
+@router.get("/panels/ranking", response_model=List[SolarPanelRank])
+def get_panel_ranking(
+    start: date = Query(..., description="First production date (YYYY-MM-DD)"),
+    end: date = Query(..., description="Last production date, inclusive (YYYY-MM-DD)"),
+    limit: Optional[int] = Query(None, ge=1, description="Only the best N panels"),
+    db: Session = Depends(get_db),
+):
+    _check_range(start, end)
+    return panel_ranking(db, start, end, limit)
+
+@router.get("/panels/degradation", response_model=List[SolarPanelDegradation])
+def get_panel_degradation(
+    start: date = Query(..., description="First production date (YYYY-MM-DD)"),
+    end: date = Query(..., description="Last production date, inclusive (YYYY-MM-DD)"),
+    db: Session = Depends(get_db),
+):
+    _check_range(start, end)
+    return panel_degradation(db, start, end)
+
+@router.get("/panels/{panel_serial_nbr}/daily", response_model=SolarPanelSeries)
+def get_panel_daily(
+    panel_serial_nbr: str,
+    start: date = Query(..., description="First production date (YYYY-MM-DD)"),
+    end: date = Query(..., description="Last production date, inclusive (YYYY-MM-DD)"),
+    db: Session = Depends(get_db),
+):
+    _check_range(start, end)
+    if not db.scalar(select(exists().where(SolarReading.panel_serial_nbr == panel_serial_nbr))):
+        raise HTTPException(status_code=404, detail="Panel not found")
+    return {
+        "panel_serial_nbr": panel_serial_nbr,
+        "start": start,
+        "end": end,
+        "points": panel_daily(db, panel_serial_nbr, start, end),
+    }
+
+# ---------- anomalies ----------
+
+@router.post("/anomalies/run", response_model=SolarAnomalyRun)
+def run_anomaly_detection(
+    start: Optional[date] = Query(None, description=f"First day to score (default: {ANOMALY_RUN_DAYS} days before end)"),
+    end: Optional[date] = Query(None, description="Last day to score (default: latest production date)"),
+    db: Session = Depends(get_db),
+):
+    """Re-score a range, e.g. after changing the thresholds; imports keep the stored results current."""
+    end = end or latest_day(db)
+    if end is None:
+        raise HTTPException(status_code=404, detail="No solar readings")
+    start = start or end - timedelta(days=ANOMALY_RUN_DAYS - 1)
+    _check_range(start, end)
+    result = detect_anomalies(db, start, end)
+    db.commit()
+    return result
+
+@router.get("/anomalies", response_model=List[SolarPanelAnomalyRead])
+def get_anomalies(
+    start: Optional[date] = Query(None, description="First day (default: latest production date)"),
+    end: Optional[date] = Query(None, description="Last day, inclusive (default: start)"),
+    panel_serial_nbr: Optional[str] = Query(None, description="Only this panel"),
+    db: Session = Depends(get_db),
+):
+    """Stored flagged panel-days, newest first, worst ratio first within a day."""
+    start = start or latest_day(db)
+    if start is None:
+        return []
+    end = end or start
+    _check_range(start, end)
+    return stored_anomalies(db, start, end, panel_serial_nbr)
@@ -1,7 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.db import models, schemas
-from app.db.database import SessionLocal  # Make sure to configure a database session
+from app.db.database import get_async_db, get_db
 from typing import List
 
 from app.db.models.contract import Contract
@@ -10,24 +12,16 @@ from app.db.schemas.supplier import SupplierBase
 
 router = APIRouter()
 
-# Dependency for getting the database session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # List suppliers
 @router.get("/suppliers", response_model=List[schemas.Supplier])
-def get_suppliers(db: Session = Depends(get_db)):
-    suppliers = db.query(models.Supplier).all()
+async def get_suppliers(db: AsyncSession = Depends(get_async_db)):
+    suppliers = (await db.scalars(select(models.Supplier))).all()
     return suppliers
 
 # Get individual supplier by ID
 @router.get("/suppliers/{supplier_id}", response_model=schemas.Supplier)
-def get_supplier(supplier_id: int, db: Session = Depends(get_db)):
-    supplier = db.query(models.Supplier).filter(models.Supplier.id == supplier_id).first()
+async def get_supplier(supplier_id: int, db: AsyncSession = Depends(get_async_db)):
+    supplier = await db.get(models.Supplier, supplier_id)
     if supplier is None:
         raise HTTPException(status_code=404, detail="Supplier not found")
     return supplier
@@ -42,9 +36,9 @@ def create_supplier(supplier: schemas.SupplierCreate, db: Session = Depends(get_
     return db_supplier
 
 @router.get("/suppliers/{supplier_id}/contracts", response_model=List[ContractRead])
-def get_contracts_for_supplier(supplier_id: int, db: Session = Depends(get_db)):
+async def get_contracts_for_supplier(supplier_id: int, db: AsyncSession = Depends(get_async_db)):
     # Assuming the Contract model has a supplier_id foreign key to link contracts to suppliers
-    contracts = db.query(Contract).filter(Contract.supplier_id == supplier_id).all()
+    contracts = (await db.scalars(select(Contract).where(Contract.supplier_id == supplier_id))).all()
     if not contracts:
         raise HTTPException(status_code=404, detail="Contracts not found for this supplier")
     return contracts
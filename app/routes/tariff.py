@@ -1,28 +1,27 @@
 # app/api/routes/tariffs.py
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
-from app.db.database import SessionLocal
+from app.db.database import get_async_db, get_db
 from app.db.models.tariff import Tariff
 from app.db.schemas.tariff import TariffCreate, TariffUpdate, TariffRead
+from app.services.cost_cache import cost_cache
+from app.services.tariff_index import tariff_indexes
 
 router = APIRouter()
 
-def get_db():
-  db = SessionLocal()
-  try:
-    yield db
-  finally:
-    db.close()
-
 @router.get("/tariffs", response_model=List[TariffRead])
-def list_tariffs(db: Session = Depends(get_db)):
-  return db.query(Tariff).all()
+async def list_tariffs(db: AsyncSession = Depends(get_async_db)):
+  return (await db.scalars(select(Tariff))).all()
 
 @router.post("/tariffs", response_model=TariffRead)
 def create_tariff(body: TariffCreate, db: Session = Depends(get_db)):
   t = Tariff(**body.model_dump(exclude_unset=True))
   db.add(t); db.commit(); db.refresh(t)
+  tariff_indexes.invalidate_tariff(t)
+  cost_cache.invalidate_scope(t.utility_id, t.contract_id)
   return t
 
 @router.put("/tariffs/{tariff_id}", response_model=TariffRead)
@@ -31,20 +30,25 @@ def update_tariff(tariff_id: int, tariff_update: TariffUpdate, db: Session = Dep
     if not db_tariff:
         raise HTTPException(status_code=404, detail="Tariff not found")
 
+    old_scope = (db_tariff.utility_id, db_tariff.contract_id)
     for key, value in tariff_update.dict(exclude_unset=True).items():
         setattr(db_tariff, key, value)
 
     db.commit()
     db.refresh(db_tariff)
+    tariff_indexes.invalidate(*old_scope)
+    cost_cache.invalidate_scope(*old_scope)
+    tariff_indexes.invalidate_tariff(db_tariff)
+    cost_cache.invalidate_scope(db_tariff.utility_id, db_tariff.contract_id)
     return db_tariff
 
 @router.get("/by-contract/{contract_id}", response_model=List[TariffRead])
-def list_by_contract(contract_id: int, db: Session = Depends(get_db)):
-  return db.query(Tariff).where(Tariff.contract_id == contract_id).all()
+async def list_by_contract(contract_id: int, db: AsyncSession = Depends(get_async_db)):
+  return (await db.scalars(select(Tariff).where(Tariff.contract_id == contract_id))).all()
 
 @router.get("/by-utility/{utility_id}", response_model=List[TariffRead])
-def list_by_utility(utility_id: int, db: Session = Depends(get_db)):
-  return db.query(Tariff).where(Tariff.utility_id == utility_id).all()
+async def list_by_utility(utility_id: int, db: AsyncSession = Depends(get_async_db)):
+  return (await db.scalars(select(Tariff).where(Tariff.utility_id == utility_id))).all()
 
 # @router.patch("/{tariff_id}", response_model=TariffRead)
 # def update_tariff(tariff_id: int, updates: TariffUpdate, db: Session = Depends(get_db)):
@@ -57,4 +61,7 @@ def list_by_utility(utility_id: int, db: Session = Depends(get_db)):
 def delete_tariff(tariff_id: int, db: Session = Depends(get_db)):
   t = db.query(Tariff).get(tariff_id)
   if not t: raise HTTPException(status_code=404, detail="Tariff not found")
+  scope = (t.utility_id, t.contract_id)
   db.delete(t); db.commit()
+  tariff_indexes.invalidate(*scope)
+  cost_cache.invalidate_scope(*scope)
@@ -1,18 +1,22 @@
 # app/routes/utility.py
-from typing import List
+from typing import List, Literal
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.db.database import get_db
+from app.db.database import get_async_db, get_db
 from app.db.models.tariff import Tariff
 from app.db.models.utility import Utility
 from app.db.schemas.tariff import TariffCreate, TariffRead
+from app.services.cost_cache import cost_cache
+from app.services.tariff_index import tariff_indexes
 from app.db.schemas.utility import UtilityCreate, UtilityRead, UtilityUpdate
 from app.crud import utility as crud
 from app.crud import reading as crud_reading
 from datetime import date
 from fastapi import Query
-from app.services.cost_calculator import compute_utility_cost
-from app.db.schemas.cost import CostRead, TariffSpecItem
+from app.services.cost_calculator import compute_utility_cost, compute_utility_costs, split_period
+from app.db.schemas.cost import CostRead, TariffSpecItem, CostBatchRequest, CostBatchRead, CostTimelineRead, cost_read
+from app.services.cost_timeline import cost_timeline
 
 
 router = APIRouter(prefix="/utilities", tags=["Utilities"])
@@ -65,38 +69,74 @@ def create_tariff_for_utility(utility_id: int, body: TariffCreate, db: Session =
     db.add(tariff)
     db.commit()
     db.refresh(tariff)
+    tariff_indexes.invalidate_tariff(tariff)
+    cost_cache.invalidate_scope(tariff.utility_id, tariff.contract_id)
     return tariff
 
 
 @router.get("/{utility_id}/cost", response_model=CostRead)
-def get_utility_cost(
+async def get_utility_cost(
     utility_id: int,
     start: date = Query(..., description="Start date (YYYY-MM-DD)"),
     end: date = Query(..., description="End date (YYYY-MM-DD)"),
     include_contract: bool = Query(True, description="Include contract-level tariffs"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
+    """KWH / M3 tariffs apply to NORMAL, REDUCED, GAS and SOLAR utilities only; other types have no metered usage."""
     # Validate utility exists
-    if not db.get(Utility, utility_id):
+    if not await db.get(Utility, utility_id):
         raise HTTPException(status_code=404, detail="Utility not found")
 
-    cost = compute_utility_cost(db, utility_id, start, end, include_contract)
+    # the cost engine is sync; run it on the async session's connection
+    cost = await db.run_sync(compute_utility_cost, utility_id, start, end, include_contract)
+
+    return cost_read(cost)
 
-    return {
-        "gas": cost.gas, "stand_i": cost.stand_i, "stand_ii": cost.stand_ii,
-        "single": cost.single, "fixed": cost.fixed, "variable": cost.variable,
-        "tax": cost.tax, "network": cost.network, "discount": cost.discount,
-        "total": cost.total,
-        "specification": cost.tariff_specification,
-    }
+@router.get("/{utility_id}/cost/timeline", response_model=CostTimelineRead)
+async def get_utility_cost_timeline(
+    utility_id: int,
+    start: date = Query(..., description="Start date (YYYY-MM-DD)"),
+    end: date = Query(..., description="End date (YYYY-MM-DD)"),
+    resolution: Literal["day", "hour"] = Query("day", description="Step of the series"),
+    include_contract: bool = Query(True, description="Include contract-level tariffs"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if not await db.get(Utility, utility_id):
+        raise HTTPException(status_code=404, detail="Utility not found")
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    if resolution == "hour" and (end - start).days > 366:
+        raise HTTPException(status_code=400, detail="Hourly timelines are limited to 366 days")
+
+    return await db.run_sync(cost_timeline, utility_id, start, end, resolution, include_contract)
+
+@router.post("/cost/batch", response_model=CostBatchRead)
+async def get_utility_costs(body: CostBatchRequest, db: AsyncSession = Depends(get_async_db)):
+    if body.periods is not None:
+        periods = [(p.start, p.end) for p in body.periods]
+    else:
+        periods = split_period(body.start, body.end, body.bucket)
+
+    try:
+        # buckets are chained: every boundary day's usage is counted once, so they add up to the range
+        costs = await db.run_sync(
+            compute_utility_costs, body.utility_ids, periods, body.include_contract, chained=body.periods is None,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    return {"cells": [
+        {"utility_id": uid, "start": start, "end": end, "cost": cost_read(cost)}
+        for (uid, start, end), cost in costs.items()
+    ]}
 
 # utility.py
 from app.db.schemas.reading import ReadingRead
 
 @router.get("/{utility_id}/readings", response_model=list[ReadingRead])
-def list_readings_for_utility(utility_id: int, db: Session = Depends(get_db)):
-    utility = db.get(Utility, utility_id)
+async def list_readings_for_utility(utility_id: int, db: AsyncSession = Depends(get_async_db)):
+    utility = await db.get(Utility, utility_id)
     if not utility:
         raise HTTPException(status_code=404, detail="Utility not found")
 
-    return crud_reading.get_readings_by_utility(db, utility_id)
+    return await crud_reading.get_readings_by_utility(db, utility_id)
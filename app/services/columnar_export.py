@@ -0,0 +1,171 @@
+# app/services/columnar_export.py
+"""
+Arrow IPC / Parquet export of readings and solar readings.
+
+Rows come from a server-side cursor in batches and go straight into Arrow record batches:
+timestamps and dates leave Postgres as epoch integers and values as float8, so no
+datetime, Decimal or Pydantic object is built per row. Each encoded batch is handed
+to the caller as bytes, ready to be streamed.
+"""
+from __future__ import annotations
+from datetime import date
+from typing import Iterator, Literal
+
+from sqlalchemy import BigInteger, Float, Integer, and_, cast, exists, extract, literal, select
+from sqlalchemy.engine import Connection
+
+from app.db.models.contract import Contract
+from app.db.models.reading import Reading
+from app.db.models.solar import SolarReading
+from app.db.models.utility import Utility
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency; the export endpoints answer 501 without it
+    pa = None
+
+ExportFormat = Literal["arrow", "parquet"]
+
+BATCH_SIZE = 50_000
+
+MEDIA_TYPES = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+def available() -> bool:
+    return pa is not None
+
+# ---------- queries ----------
+
+def readings_select(
+    utility_id: int | None = None,
+    contract_id: int | None = None,
+    start: date | None = None,
+    end: date | None = None,
+):
+    stmt = select(
+        Reading.id,
+        Reading.utility_id,
+        cast(extract("epoch", Reading.timestamp) * 1_000_000, BigInteger),
+        cast(Reading.value, Float),
+        Reading.unit,
+        Reading.source,
+    ).order_by(Reading.utility_id, Reading.timestamp)
+    if utility_id is not None:
+        stmt = stmt.where(Reading.utility_id == utility_id)
+    if contract_id is not None:
+        stmt = stmt.where(Reading.utility_id.in_(select(Utility.id).where(Utility.contract_id == contract_id)))
+    if start is not None:
+        stmt = stmt.where(Reading.timestamp >= start)
+    if end is not None:
+        stmt = stmt.where(Reading.timestamp < end)
+    return stmt
+
+def solar_select(
+    utility_id: int | None = None,
+    contract_id: int | None = None,
+    start: date | None = None,
+    end: date | None = None,
+):
+    # solar rows carry no utility; they belong to the SOLAR utility whose contract covers the date
+    covered = and_(Contract.start_date <= SolarReading.production_date, Contract.end_date >= SolarReading.production_date)
+    stmt = select(
+        SolarReading.id,
+        cast(SolarReading.production_date - literal(date(1970, 1, 1)), Integer),
+        SolarReading.panel_serial_nbr,
+        cast(SolarReading.energy_produced, Float),
+        SolarReading.unit,
+    ).order_by(SolarReading.production_date, SolarReading.id)
+    if utility_id is not None:
+        stmt = stmt.where(exists(
+            select(1).select_from(Utility).join(Contract, Contract.id == Utility.contract_id)
+            .where(Utility.id == utility_id, Utility.type == "SOLAR", covered)
+        ))
+    if contract_id is not None:
+        stmt = stmt.where(exists(select(1).select_from(Contract).where(Contract.id == contract_id, covered)))
+    if start is not None:
+        stmt = stmt.where(SolarReading.production_date >= start)
+    if end is not None:
+        stmt = stmt.where(SolarReading.production_date < end)
+    return stmt
+
+def _readings_schema():
+    return pa.schema([
+        ("id", pa.int32()),
+        ("utility_id", pa.int32()),
+        ("timestamp", pa.timestamp("us")),
+        ("value", pa.float64()),
+        ("unit", pa.string()),
+        ("source", pa.string()),
+    ])
+
+def _solar_schema():
+    return pa.schema([
+        ("id", pa.int32()),
+        ("production_date", pa.date32()),
+        ("panel_serial_nbr", pa.string()),
+        ("energy_produced", pa.float64()),
+        ("unit", pa.string()),
+    ])
+
+# ---------- writer ----------
+
+class _ChunkSink:
+    """Write-only file object that collects what the Arrow writers emit until it is drained."""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._pos = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        out = b"".join(self._chunks)
+        self._chunks = []
+        return out
+
+def _stream(conn: Connection, stmt, schema, fmt: ExportFormat, batch_size: int) -> Iterator[bytes]:
+    sink = _ChunkSink()
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(sink, schema)
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+
+    result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(stmt)
+    for rows in result.partitions():
+        columns = zip(*rows)
+        batch = pa.record_batch(
+            [pa.array(col, type=field.type) for col, field in zip(columns, schema)],
+            schema=schema,
+        )
+        writer.write_batch(batch)
+        chunk = sink.drain()
+        if chunk:
+            yield chunk
+
+    writer.close()
+    yield sink.drain()
+
+def stream_readings(conn: Connection, fmt: ExportFormat, batch_size: int = BATCH_SIZE, **filters) -> Iterator[bytes]:
+    return _stream(conn, readings_select(**filters), _readings_schema(), fmt, batch_size)
+
+def stream_solar_readings(conn: Connection, fmt: ExportFormat, batch_size: int = BATCH_SIZE, **filters) -> Iterator[bytes]:
+    return _stream(conn, solar_select(**filters), _solar_schema(), fmt, batch_size)
@@ -0,0 +1,292 @@
+# app/services/cost_cache.py
+"""
+Cache of computed costs for closed periods, keyed by (utility, start, end, include_contract, open_end).
+
+Entries are tagged with the scopes they were computed from: "u:<utility>" always and
+"c:<contract>" when contract tariffs/usage were included. Writes drop exactly the entries
+they can affect:
+- a tariff write drops every entry tagged with its utility or contract;
+- readings written for a utility drop the entries of that utility, and the contract-wide
+  entries of its contract, that end on or after the day of the earliest written reading
+  (USAGE_MODE=interpolate: of the reading before it, which the new one re-interpolates).
+Reading invalidations are queued on the session and applied after commit, so a request
+that runs in between cannot re-cache the old numbers.
+
+The backend is an in-process LRU by default. Other workers cannot invalidate its entries,
+so they expire after COST_CACHE_LOCAL_TTL_S (default 300s) to bound how stale a multi-worker
+setup can get. Set COST_CACHE_URL=redis://... to share entries, and their invalidations,
+between workers (needs the `redis` package).
+"""
+from __future__ import annotations
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Iterable, Protocol
+
+from sqlalchemy import and_, event, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.db.models.reading import Reading
+from app.db.models.utility import Utility
+from app.services.reading_rollup import ReadingSpans
+from app.services.tariff_calculators import Cost
+from app.services.usage_calculator import USAGE_MODE
+
+try:
+    import redis
+except ImportError:  # optional; only needed for the shared backend
+    redis = None
+
+COST_CACHE_SIZE = int(os.getenv("COST_CACHE_SIZE", "10000"))
+COST_CACHE_URL = os.getenv("COST_CACHE_URL")
+COST_CACHE_TTL_S = int(os.getenv("COST_CACHE_TTL_S", str(7 * 24 * 3600)))  # shared backend only
+# other worker processes cannot invalidate the in-process entries; bound how stale they can get
+COST_CACHE_LOCAL_TTL_S = float(os.getenv("COST_CACHE_LOCAL_TTL_S", "300"))
+
+# (utility_id, start, end, include_contract, open_end); open_end: usage stops before `end`
+# (the non-last pieces of a chained batch, see cost_calculator.compute_utility_costs)
+CostKey = tuple[int, date, date, bool, bool]
+
+def _key_str(key: CostKey) -> str:
+    uid, start, end, include_contract, open_end = key
+    return f"{uid}:{start.isoformat()}:{end.isoformat()}:{int(include_contract)}" + (":open" if open_end else "")
+
+def _key_end(key_str: str) -> date:
+    return date.fromisoformat(key_str.split(":")[2])
+
+# ---------- backends ----------
+
+class CostCacheBackend(Protocol):
+    def get(self, key: str) -> Cost | None: ...
+    def put(self, key: str, cost: Cost, tags: Iterable[str]) -> None: ...
+    def keys_for_tag(self, tag: str) -> list[str]: ...
+    def delete(self, keys: Iterable[str]) -> None: ...
+    def clear(self) -> None: ...
+    def size(self) -> int: ...
+
+class LRUBackend:
+    def __init__(self, max_entries: int = COST_CACHE_SIZE, ttl_s: float = COST_CACHE_LOCAL_TTL_S):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[Cost, tuple[str, ...], float]] = OrderedDict()  # (cost, tags, stored at)
+        self._tags: dict[str, set[str]] = {}
+
+    def get(self, key: str) -> Cost | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[2] >= self.ttl_s:
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: str, cost: Cost, tags: Iterable[str]) -> None:
+        tags = tuple(tags)
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (cost, tags, time.monotonic())
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def keys_for_tag(self, tag: str) -> list[str]:
+        with self._lock:
+            return list(self._tags.get(tag, ()))
+
+    def delete(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._drop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[1]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+class RedisBackend:
+    """Entries as pickled Cost objects under cost:<key>, tag index as Redis sets under cost-tag:<tag>."""
+
+    def __init__(self, url: str, ttl_s: int = COST_CACHE_TTL_S):
+        self.client = redis.Redis.from_url(url)
+        self.ttl_s = ttl_s
+
+    def get(self, key: str) -> Cost | None:
+        raw = self.client.get(f"cost:{key}")
+        return pickle.loads(raw) if raw is not None else None
+
+    def put(self, key: str, cost: Cost, tags: Iterable[str]) -> None:
+        pipe = self.client.pipeline()
+        pipe.set(f"cost:{key}", pickle.dumps(cost), ex=self.ttl_s)
+        for tag in tags:
+            pipe.sadd(f"cost-tag:{tag}", key)
+            pipe.expire(f"cost-tag:{tag}", self.ttl_s)
+        pipe.execute()
+
+    def keys_for_tag(self, tag: str) -> list[str]:
+        return [k.decode() for k in self.client.smembers(f"cost-tag:{tag}")]
+
+    def delete(self, keys: Iterable[str]) -> None:
+        keys = list(keys)
+        if keys:
+            # tag sets keep the dead keys until they expire; a dead key costs one DEL on the next invalidation
+            self.client.delete(*(f"cost:{k}" for k in keys))
+
+    def clear(self) -> None:
+        for k in self.client.scan_iter("cost:*"):
+            self.client.delete(k)
+        for k in self.client.scan_iter("cost-tag:*"):
+            self.client.delete(k)
+
+    def size(self) -> int:
+        return sum(1 for _ in self.client.scan_iter("cost:*"))
+
+# ---------- cache ----------
+
+class CostCache:
+    def __init__(self, backend: CostCacheBackend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._generation = 0  # bumped on every invalidation
+        self.hits = 0
+        self.misses = 0
+        self.puts = 0
+        self.invalidated = 0
+
+    @staticmethod
+    def cacheable(end: date) -> bool:
+        # a period that reaches today can still change without any write (the end is clipped to today)
+        return end < date.today()
+
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, key: CostKey) -> Cost | None:
+        cost = self.backend.get(_key_str(key))
+        with self._lock:
+            if cost is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return cost
+
+    def put(self, key: CostKey, cost: Cost, contract_id: int | None, generation: int) -> None:
+        """Store `cost` unless something was invalidated since `generation` was read."""
+        if generation != self._generation:
+            return
+        uid, _, _, include_contract, _ = key
+        tags = [f"u:{uid}"]
+        if include_contract and contract_id is not None:
+            tags.append(f"c:{contract_id}")
+        self.backend.put(_key_str(key), cost, tags)
+        with self._lock:
+            self.puts += 1
+
+    def _invalidate(self, tags: Iterable[str], after: date | None = None) -> None:
+        with self._lock:
+            self._generation += 1
+        doomed = set()
+        for tag in tags:
+            for key in self.backend.keys_for_tag(tag):
+                if after is None or _key_end(key) >= after:
+                    doomed.add(key)
+        self.backend.delete(doomed)
+        with self._lock:
+            self.invalidated += len(doomed)
+
+    def invalidate_scope(self, utility_id: int | None = None, contract_id: int | None = None) -> None:
+        """A tariff of this utility or contract was written."""
+        tags = []
+        if utility_id is not None:
+            tags.append(f"u:{utility_id}")
+        if contract_id is not None:
+            tags.append(f"c:{contract_id}")
+        self._invalidate(tags)
+
+    def invalidate_readings(self, changes: Iterable[tuple[int, int | None, date]]) -> None:
+        """(utility_id, contract_id, earliest written day) per utility whose readings changed."""
+        for utility_id, contract_id, first_day in changes:
+            tags = [f"u:{utility_id}"] + ([f"c:{contract_id}"] if contract_id is not None else [])
+            # usage of a window includes its end date: a reading on day d moves every window ending on or after d
+            self._invalidate(tags, after=first_day)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+        self.backend.clear()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": type(self.backend).__name__,
+                "entries": self.backend.size(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "puts": self.puts,
+                "invalidated": self.invalidated,
+            }
+
+def _make_backend() -> CostCacheBackend:
+    if COST_CACHE_URL:
+        if redis is not None:
+            return RedisBackend(COST_CACHE_URL)
+        print("⚠️ COST_CACHE_URL is set but the redis package is not installed; using the in-process cost cache")
+    return LRUBackend()
+
+cost_cache = CostCache(_make_backend())
+
+# ---------- session hooks ----------
+
+_PENDING = "cost_cache_readings"
+
+def readings_changed(db: Session, spans: ReadingSpans) -> None:
+    """Queue cache invalidation for readings written in this session; applied after commit."""
+    if not spans:
+        return
+    contracts = dict(db.execute(select(Utility.id, Utility.contract_id).where(Utility.id.in_(list(spans)))).all())
+    before = _readings_before(db, spans) if USAGE_MODE == "interpolate" else {}
+    pending = db.info.setdefault(_PENDING, {})
+    for utility_id, (lo, _) in spans.items():
+        first_day = before.get(utility_id, lo).date()
+        prev = pending.get(utility_id)
+        pending[utility_id] = (contracts.get(utility_id), first_day if prev is None else min(prev[1], first_day))
+
+def _readings_before(db: Session, spans: ReadingSpans) -> dict[int, datetime]:
+    # interpolated stands between the previous reading and a new one move with it
+    return dict(db.execute(
+        select(Reading.utility_id, func.max(Reading.timestamp))
+        .where(or_(*(and_(Reading.utility_id == uid, Reading.timestamp < lo) for uid, (lo, _) in spans.items())))
+        .group_by(Reading.utility_id)
+    ).all())
+
+@event.listens_for(Session, "after_commit")
+def _apply_after_commit(session: Session) -> None:
+    pending = session.info.pop(_PENDING, None)
+    if pending:
+        cost_cache.invalidate_readings((uid, cid, day) for uid, (cid, day) in pending.items())
+
+@event.listens_for(Session, "after_rollback")
+def _drop_on_rollback(session: Session) -> None:
+    session.info.pop(_PENDING, None)
@@ -1,16 +1,143 @@
 from __future__ import annotations
 from datetime import date, timedelta
+from typing import Iterable, Literal
 from sqlalchemy.orm import Session
 
 from app.db.models.utility import Utility
-from app.db.models.tariff import Tariff
+from app.services.cost_cache import cost_cache
 from app.services.tariff_calculators import Cost, TariffCalculatorFactory
-from app.services.usage_calculator import get_usage_for_period
+from app.services.tariff_index import Scope, TariffIndex, TariffSnapshot, tariff_indexes
+from app.services.usage_calculator import UsagePeriod, get_usage_for_periods
 
-def _clip_period(req_start: date, req_end: date, t_start: date | None, t_end: date | None):
-    eff_start = max(req_start, t_start) if t_start else req_start
-    eff_end = min(req_end, (t_end + timedelta(days=1)) if t_end else req_end)  # treat tariff end as inclusive
-    return (eff_start, eff_end) if eff_start < eff_end else None
+Bucket = Literal["month", "quarter", "year"]
+_BUCKET_MONTHS = {"month": 1, "quarter": 3, "year": 12}
+
+def split_period(start: date, end: date, bucket: Bucket) -> list[tuple[date, date]]:
+    """
+    Cut [start, end) on calendar month/quarter/year boundaries. Each bucket ends on the
+    date the next one starts, so the day counts of the buckets add up to the whole period.
+    Usage of a period includes its end date, so cost these buckets with
+    compute_utility_costs(..., chained=True) to count a boundary day's usage only once.
+    """
+    step = _BUCKET_MONTHS[bucket]
+    periods = []
+    cur = start
+    while cur < end:
+        # first day of the next bucket (quarters/years aligned to January)
+        month0 = (cur.year * 12 + cur.month - 1) // step * step + step
+        nxt = min(date(month0 // 12, month0 % 12 + 1, 1), end)
+        periods.append((cur, nxt))
+        cur = nxt
+    return periods
+
+def tariff_scopes(util: Utility, indexes: dict[Scope, TariffIndex], include_contract_tariffs: bool) -> list[TariffIndex]:
+    """Tariff indexes of a utility in application order: its own tariffs, then its contract's."""
+    scopes = [indexes[("utility", util.id)]]
+    if include_contract_tariffs and util.contract_id is not None:
+        scopes.append(indexes[("contract", util.contract_id)])
+    return scopes
+
+def plan_tariffs(util: Utility, scopes: list[TariffIndex], start: date, end: date) -> list[tuple[TariffSnapshot, date, date, UsagePeriod]]:
+    """(tariff, clipped start, clipped end, usage period) for every tariff applying to [start, end)."""
+    plans = []
+    for index in scopes:
+        for t, p_start, p_end in index.overlapping(start, end):
+            is_contract_scope = (t.utility_id is None)
+            plans.append((t, p_start, p_end, (
+                util.contract_id if is_contract_scope else None,
+                None if is_contract_scope else util.id,
+                p_start,
+                p_end,
+                is_contract_scope,
+            )))
+    return plans
+
+def compute_utility_costs(
+    db: Session,
+    utility_ids: Iterable[int],
+    periods: Iterable[tuple[date, date]],
+    include_contract_tariffs: bool = True,
+    use_cache: bool = True,
+    chained: bool = False,
+) -> dict[tuple[int, date, date], Cost]:
+    """
+    Cost for every (utility, period) cell. Utilities are loaded once for the whole matrix,
+    tariffs come clipped from the per-scope interval index and the usage of every clipped
+    tariff period is fetched in one query. Closed periods are served from / stored in the
+    cost cache; the returned Cost objects may be shared and must not be modified.
+
+    chained: the periods are consecutive pieces of one range, as cut by split_period. The
+    usage (KWH/M3) of every piece but the last then stops before its end date, which the
+    next piece counts, so the cells add up to the cost of the whole range. A PERCENTAGE
+    tariff discounts the cost of its own cell, so that only holds where it covers every cell.
+    """
+    utility_ids = list(dict.fromkeys(utility_ids))
+    periods = list(dict.fromkeys(periods))
+    last_end = max((end for _, end in periods), default=None)
+    generation = cost_cache.generation()  # read before any data, see CostCache.put
+
+    utils = {u.id: u for u in db.query(Utility).filter(Utility.id.in_(utility_ids))}
+    if len(utils) != len(utility_ids):
+        raise ValueError("Utility not found")
+
+    # tariffs per utility (and its contract) from the interval index; only missing scopes hit the DB
+    contract_ids = {u.contract_id for u in utils.values() if u.contract_id is not None} if include_contract_tariffs else set()
+    indexes = tariff_indexes.get_many(db, utility_ids, contract_ids)
+
+    # clip end to today (optional)
+    today = date.today()
+
+    # clip every tariff first, then fetch the usage of all clipped periods in one go
+    cells = []
+    for utility_id in utility_ids:
+        util = utils[utility_id]
+        scopes = tariff_scopes(util, indexes, include_contract_tariffs)
+
+        for start, req_end in periods:
+            open_end = chained and req_end != last_end
+            if use_cache and cost_cache.cacheable(req_end):
+                cached = cost_cache.get((utility_id, start, req_end, include_contract_tariffs, open_end))
+                if cached is not None:
+                    cells.append(((utility_id, start, req_end), cached))
+                    continue
+
+            plans = plan_tariffs(util, scopes, start, min(req_end, today))
+            if open_end:
+                plans = [_stop_usage_before(plan, req_end) for plan in plans]
+            cells.append(((utility_id, start, req_end), plans))
+
+    planned = [(key, plans) for key, plans in cells if isinstance(plans, list)]
+    usages = iter(get_usage_for_periods(db, [period for _, plans in planned for *_, period in plans]))
+
+    applied = {
+        key: [(t, p_start, p_end, next(usages)) for t, p_start, p_end, _ in plans]
+        for key, plans in planned
+    }
+    costs: dict[tuple[int, date, date], Cost] = {}
+    for key, plans in cells:
+        if isinstance(plans, Cost):  # cache hit
+            costs[key] = plans
+            continue
+        cost = Cost()
+        for t, p_start, p_end, usage in applied[key]:
+            calc = TariffCalculatorFactory.get_calculator(t.tariff_sort)
+            calc.calculate(t, cost, usage, p_start, p_end)
+        costs[key] = cost
+
+        utility_id, start, req_end = key
+        if use_cache and cost_cache.cacheable(req_end):
+            open_end = chained and req_end != last_end
+            cost_cache.put((utility_id, start, req_end, include_contract_tariffs, open_end), cost, utils[utility_id].contract_id, generation)
+    return costs
+
+def _stop_usage_before(plan: tuple[TariffSnapshot, date, date, UsagePeriod], end: date) -> tuple[TariffSnapshot, date, date, UsagePeriod]:
+    # usage windows include their end date: a piece cut at `end` reads through the day before;
+    # one ending there with its tariff keeps it, as it does in the cost of the whole range.
+    # The calculators take their day counts from p_start/p_end, which stay as they are
+    t, p_start, p_end, (contract_id, utility_id, u_start, u_end, scope) = plan
+    if u_end != end or t.valid_until == end:
+        return plan
+    return t, p_start, p_end, (contract_id, utility_id, u_start, u_end - timedelta(days=1), scope)
 
 def compute_utility_cost(
     db: Session,
@@ -18,52 +145,64 @@ def compute_utility_cost(
     start: date,
     end: date,
     include_contract_tariffs: bool = True,
+    use_cache: bool = True,
 ) -> Cost:
-    util = db.get(Utility, utility_id)
-    if not util:
-        raise ValueError("Utility not found")
+    costs = compute_utility_costs(db, [utility_id], [(start, end)], include_contract_tariffs, use_cache)
+    return costs[(utility_id, start, end)]  # IMPORTANT: return ONLY the Cost object
 
-    # clip end to today (optional)
+def compute_contract_cost(
+    db: Session,
+    contract_id: int,
+    start: date,
+    end: date,
+    use_cache: bool = True,
+) -> tuple[dict[int, Cost], Cost]:
+    """
+    Cost of a whole contract: every utility with its own tariffs, plus the contract tariffs
+    applied once on top of their sum (so a contract PERCENTAGE covers all utilities). One
+    tariff index lookup and one usage query for everything; closed per-utility periods come
+    from the cost cache. Returns (cost per utility, combined cost); the per-utility Cost
+    objects may be shared and must not be modified.
+    """
+    generation = cost_cache.generation()
+    utils = db.query(Utility).filter(Utility.contract_id == contract_id).order_by(Utility.id).all()
+    indexes = tariff_indexes.get_many(db, [u.id for u in utils], [contract_id])
     today = date.today()
-    if end > today:
-        end = today
-
-    # collect tariffs
-    tariffs = list(
-        db.query(Tariff).filter(
-            Tariff.is_active == True,
-            Tariff.utility_id == utility_id
-        )
-    )
-    if include_contract_tariffs and util.contract_id is not None:
-        tariffs += list(
-            db.query(Tariff).filter(
-                Tariff.is_active == True,
-                Tariff.contract_id == util.contract_id,
-                Tariff.utility_id == None
-            )
-        )
-
-    cost = Cost()
-
-    for t in tariffs:
-        clipped = _clip_period(start, end, t.start_date, t.end_date)
-        if not clipped:
-            continue
-        p_start, p_end = clipped
+    end_c = min(end, today)
+    cacheable = use_cache and cost_cache.cacheable(end)
+
+    per_utility: dict[int, Cost] = {}
+    planned = []
+    for util in utils:
+        cached = cost_cache.get((util.id, start, end, False, False)) if cacheable else None
+        if cached is not None:
+            per_utility[util.id] = cached
+        else:
+            planned.append((util, plan_tariffs(util, [indexes[("utility", util.id)]], start, end_c)))
 
-        is_contract_scope = (t.utility_id is None)
+    contract_plans = [
+        (t, p_start, p_end, (contract_id, None, p_start, p_end, True))
+        for t, p_start, p_end in indexes[("contract", contract_id)].overlapping(start, end_c)
+    ]
+    periods = [period for _, plans in planned for *_, period in plans] + [period for *_, period in contract_plans]
+    usages = iter(get_usage_for_periods(db, periods))
 
-        usage = get_usage_for_period(
-            db=db,
-            contract_id=util.contract_id if is_contract_scope else None,
-            utility_id=None if is_contract_scope else util.id,
-            start=p_start,
-            end=p_end,
-            for_contract_scope=is_contract_scope,
-        )
+    def apply(cost: Cost, plans) -> None:
+        for t, p_start, p_end, _ in plans:
+            calc = TariffCalculatorFactory.get_calculator(t.tariff_sort)
+            calc.calculate(t, cost, next(usages), p_start, p_end)
 
-        calc = TariffCalculatorFactory.get_calculator(t.tariff_sort)
-        calc.calculate(t, cost, usage, p_start, p_end)
+    for util, plans in planned:
+        cost = per_utility[util.id] = Cost()
+        apply(cost, plans)
+        if cacheable:
+            cost_cache.put((util.id, start, end, False, False), cost, util.contract_id, generation)
 
-    return cost  # IMPORTANT: return ONLY the Cost object
+    combined = Cost()
+    for util in utils:
+        cost = per_utility[util.id]
+        for name in ("gas", "stand_i", "stand_ii", "single", "fixed", "variable", "tax", "network", "discount"):
+            setattr(combined, name, getattr(combined, name) + getattr(cost, name))
+        combined.tariff_specification.extend(cost.tariff_specification)
+    apply(combined, contract_plans)
+    return {u.id: per_utility[u.id] for u in utils}, combined
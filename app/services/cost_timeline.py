@@ -0,0 +1,217 @@
+# app/services/cost_timeline.py
+"""
+Dense per-day (or per-hour) usage and cost series for one utility.
+
+Built in one pass over the same tariff plans as compute_utility_costs:
+- DAY/MONTH/YEAR tariffs are spread evenly over the steps of their clipped window;
+- KWH/M3 tariffs follow the meter: each step gets the delta between the last readings
+  before its two boundaries (reading_daily for days, raw readings for hours; with
+  USAGE_MODE=interpolate the stands at both boundaries, linear between the readings),
+  or for a SOLAR utility the production totals stamped inside it. The last
+  step of a window takes whatever the aggregate usage of that window differs from the
+  summed deltas (the aggregate reads through the end date and drops negative usage);
+- a PERCENTAGE tariff applies to the base accrued in each step by the tariffs before it.
+Every line is linear in its steps, so per bucket the steps add up to the aggregate
+/utilities/{id}/cost of the same range, and sum(total) rounds to its total.
+"""
+from __future__ import annotations
+from bisect import bisect_left
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Literal
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.db.models.reading import Reading
+from app.db.models.reading_daily import ReadingDaily
+from app.db.models.utility import Utility
+from app.services.cost_calculator import plan_tariffs, tariff_scopes
+from app.services.reading_series import from_milli, to_epoch_us
+from app.services.tariff_index import tariff_indexes
+from app.services.usage_calculator import ELECTRIC_TYPES, GAS_TYPES, SOLAR_TYPES, USAGE_MODE, get_usage_for_periods, load_series
+
+Resolution = Literal["day", "hour"]
+
+BUCKET_NAMES = ("gas", "stand_i", "stand_ii", "single", "fixed", "variable", "tax", "network", "discount")
+_BASE_BUCKETS = ("gas", "stand_i", "stand_ii", "single", "fixed", "variable")
+_STEPS_PER_DAY = {"day": 1, "hour": 24}
+_PER_DAY = {"DAY": Decimal(1), "MONTH": Decimal(1) / Decimal(30), "YEAR": Decimal(1) / Decimal(365)}
+
+# tariff_sort -> Cost attribute, as applied by the calculators in app.services.tariff_calculators
+BUCKETS = {
+    "NORMAL": "stand_ii",
+    "REDUCED": "stand_i",
+    "SINGLE": "single",
+    "FIXED": "fixed",
+    "VARIABLE": "variable",
+    "TAX": "tax",
+    "NETWORK": "network",
+}
+
+MeterKey = tuple[int, str]  # (utility_id, unit)
+
+def _meter(util_type: str) -> tuple[str, str]:
+    # (reading unit, usage frequency), as get_usage_for_periods assigns them
+    return ("m3", "M3") if util_type in GAS_TYPES else ("kwh", "KWH")
+
+def _meter_samples(db: Session, keys: set[MeterKey], lo: datetime, hi: datetime, hourly: bool) -> dict[MeterKey, tuple[list, list]]:
+    """(timestamps, values) per meter: the last stand before `lo`, then the stands in [lo, hi)."""
+    uids = sorted({uid for uid, _ in keys})
+    samples: dict[MeterKey, tuple[list, list]] = {k: ([], []) for k in keys}
+
+    def add(uid, unit, ts, value):
+        series = samples.get((uid, unit))
+        if series is not None:
+            series[0].append(ts)
+            series[1].append(value)
+
+    # lo is a midnight, so the last stand before it is the last stand of an earlier day
+    baseline = (
+        select(ReadingDaily.utility_id, ReadingDaily.unit, ReadingDaily.last_ts, ReadingDaily.last_value)
+        .where(ReadingDaily.utility_id.in_(uids), ReadingDaily.day < lo.date())
+        .distinct(ReadingDaily.utility_id, ReadingDaily.unit)
+        .order_by(ReadingDaily.utility_id, ReadingDaily.unit, ReadingDaily.day.desc())
+    )
+    for row in db.execute(baseline):
+        add(*row)
+
+    if hourly:
+        unit = func.lower(Reading.unit)
+        rows = db.execute(
+            select(Reading.utility_id, unit, Reading.timestamp, Reading.value)
+            .where(Reading.utility_id.in_(uids), Reading.timestamp >= lo, Reading.timestamp < hi)
+            .order_by(Reading.utility_id, unit, Reading.timestamp)
+        )
+    else:
+        rows = db.execute(
+            select(ReadingDaily.utility_id, ReadingDaily.unit, ReadingDaily.last_ts, ReadingDaily.last_value)
+            .where(ReadingDaily.utility_id.in_(uids), ReadingDaily.day >= lo.date(), ReadingDaily.day < hi.date())
+            .order_by(ReadingDaily.utility_id, ReadingDaily.unit, ReadingDaily.day)
+        )
+    for row in rows:
+        add(*row)
+    return samples
+
+def _step_deltas(series: tuple[list, list], bounds: list[datetime]) -> list[Decimal]:
+    # usage per step: last stand before its end minus last stand before its start (0 while there is none)
+    ts, values = series
+    stands = []
+    for b in bounds:
+        i = bisect_left(ts, b)
+        stands.append(values[i - 1] if i else None)
+    return [
+        b - a if a is not None and b is not None else Decimal("0")
+        for a, b in zip(stands, stands[1:])
+    ]
+
+def _step_sums(series: tuple[list, list], bounds: list[datetime]) -> list[Decimal]:
+    # production per step (SOLAR): the daily totals stamped inside it
+    ts, values = series
+    cuts = [bisect_left(ts, b) for b in bounds]
+    return [sum(values[i:j], Decimal("0")) for i, j in zip(cuts, cuts[1:])]
+
+def _interpolated_deltas(db: Session, keys: set[MeterKey], bounds: list[datetime]) -> dict[MeterKey, list[Decimal]]:
+    # USAGE_MODE=interpolate: stands at every step boundary, linear between the readings
+    series = load_series(db, {k: (bounds[0], bounds[-1]) for k in keys})
+    us = np.array([to_epoch_us(b) for b in bounds], dtype=np.int64)
+    return {k: [from_milli(d) for d in np.diff(series[k].stands_at(us)).tolist()] for k in keys}
+
+def cost_timeline(
+    db: Session,
+    utility_id: int,
+    start: date,
+    end: date,
+    resolution: Resolution = "day",
+    include_contract_tariffs: bool = True,
+) -> dict:
+    util = db.get(Utility, utility_id)
+    if util is None:
+        raise ValueError("Utility not found")
+
+    end = max(min(end, date.today()), start)  # clip end to today, like the aggregate
+    per_day = _STEPS_PER_DAY[resolution]
+    step = timedelta(days=1) / per_day
+    lo = datetime.combine(start, time.min)
+    n = (end - start).days * per_day
+    bounds = [lo + i * step for i in range(n + 1)]
+
+    contract_ids = [util.contract_id] if include_contract_tariffs and util.contract_id is not None else []
+    indexes = tariff_indexes.get_many(db, [utility_id], contract_ids)
+    plans = plan_tariffs(util, tariff_scopes(util, indexes, include_contract_tariffs), start, end)
+    usages = get_usage_for_periods(db, [period for *_, period in plans])
+
+    # meters feeding each scope's usage, per frequency
+    own_unit, own_freq = _meter(util.type)
+    metered = util.type in GAS_TYPES or util.type in ELECTRIC_TYPES or util.type in SOLAR_TYPES
+    meters: dict[bool, dict[str, list[MeterKey]]] = {False: {own_freq: [(util.id, own_unit)]} if metered else {}, True: {}}
+    if contract_ids:
+        for uid, type_ in db.query(Utility.id, Utility.type).filter(Utility.contract_id == util.contract_id):
+            if type_ in GAS_TYPES or type_ in ELECTRIC_TYPES:  # as get_usage_for_periods: no production, no unknown types
+                unit, freq = _meter(type_)
+                meters[True].setdefault(freq, []).append((uid, unit))
+
+    wanted = {k for scope in meters.values() for keys in scope.values() for k in keys} | {(util.id, own_unit)}
+    production = {(util.id, own_unit)} if util.type in SOLAR_TYPES else set()
+    deltas: dict[MeterKey, list[Decimal]] = {}
+    sampled = wanted
+    if USAGE_MODE == "interpolate":
+        deltas = _interpolated_deltas(db, wanted - production, bounds)
+        sampled = production
+    if sampled:
+        samples = _meter_samples(db, sampled, lo, bounds[-1], per_day > 1)
+        for k in sampled:
+            deltas[k] = _step_sums(samples[k], bounds) if k in production else _step_deltas(samples[k], bounds)
+
+    buckets = {name: [Decimal("0")] * n for name in BUCKET_NAMES}
+    for (t, p_start, p_end, period), usage in zip(plans, usages):
+        if t.tariff_sort == "PERCENTAGE":
+            rate = Decimal(t.amount) / Decimal("100")
+            discount = buckets["discount"]
+            for i in range(n):
+                base = sum(buckets[name][i] for name in _BASE_BUCKETS)
+                if base:
+                    discount[i] += base * rate
+            continue
+
+        bucket = BUCKETS.get(t.tariff_sort)
+        if bucket is None:
+            raise ValueError(f"No calculator for sort {t.tariff_sort}")
+        line = buckets[bucket]
+        i0, i1 = (p_start - start).days * per_day, (p_end - start).days * per_day
+        amount = Decimal(t.amount)
+
+        if t.frequency in _PER_DAY:
+            per_step = amount * _PER_DAY[t.frequency] / per_day
+            for i in range(i0, i1):
+                line[i] += per_step
+        elif t.frequency in ("KWH", "M3"):
+            used = [Decimal("0")] * (i1 - i0)
+            for key in meters[period[4]].get(t.frequency, []):
+                for j, d in enumerate(deltas[key][i0:i1]):
+                    used[j] += d
+            used[-1] += usage.get(t.frequency, Decimal("0")) - sum(used)
+            for j, u in enumerate(used):
+                line[i0 + j] += amount * u
+        else:
+            raise ValueError(f"Unsupported frequency: {t.frequency}")
+
+    own = deltas[(util.id, own_unit)]
+    points = []
+    for i in range(n):
+        point = {name: buckets[name][i] for name in BUCKET_NAMES}
+        point["total"] = sum(point.values())
+        point["start"] = bounds[i]
+        point["end"] = bounds[i + 1]
+        point["usage"] = own[i]
+        points.append(point)
+
+    return {
+        "utility_id": utility_id,
+        "start": start,
+        "end": end,
+        "resolution": resolution,
+        "unit": "m3" if own_freq == "M3" else "kWh",
+        "points": points,
+    }
@@ -0,0 +1,33 @@
+# app/services/csv_stream.py
+from __future__ import annotations
+import codecs
+import csv
+from typing import BinaryIO, Iterator
+
+from fastapi import UploadFile
+
+READ_SIZE = 1 << 16  # 64 KiB per read from the spooled upload
+
+def iter_text_lines(fileobj: BinaryIO, encoding: str = "utf-8", read_size: int = READ_SIZE) -> Iterator[str]:
+    """
+    Decode a binary stream incrementally and yield it line by line (newlines kept),
+    holding at most one read buffer plus one partial line in memory.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    tail = ""
+    while True:
+        chunk = fileobj.read(read_size)
+        text = tail + decoder.decode(chunk, final=not chunk)
+        lines = text.split("\n")
+        tail = lines.pop()
+        for line in lines:
+            yield line + "\n"
+        if not chunk:
+            break
+    if tail:
+        yield tail
+
+def iter_csv_rows(file: UploadFile, encoding: str = "utf-8") -> Iterator[dict]:
+    """Stream an uploaded CSV as dict rows without reading the whole upload into memory."""
+    file.file.seek(0)
+    yield from csv.DictReader(iter_text_lines(file.file, encoding))
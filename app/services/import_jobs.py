@@ -0,0 +1,221 @@
+# app/services/import_jobs.py
+"""
+Background CSV imports.
+
+The upload is spooled to IMPORT_SPOOL_DIR and a job id is returned at once; a worker
+thread from a small pool runs the import. Inside a job, a reader thread decodes and
+splits the CSV into row batches on a bounded queue (producer) while the job thread
+feeds them to the importer and writes to the DB (consumer), so parsing the next batch
+overlaps the database round trips of the previous one. Progress is read from the
+importer's counters after every batch. Large files are parsed by the process pool in
+app.services.parallel_parse and handed over as typed rows in timestamp order.
+
+Jobs live in this process only: with several workers, poll the one that accepted the upload
+(or pin /import/jobs to one worker).
+"""
+from __future__ import annotations
+import csv
+import logging
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import BinaryIO, Callable, Literal
+
+from sqlalchemy.orm import Session
+
+from app.db.database import session_scope
+from app.services.csv_stream import iter_text_lines
+from app.services.import_ledger import file_digest
+from app.services.meter_import import MeterReadingImporter
+from app.services.parallel_parse import iter_meter_rows, iter_solar_rows, parse_file, use_parallel_parse
+from app.services.solar_import import SolarReadingImporter
+
+logger = logging.getLogger(__name__)
+
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "2"))
+IMPORT_SPOOL_DIR = os.getenv("IMPORT_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "energy-imports"))
+IMPORT_JOBS_KEPT = int(os.getenv("IMPORT_JOBS_KEPT", "100"))  # finished jobs remembered for status polls
+
+BATCH_ROWS = 1000   # rows per producer -> consumer hand-off
+QUEUE_BATCHES = 8   # parsed batches buffered ahead of the DB writer
+
+JobKind = Literal["meter-readings", "solar-readings"]
+JobStatus = Literal["queued", "running", "done", "failed"]
+
+IMPORTERS: dict[str, Callable[[Session], MeterReadingImporter | SolarReadingImporter]] = {
+    "meter-readings": MeterReadingImporter,
+    "solar-readings": SolarReadingImporter,
+}
+
+@dataclass
+class ImportJob:
+    id: str
+    kind: JobKind
+    filename: str
+    path: str
+    force: bool = False
+    status: JobStatus = "queued"
+    rows: int = 0
+    counts: dict = field(default_factory=dict)
+    error: str | None = None
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+
+    def snapshot(self) -> dict:
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "filename": self.filename,
+            "status": self.status,
+            "rows": self.rows,
+            "inserted": self.counts.get("inserted", self.counts.get("solar_rows", 0)),
+            "updated": self.counts.get("updated", 0),
+            "skipped": self.counts.get("skipped", 0),
+            "counts": dict(self.counts),
+            "elapsed_s": round(elapsed, 3),
+            "rows_per_s": round(self.rows / elapsed, 1) if elapsed else 0.0,
+            "error": self.error,
+        }
+
+_DONE = object()
+
+def _batched(method: str, calls, out: queue.Queue, stop: threading.Event) -> bool:
+    # hand (importer method, [args, ...]) batches to the job thread; False once the job gave up
+    batch = []
+    for args in calls:
+        batch.append(args)
+        if len(batch) >= BATCH_ROWS:
+            out.put((method, batch))
+            batch = []
+            if stop.is_set():
+                return False
+    if batch:
+        out.put((method, batch))
+    return True
+
+def _produce(kind: str, fileobj: BinaryIO, out: queue.Queue, stop: threading.Event) -> None:
+    # reader thread: parse the spooled file, hand the rows over in batches
+    try:
+        if use_parallel_parse(fileobj.name):
+            columns = parse_file(kind, fileobj.name)
+            rows = iter_meter_rows(columns) if kind == "meter-readings" else iter_solar_rows(columns)
+            if not _batched("parse_error", ((e,) for e in columns.errors), out, stop):
+                return
+            if not _batched("feed_parsed", rows, out, stop):
+                return
+        elif not _batched("feed", ((row,) for row in csv.DictReader(iter_text_lines(fileobj))), out, stop):
+            return
+        out.put(_DONE)
+    except BaseException as e:  # surface parse errors in the job thread
+        out.put(e)
+
+class ImportJobRunner:
+    def __init__(self, workers: int = IMPORT_WORKERS, spool_dir: str = IMPORT_SPOOL_DIR):
+        self.spool_dir = spool_dir
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="import-job")
+        self._lock = threading.Lock()
+        self._jobs: OrderedDict[str, ImportJob] = OrderedDict()
+
+    def submit(self, kind: JobKind, filename: str, upload: BinaryIO, force: bool = False) -> ImportJob:
+        """Spool `upload` to disk and queue the import; returns immediately."""
+        os.makedirs(self.spool_dir, exist_ok=True)
+        job_id = uuid.uuid4().hex
+        path = os.path.join(self.spool_dir, f"{job_id}.csv")
+        with open(path, "wb") as f:
+            shutil.copyfileobj(upload, f, 1 << 20)
+
+        job = ImportJob(id=job_id, kind=kind, filename=filename, path=path, force=force)
+        with self._lock:
+            self._jobs[job_id] = job
+            self._forget_old()
+        future = self._executor.submit(self._run, job)
+        future.add_done_callback(lambda f: self._cancelled(job) if f.cancelled() else None)
+        return job
+
+    def get(self, job_id: str) -> ImportJob | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def recent(self) -> list[ImportJob]:
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+    def shutdown(self) -> None:
+        """Stop taking jobs; queued ones are cancelled (and their spool files removed), running ones finish."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _cancelled(self, job: ImportJob) -> None:
+        # a queued job cancelled at shutdown never reaches _run, which would remove its spool file
+        job.status = "failed"
+        job.error = "cancelled at shutdown"
+        job.finished_at = time.time()
+        logger.warning("Import job %s (%s, %s) cancelled at shutdown", job.id, job.kind, job.filename)
+        self._remove_spool(job)
+
+    @staticmethod
+    def _remove_spool(job: ImportJob) -> None:
+        try:
+            os.remove(job.path)
+        except OSError:
+            pass
+
+    def _forget_old(self) -> None:
+        finished = [j.id for j in self._jobs.values() if j.status in ("done", "failed")]
+        for job_id in finished[: max(0, len(self._jobs) - IMPORT_JOBS_KEPT)]:
+            del self._jobs[job_id]
+
+    def _run(self, job: ImportJob) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            with open(job.path, "rb") as f, session_scope() as db:
+                importer = IMPORTERS[job.kind](db, file_digest=file_digest(f), force=job.force)
+                if not importer.unchanged_file:  # a known upload is done without reading it
+                    self._pump(job, f, importer)
+                job.counts = importer.counts()
+            job.status = "done"
+            logger.info("Import job %s (%s, %s) finished: %s", job.id, job.kind, job.filename, job.counts)
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            logger.exception("Import job %s (%s, %s) failed", job.id, job.kind, job.filename)
+        finally:
+            job.finished_at = time.time()
+            self._remove_spool(job)
+
+    def _pump(self, job: ImportJob, f: BinaryIO, importer) -> None:
+        # consumer side: apply the reader thread's batches to the importer
+        batches: queue.Queue = queue.Queue(maxsize=QUEUE_BATCHES)
+        stop = threading.Event()
+        reader = threading.Thread(target=_produce, args=(job.kind, f, batches, stop), daemon=True)
+        reader.start()
+        try:
+            while (item := batches.get()) is not _DONE:
+                if isinstance(item, BaseException):
+                    raise item
+                method, batch = item
+                call = getattr(importer, method)
+                for args in batch:
+                    call(*args)
+                job.rows += len(batch)
+                job.counts = importer.counts()
+            importer.finish()
+        finally:
+            stop.set()
+            while reader.is_alive():  # unblock a producer waiting on a full queue
+                try:
+                    batches.get_nowait()
+                except queue.Empty:
+                    reader.join(0.05)
+
+import_jobs = ImportJobRunner()
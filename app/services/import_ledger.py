@@ -0,0 +1,61 @@
+# app/services/import_ledger.py
+"""
+Content-hash ledger for idempotent imports.
+
+A whole upload is fingerprinted by the sha256 of its bytes; the solar importer also
+fingerprints each chunk (a run of rows sharing one production date). A fingerprint is
+recorded in the same transaction as the rows it covers, so a listed hash means its rows
+are in the database and a re-import can skip them without touching the data tables.
+
+The ledger is keyed on content, not on recency: a hash stays listed after a later import
+overwrote its rows. Re-importing an older file (or a chunk of one) after a newer one with
+different values for the same days is skipped, and the newer values stay. Pass force=True
+(?force=true on the import routes) to write it again and make it win.
+
+A file is only recorded when none of its rows was skipped: rows without a contract or
+utility for their date, or that did not parse, are read again on the next upload of the
+same file, once the missing contract or utility may exist.
+"""
+from __future__ import annotations
+import hashlib
+from typing import BinaryIO, Iterable, Literal
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.db.models.import_ledger import ImportLedger
+
+Scope = Literal["file", "chunk"]
+
+READ_SIZE = 1 << 20
+
+def file_digest(fileobj: BinaryIO) -> str:
+    """sha256 of a seekable binary file; leaves it rewound."""
+    fileobj.seek(0)
+    h = hashlib.sha256()
+    while chunk := fileobj.read(READ_SIZE):
+        h.update(chunk)
+    fileobj.seek(0)
+    return h.hexdigest()
+
+def seen(db: Session, kind: str, scope: Scope, digests: Iterable[str]) -> dict[str, int]:
+    """digest -> recorded row count, for the `digests` already in the ledger."""
+    digests = list(digests)
+    if not digests:
+        return {}
+    return dict(db.execute(
+        select(ImportLedger.digest, ImportLedger.rows).where(
+            ImportLedger.kind == kind,
+            ImportLedger.scope == scope,
+            ImportLedger.digest.in_(digests),
+        )
+    ).all())
+
+def record(db: Session, kind: str, scope: Scope, entries: Iterable[tuple[str, int]]) -> None:
+    """Add (digest, rows) entries; already listed digests are left alone."""
+    rows = [{"kind": kind, "scope": scope, "digest": d, "rows": n} for d, n in entries]
+    if rows:
+        db.execute(pg_insert(ImportLedger).values(rows).on_conflict_do_nothing(
+            index_elements=[ImportLedger.kind, ImportLedger.scope, ImportLedger.digest],
+        ))
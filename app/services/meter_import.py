@@ -0,0 +1,247 @@
+# app/services/meter_import.py
+from __future__ import annotations
+import logging
+from datetime import datetime, time
+from decimal import Decimal, InvalidOperation
+from typing import Iterable
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.db.models.contract import Contract
+from app.db.models.reading import Reading
+from app.db.models.utility import Utility
+from app.services.cost_cache import readings_changed
+from app.services.import_ledger import record, seen
+from app.services.net_energy import refresh_net_energy
+from app.services.reading_cache import mark_stale
+from app.services.reading_rollup import ReadingSpans, note_span, refresh_daily_rollup
+from app.services.reading_series import ReadingSeries, to_milli
+
+logger = logging.getLogger(__name__)
+
+# rows buffered before one multi-row write
+CHUNK_SIZE = 5000
+
+# CSV column -> utility type, in the order the legacy importer applied them
+STAND_COLUMNS = (
+    ("stand_i", "REDUCED"),   # legacy/night
+    ("stand_ii", "NORMAL"),   # day/single
+    ("gas", "GAS"),
+)
+
+# ---------- parsing ----------
+
+def parse_decimal(raw: str | None) -> Decimal | None:
+    if raw is None:
+        return None
+    s = raw.strip()
+    if s == "":
+        return None
+    # tolerate 1,234.56 style input
+    s = s.replace(" ", "").replace(",", "")
+    try:
+        return Decimal(s)
+    except InvalidOperation:
+        return None
+
+def parse_timestamp(raw: str | None) -> datetime:
+    # Accept both full ISO and plain date (anything without a "T" is snapped to midnight)
+    raw_ts = (raw or "").strip()
+    if "T" in raw_ts:
+        return datetime.fromisoformat(raw_ts)
+    return datetime.combine(datetime.fromisoformat(raw_ts).date(), time.min)
+
+# ---------- in-memory lookups ----------
+
+class _ContractLookup:
+    """All contracts, resolved per timestamp like `start_date <= ts <= end_date ORDER BY start_date DESC`."""
+
+    def __init__(self, db: Session):
+        rows = db.execute(
+            select(Contract.id, Contract.start_date, Contract.end_date)
+            .where(Contract.start_date.is_not(None), Contract.end_date.is_not(None))
+            .order_by(Contract.start_date.desc())
+        ).all()
+        self._spans = [
+            (cid, datetime.combine(s, time.min), datetime.combine(e, time.min)) for cid, s, e in rows
+        ]
+        # consecutive CSV rows usually share a timestamp day; remember the last answer only
+        self._last: tuple[datetime, int | None] | None = None
+
+    def contract_for(self, ts: datetime) -> int | None:
+        if self._last is not None and self._last[0] == ts:
+            return self._last[1]
+        found = next((cid for cid, s, e in self._spans if s <= ts <= e), None)
+        self._last = (ts, found)
+        return found
+
+# ---------- engine ----------
+
+class MeterReadingImporter:
+    """
+    Set-based importer for meter-reading CSV rows.
+
+    Contracts and utilities are loaded once, each utility's history is loaded once
+    on first use into a compact ReadingSeries, and writes are buffered and flushed
+    as one multi-row statement per chunk instead of several SELECTs per row. Rows
+    can be fed from a generator: only the current chunk is held as Python objects.
+    """
+
+    KIND = "meter-readings"
+
+    def __init__(self, db: Session, chunk_size: int = CHUNK_SIZE, file_digest: str | None = None, force: bool = False):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.inserted = 0
+        self.updated = 0
+        self.skipped = 0
+        self.unchanged = 0
+
+        # the upsert is idempotent already; the file ledger only saves re-reading a known upload
+        self.file_digest = file_digest
+        known = seen(db, self.KIND, "file", [file_digest]) if file_digest and not force else {}
+        self.unchanged_file = file_digest in known
+        if self.unchanged_file:
+            self.unchanged = known[file_digest]
+
+        self._contracts = _ContractLookup(db)
+        # (contract_id, TYPE) -> (utility_id, type); lowest id wins like the old .first()
+        self._utilities: dict[tuple[int, str], tuple[int, str]] = {}
+        for uid, cid, type_ in db.execute(
+            select(Utility.id, Utility.contract_id, Utility.type).order_by(Utility.id)
+        ):
+            if cid is not None and type_:
+                self._utilities.setdefault((cid, type_.upper()), (uid, type_))
+
+        self._series: dict[int, ReadingSeries] = {}
+        # (utility_id, ts) -> (value, unit); last write for a key wins
+        self._pending: dict[tuple[int, datetime], tuple[Decimal, str]] = {}
+
+    def _series_for(self, utility_id: int) -> ReadingSeries:
+        series = self._series.get(utility_id)
+        if series is None:
+            rows = self.db.execute(
+                select(Reading.timestamp, Reading.value)
+                .where(Reading.utility_id == utility_id)
+                .order_by(Reading.timestamp)
+                .execution_options(yield_per=self.chunk_size)
+            )
+            series = self._series[utility_id] = ReadingSeries(rows)
+        return series
+
+    def _stage(self, utility_id: int, util_type: str, ts: datetime, value: Decimal) -> None:
+        series = self._series_for(utility_id)
+
+        # monotonic guard (stands must not go backwards), compared as stored: numeric(10, 3)
+        milli = to_milli(value)
+        prev = series.last_before(ts)
+        if prev is not None and milli < prev:
+            self.skipped += 1
+            return
+
+        unit = "m3" if util_type == "GAS" else "kWh"
+        if series.has(ts):
+            self.updated += 1
+        else:
+            self.inserted += 1
+        self._pending[(utility_id, ts)] = (value, unit)
+        series.put(ts, milli)
+
+    def _feed(self, ts: datetime, stands: Iterable[tuple[str, Decimal | None]]) -> None:
+        contract_id = self._contracts.contract_for(ts)
+        if contract_id is None:
+            self.skipped += 1
+            logger.warning("No contract covering %s; row skipped", ts)
+            return
+
+        for type_, value in stands:
+            if value is None:
+                continue
+            utility = self._utilities.get((contract_id, type_))
+            if utility is None:
+                self.skipped += 1
+                logger.warning("No %s utility for contract %s at %s; value=%s skipped", type_, contract_id, ts, value)
+                continue
+            self._stage(utility[0], utility[1], ts, value)
+
+    def feed(self, row: dict) -> None:
+        try:
+            ts = parse_timestamp(row.get("consumption_date"))
+            self._feed(ts, ((type_, parse_decimal(row.get(column))) for column, type_ in STAND_COLUMNS))
+        except Exception as e:
+            self.skipped += 1
+            logger.warning("Skipped row (parse error): %s; row=%s", e, row)
+
+        if len(self._pending) >= self.chunk_size:
+            self.flush()
+
+    def feed_parsed(self, ts: datetime, stands: list[tuple[str, Decimal | None]]) -> None:
+        """Like feed(), for a row already parsed by app.services.parallel_parse."""
+        try:
+            self._feed(ts, stands)
+        except Exception as e:
+            self.skipped += 1
+            logger.warning("Skipped row: %s; ts=%s", e, ts)
+
+        if len(self._pending) >= self.chunk_size:
+            self.flush()
+
+    def parse_error(self, message: str) -> None:
+        self.skipped += 1
+        logger.warning("Skipped row (parse error): %s", message)
+
+    def feed_all(self, rows: Iterable[dict]) -> None:
+        if self.unchanged_file:
+            return
+        for row in rows:
+            self.feed(row)
+        self.finish()
+
+    def finish(self) -> None:
+        if self.unchanged_file:
+            return
+        self.flush()
+        # a file with skipped rows is not recorded: its missing contract or utility may exist next time
+        if self.file_digest and not self.skipped:
+            record(self.db, self.KIND, "file", [(self.file_digest, self.inserted + self.updated)])
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+
+        rows = []
+        spans: ReadingSpans = {}
+        for (utility_id, ts), (value, unit) in self._pending.items():
+            note_span(spans, utility_id, ts)
+            rows.append({
+                "timestamp": ts, "value": value, "unit": unit,
+                "source": "import", "utility_id": utility_id,
+            })
+        self._pending.clear()
+
+        # one upsert on the (utility_id, timestamp) unique index; existing rows keep their source.
+        # The rows go as executemany parameters (batched into multi-row VALUES by the driver), so
+        # the statement compiles once instead of once per chunk with every row inlined in it
+        stmt = pg_insert(Reading)
+        self.db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[Reading.utility_id, Reading.timestamp],
+                set_={
+                    "value": stmt.excluded.value,
+                    "unit": stmt.excluded.unit,
+                    "source": func.coalesce(func.nullif(Reading.source, ""), "import"),
+                },
+            ),
+            rows,
+        )
+
+        # keep the daily rollup current for the days this chunk touched
+        refresh_daily_rollup(self.db, spans)
+        refresh_net_energy(self.db, spans)
+        readings_changed(self.db, spans)
+        mark_stale(self.db, spans)
+
+    def counts(self) -> dict[str, int]:
+        return {"inserted": self.inserted, "updated": self.updated, "skipped": self.skipped, "unchanged": self.unchanged}
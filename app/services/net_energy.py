@@ -0,0 +1,206 @@
+# app/services/net_energy.py
+"""
+Electricity balance per day: grid meters and solar production together, per contract.
+
+NORMAL/REDUCED utilities carry cumulative meter stands, SOLAR utilities one production
+total per day. One pass over the days of `reading_daily` gives per contract and day:
+- net_import: the summed stand deltas of the contract's electric meters (last stand of
+  the day minus the last stand before it);
+- production: the summed SOLAR totals of the contract;
+and from them consumption = net_import + production, self_consumption (production used
+on site), grid_import and export.
+
+A meter outlives its contracts: the utility of a register type in a contract reads on from
+the stand the utility of that type ended at in the contract just before (ending at most a
+day before it starts), so the first day of a contract takes its delta from that stand. A
+lower stand means a replaced meter and starts afresh (that day has no delta), as does a
+gap between the contracts. Utilities without a contract are left out.
+
+The meters show no separate feed-in register, so production is netted per day: within a
+day every kWh produced is assumed to cover that day's consumption first. Self-consumption
+is therefore an upper bound, exact only for meters that run back on feed-in. Grid meters
+and solar panels usually belong to different contracts; without a contract the household
+balance nets the sums of all contracts per day.
+
+net_import and production are stored in `energy_net_daily` by the reading write paths
+(refresh_net_energy, after refresh_daily_rollup) and on utility type or contract changes
+(refresh_utility_net_energy), so reading a range costs O(days x contracts).
+"""
+from __future__ import annotations
+from datetime import date, timedelta
+from decimal import Decimal
+
+from sqlalchemy import delete, exists, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.db.models.contract import Contract
+from app.db.models.energy_net_daily import EnergyNetDaily
+from app.db.models.reading_daily import ReadingDaily
+from app.db.models.utility import Utility
+from app.services.reading_rollup import ReadingSpans
+from app.services.usage_calculator import ELECTRIC_TYPES, SOLAR_TYPES
+
+FIELDS = ("net_import", "production", "consumption", "self_consumption", "grid_import", "export")
+_ZERO = Decimal("0")
+
+def _utilities(db: Session) -> dict[int, tuple[str, int]]:
+    # utility_id -> (type, contract_id) of every utility in the balance
+    return {uid: (type_, cid) for uid, type_, cid in db.execute(
+        select(Utility.id, Utility.type, Utility.contract_id)
+        .where(Utility.type.in_(ELECTRIC_TYPES | SOLAR_TYPES), Utility.contract_id.is_not(None))
+    )}
+
+def balance(net_import: Decimal, production: Decimal) -> dict[str, Decimal]:
+    consumption = net_import + production
+    self_consumption = min(max(consumption, _ZERO), production)
+    return {
+        "net_import": net_import,
+        "production": production,
+        "consumption": consumption,
+        "self_consumption": self_consumption,
+        "grid_import": consumption - self_consumption,
+        "export": production - self_consumption,
+    }
+
+def compute_net_days(db: Session, start: date, end: date) -> list[dict]:
+    """net_import and production of every (contract, day) with readings in [start, end], from reading_daily."""
+    utilities = _utilities(db)
+    electric = [uid for uid, (t, _) in utilities.items() if t in ELECTRIC_TYPES]
+    spans = {cid: (s, e) for cid, s, e in db.execute(select(Contract.id, Contract.start_date, Contract.end_date))}
+
+    def follows(cid: int, previous: int) -> bool:
+        # `cid` starts at most a day after `previous` ends
+        (start_c, _), (_, end_p) = spans[cid], spans[previous]
+        return cid != previous and start_c is not None and end_p is not None and end_p + timedelta(days=1) >= start_c
+
+    # last stand per electric meter before the range, and per register type the latest of
+    # them (the stand a meter's first day in a next contract reads on from)
+    last: dict[int, Decimal] = {}
+    carried: dict[str, tuple[int, Decimal]] = {}  # type -> (contract_id, stand)
+    before = db.execute(
+        select(ReadingDaily.day, ReadingDaily.utility_id, ReadingDaily.last_value)
+        .where(ReadingDaily.utility_id.in_(electric), ReadingDaily.unit == "kwh", ReadingDaily.day < start)
+        .distinct(ReadingDaily.utility_id)
+        .order_by(ReadingDaily.utility_id, ReadingDaily.day.desc())
+    ).all()
+    for _, uid, value in sorted(before):
+        type_, cid = utilities[uid]
+        last[uid] = value
+        carried[type_] = (cid, value)
+
+    out: dict[tuple[int, date], list[Decimal]] = {}
+    for uid, day, value in db.execute(
+        select(ReadingDaily.utility_id, ReadingDaily.day, ReadingDaily.last_value)
+        .where(ReadingDaily.utility_id.in_(list(utilities)), ReadingDaily.unit == "kwh", ReadingDaily.day >= start, ReadingDaily.day <= end)
+        .order_by(ReadingDaily.day, ReadingDaily.utility_id)
+    ):
+        type_, cid = utilities[uid]
+        cell = out.setdefault((cid, day), [_ZERO, _ZERO])
+        if type_ in SOLAR_TYPES:
+            cell[1] += value  # one production total per day
+            continue
+        prev = last.get(uid)
+        if prev is None and type_ in carried:
+            from_cid, stand = carried[type_]
+            if follows(cid, from_cid) and value >= stand:
+                prev = stand
+        if prev is not None:
+            cell[0] += value - prev
+        last[uid] = value
+        carried[type_] = (cid, value)
+
+    return [
+        {"contract_id": cid, "day": day, "net_import": net, "production": produced}
+        for (cid, day), (net, produced) in out.items()
+    ]
+
+def _store(db: Session, start: date, end: date) -> None:
+    db.execute(delete(EnergyNetDaily).where(EnergyNetDaily.day >= start, EnergyNetDaily.day <= end))
+    rows = compute_net_days(db, start, end)
+    if rows:
+        db.execute(insert(EnergyNetDaily), rows)
+
+def _next_stand_day(db: Session, type_: str, after: date) -> date | None:
+    # the next day any meter of this register type has a stand: its delta may start at `after`
+    return db.scalar(
+        select(func.min(ReadingDaily.day))
+        .join(Utility, Utility.id == ReadingDaily.utility_id)
+        .where(Utility.type == type_, ReadingDaily.unit == "kwh", ReadingDaily.day > after)
+    )
+
+def refresh_net_energy(db: Session, spans: ReadingSpans) -> None:
+    """
+    Recompute the stored days that readings written in `spans` can change: their own days
+    and, for a meter, the next day a meter of its type has a stand (whose delta starts at
+    the changed stand, in this contract or the next). Call after refresh_daily_rollup and
+    before commit.
+    """
+    utilities = _utilities(db)
+    spans = {uid: span for uid, span in spans.items() if uid in utilities}
+    if not spans:
+        return
+    lo = min(a.date() for a, _ in spans.values())
+    hi = max(b.date() for _, b in spans.values())
+    for uid, (_, b) in spans.items():
+        type_ = utilities[uid][0]
+        if type_ in ELECTRIC_TYPES:
+            following = _next_stand_day(db, type_, b.date())
+            if following is not None:
+                hi = max(hi, following)
+    _store(db, lo, hi)
+
+def refresh_utility_net_energy(db: Session, utility_id: int, old_type: str | None) -> None:
+    """
+    Recompute the stored days of a utility whose type or contract changed: the days of its
+    readings and the next stand day after them for its old and new type. Call after the
+    change is flushed and before commit.
+    """
+    lo, hi = db.execute(
+        select(func.min(ReadingDaily.day), func.max(ReadingDaily.day))
+        .where(ReadingDaily.utility_id == utility_id, ReadingDaily.unit == "kwh")
+    ).one()
+    if lo is None:
+        return
+    new_type = db.scalar(select(Utility.type).where(Utility.id == utility_id))
+    for type_ in {old_type, new_type} & ELECTRIC_TYPES:
+        following = _next_stand_day(db, type_, hi)
+        if following is not None:
+            hi = max(hi, following)
+    _store(db, lo, hi)
+
+def ensure_net_energy(db: Session) -> None:
+    """Backfill the stored balance from scratch when it is empty but readings exist (first start)."""
+    if db.scalar(select(exists().where(EnergyNetDaily.day.is_not(None)))):
+        return
+    lo, hi = db.execute(
+        select(func.min(ReadingDaily.day), func.max(ReadingDaily.day))
+        .where(ReadingDaily.utility_id.in_(list(_utilities(db))), ReadingDaily.unit == "kwh")
+    ).one()
+    if lo is None:
+        return
+    _store(db, lo, hi)
+    db.commit()
+    print("✅ Daily net energy backfilled.")
+
+def net_energy(db: Session, start: date, end: date, contract_id: int | None = None) -> dict:
+    """
+    Balance of every day in [start, end] (days never written count as zero) and the totals,
+    for one contract or, without one, for the household: all contracts netted per day.
+    """
+    q = (
+        select(EnergyNetDaily.day, func.sum(EnergyNetDaily.net_import), func.sum(EnergyNetDaily.production))
+        .where(EnergyNetDaily.day >= start, EnergyNetDaily.day <= end)
+    )
+    if contract_id is not None:
+        q = q.where(EnergyNetDaily.contract_id == contract_id)
+    stored = {day: (net, produced) for day, net, produced in db.execute(q.group_by(EnergyNetDaily.day))}
+
+    points = []
+    totals = dict.fromkeys(FIELDS, _ZERO)
+    for i in range((end - start).days + 1):
+        day = start + timedelta(days=i)
+        point = {"day": day, **balance(*stored.get(day, (_ZERO, _ZERO)))}
+        for f in FIELDS:
+            totals[f] += point[f]
+        points.append(point)
+    return {"start": start, "end": end, "contract_id": contract_id, "unit": "kWh", "totals": totals, "points": points}
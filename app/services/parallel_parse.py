@@ -0,0 +1,225 @@
+# app/services/parallel_parse.py
+"""
+Multi-process parse stage for large CSV imports.
+
+The file on disk is split into byte ranges on line boundaries and every range is parsed
+in a process pool into compact typed columns (int64 epoch microseconds; every decimal as
+an int64 coefficient and int8 exponent, so it comes back as exactly the Decimal the row
+parser would have produced) instead of one dict and a few Decimal/datetime objects per row.
+The columns are concatenated in file order and stably sorted by timestamp, so rows with
+the same timestamp keep their file order (the last one still wins) and the importers see
+the readings in time order before their monotonicity checks and DB writes.
+
+Ranges are cut at newlines, so quoted fields must not contain line breaks; the importer
+CSVs never do. Small files are not worth the pool start-up: see PARALLEL_PARSE_MIN_BYTES.
+
+A worker spends about 1.3x the time of the streaming DictReader parse per row, and the
+importing process then rebuilds the rows serially (~40% of a DictReader parse), so the
+stage can only pay off with about 3 or more CPUs (bench/bench_parallel_parse.py). Scaling
+with 2/4/8 workers has not been measured on a multi-core host yet, so the pool is off unless
+PARSE_WORKERS is set; run the bench on the target machine before turning it on.
+"""
+from __future__ import annotations
+import csv
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterator
+
+import numpy as np
+
+from app.services.meter_import import STAND_COLUMNS, parse_decimal, parse_timestamp
+from app.services.reading_series import to_epoch_us
+
+# 1 = no pool, the streaming parse; worker scaling is unmeasured so far (see above)
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "1"))
+PARALLEL_PARSE_MIN_BYTES = int(os.getenv("PARALLEL_PARSE_MIN_BYTES", str(8 << 20)))
+RANGES_PER_WORKER = 4  # smaller ranges even out slow and fast workers
+
+MISSING = np.iinfo(np.int64).min
+
+@dataclass
+class ParsedColumns:
+    kind: str
+    ts: np.ndarray              # epoch microseconds
+    values: dict[str, np.ndarray]  # column -> decimal coefficient, MISSING where empty/unparsable
+    exponents: dict[str, np.ndarray]  # column -> decimal exponent (int8)
+    serials: list[str] | None   # solar only: panel serial per row
+    errors: list[str]           # rows whose timestamp did not parse
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+_VALUE_COLUMNS = {
+    "meter-readings": ("consumption_date", tuple(c for c, _ in STAND_COLUMNS)),
+    "solar-readings": ("production_date", ("energy_produced",)),
+}
+
+# ---------- splitting ----------
+
+def line_ranges(path: str, parts: int) -> tuple[str, list[tuple[int, int]]]:
+    """The header line and `parts` byte ranges of the body, each starting and ending on a line boundary."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        header = f.readline()
+        body = f.tell()
+        cuts = [body]
+        for i in range(1, parts):
+            target = body + (size - body) * i // parts
+            if target <= cuts[-1]:
+                continue
+            f.seek(target - 1)
+            f.readline()  # finish the line the target falls into
+            if f.tell() >= size:
+                break
+            if f.tell() > cuts[-1]:
+                cuts.append(f.tell())
+        cuts.append(size)
+    ranges = [(a, b) for a, b in zip(cuts, cuts[1:]) if b > a]
+    return header.decode("utf-8-sig", errors="replace"), ranges
+
+# ---------- worker ----------
+
+def _encode(raw: str | None) -> tuple[int, int]:
+    # (coefficient, exponent) of the Decimal parse_decimal would return; MISSING for empty,
+    # non-finite or oversized values
+    if raw is None:
+        return MISSING, 0
+    # plain [-+]digits[.digits] (after parse_decimal's clean-up) needs no Decimal at all
+    text = raw.strip().replace(" ", "").replace(",", "")
+    whole, _, frac = (text[1:] if text[:1] in ("-", "+") else text).partition(".")
+    digits = whole + frac
+    if digits.isascii() and digits.isdigit():
+        coef, exp = int(digits), -len(frac)
+        if text[:1] == "-":
+            coef = -coef
+    else:
+        value = parse_decimal(raw)
+        if value is None or not value.is_finite():
+            return MISSING, 0
+        sign, digit_tuple, exp = value.as_tuple()
+        coef = int("".join(map(str, digit_tuple)))
+        coef = -coef if sign else coef
+    if abs(coef) >= 2**63 or not -128 <= exp <= 127:
+        return MISSING, 0
+    return coef, exp
+
+def parse_range(kind: str, path: str, start: int, end: int, header: str) -> ParsedColumns:
+    """Parse the rows in bytes [start, end) of `path` (runs in a pool process)."""
+    ts_column, value_columns = _VALUE_COLUMNS[kind]
+    with open(path, "rb") as f:
+        f.seek(start)
+        text = f.read(end - start).decode("utf-8", errors="replace")
+
+    names = next(csv.reader([header]))
+    ts_at = names.index(ts_column) if ts_column in names else None
+    value_at = [names.index(c) if c in names else None for c in value_columns]
+    serial_at = names.index("panel_serial_nbr") if "panel_serial_nbr" in names else None
+
+    ts = []
+    values = [[] for _ in value_columns]
+    exponents = [[] for _ in value_columns]
+    serials = [] if kind == "solar-readings" else None
+    errors = []
+    for fields in csv.reader(text.splitlines()):
+        if not fields:
+            continue
+        try:
+            ts.append(to_epoch_us(parse_timestamp(fields[ts_at] if ts_at is not None and ts_at < len(fields) else None)))
+        except Exception as e:
+            errors.append(f"{e}; row={fields}")
+            continue
+        for coefs, exps, at in zip(values, exponents, value_at):
+            coef, exp = _encode(fields[at] if at is not None and at < len(fields) else None)
+            coefs.append(coef)
+            exps.append(exp)
+        if serials is not None:
+            serials.append(fields[serial_at].strip() if serial_at is not None and serial_at < len(fields) else "")
+
+    return ParsedColumns(
+        kind,
+        np.array(ts, dtype=np.int64),
+        {c: np.array(v, dtype=np.int64) for c, v in zip(value_columns, values)},
+        {c: np.array(v, dtype=np.int8) for c, v in zip(value_columns, exponents)},
+        serials,
+        errors,
+    )
+
+# ---------- pool ----------
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: the API process runs threads and holds DB connections, neither survives a fork well
+            _pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def shutdown() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+def parse_file(kind: str, path: str, workers: int = PARSE_WORKERS) -> ParsedColumns:
+    """Parse a whole CSV in the pool and return its rows in timestamp order (stable)."""
+    header, ranges = line_ranges(path, max(1, workers) * RANGES_PER_WORKER)
+    if workers <= 1:
+        chunks = [parse_range(kind, path, a, b, header) for a, b in ranges]
+    else:
+        pool = _get_pool()
+        chunks = list(pool.map(parse_range, *zip(*[(kind, path, a, b, header) for a, b in ranges])))
+
+    _, value_columns = _VALUE_COLUMNS[kind]
+    order = np.argsort(np.concatenate([c.ts for c in chunks]) if chunks else np.empty(0, dtype=np.int64), kind="stable")
+
+    def merged(arrays: list[np.ndarray], dtype) -> np.ndarray:
+        return np.concatenate(arrays)[order] if arrays else np.empty(0, dtype=dtype)
+
+    serials = None
+    if kind == "solar-readings":
+        flat = [s for c in chunks for s in c.serials]
+        serials = [flat[i] for i in order.tolist()]
+    return ParsedColumns(
+        kind,
+        merged([c.ts for c in chunks], np.int64),
+        {col: merged([c.values[col] for c in chunks], np.int64) for col in value_columns},
+        {col: merged([c.exponents[col] for c in chunks], np.int8) for col in value_columns},
+        serials,
+        [e for c in chunks for e in c.errors],
+    )
+
+def use_parallel_parse(path: str) -> bool:
+    return PARSE_WORKERS > 1 and os.path.getsize(path) >= PARALLEL_PARSE_MIN_BYTES
+
+# ---------- rows for the importers ----------
+
+def _decimals(columns: ParsedColumns, column: str) -> list[Decimal | None]:
+    return [
+        None if coef == MISSING else Decimal(coef).scaleb(exp)
+        for coef, exp in zip(columns.values[column].tolist(), columns.exponents[column].tolist())
+    ]
+
+def _datetimes(columns: ParsedColumns) -> list[datetime]:
+    # naive datetimes from epoch microseconds in one C loop (from_epoch_us per row otherwise)
+    return columns.ts.astype("datetime64[us]").tolist()
+
+def iter_meter_rows(columns: ParsedColumns) -> Iterator[tuple[datetime, list[tuple[str, Decimal | None]]]]:
+    """(timestamp, [(utility type, value or None), ...]) in timestamp order."""
+    stand = [(_decimals(columns, c), type_) for c, type_ in STAND_COLUMNS]
+    for i, ts in enumerate(_datetimes(columns)):
+        yield ts, [(type_, values[i]) for values, type_ in stand]
+
+def iter_solar_rows(columns: ParsedColumns) -> Iterator[tuple[datetime, str, Decimal | None]]:
+    """(production timestamp, panel serial, energy or None) in timestamp order."""
+    energy = _decimals(columns, "energy_produced")
+    for i, ts in enumerate(_datetimes(columns)):
+        yield ts, columns.serials[i], energy[i]
@@ -0,0 +1,349 @@
+# app/services/reading_cache.py
+"""
+In-process cache of the complete reading history of hot utilities.
+
+A utility's readings are held as parallel arrays sorted by timestamp (a ReadingSeries of
+epoch microseconds and values in thousandths, plus reading ids and codes into small unit /
+source name tables): 28 bytes per reading, no ORM objects. Range and point lookups are
+binary searches. Usage, the cost timeline and the per-utility reading listings read from it.
+
+- Loading is lazy: the first request for a utility fetches its history, and the histories
+  of all utilities missing from one batch come in one query.
+- Writes are incremental: the write paths queue the span they wrote (mark_stale) and after
+  commit that span is marked stale; the next request re-fetches only the span and merges it
+  into a new snapshot. Readings are never deleted, so a span re-fetch is always complete.
+- Entries are immutable snapshots, so readers need no lock; they are evicted least recently
+  used first once READING_CACHE_MB is exceeded. READING_CACHE_MB=0 disables the cache and
+  the callers query Postgres as before.
+
+The cache lives in this process only: writes made by another worker do not mark anything
+stale here. A history is therefore loaded again in full once it is READING_CACHE_TTL_S
+(default 300s) old, which bounds how stale a multi-worker setup can get; span refreshes
+of this process's own writes do not restart that clock.
+"""
+from __future__ import annotations
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import datetime
+from typing import Iterable
+
+import numpy as np
+from sqlalchemy import BigInteger, LargeBinary, and_, cast, event, extract, func, literal, or_, select, type_coerce
+from sqlalchemy.orm import Session
+
+from app.db.models.reading import Reading
+from app.services.reading_rollup import ReadingSpans
+from app.services.reading_series import ReadingSeries, from_epoch_us, from_milli, to_epoch_us
+
+READING_CACHE_MB = int(os.getenv("READING_CACHE_MB", "64"))
+# other worker processes cannot mark entries stale; bound how old a loaded history can get
+READING_CACHE_TTL_S = float(os.getenv("READING_CACHE_TTL_S", "300"))
+_ENTRY_OVERHEAD = 256  # bytes charged per entry on top of its arrays, so empty histories count too
+
+class CachedReadings:
+    """
+    All readings of one utility, sorted by timestamp. Never changed after construction;
+    a refresh builds a new instance.
+    """
+
+    __slots__ = ("series", "ids", "units", "sources", "unit_names", "source_names", "_by_unit")
+
+    def __init__(
+        self,
+        series: ReadingSeries,
+        ids: array,
+        units: array,
+        sources: array,
+        unit_names: tuple[str | None, ...],
+        source_names: tuple[str | None, ...],
+    ):
+        self.series = series
+        self.ids = ids
+        self.units = units      # codes into unit_names
+        self.sources = sources  # codes into source_names
+        self.unit_names = unit_names
+        self.source_names = source_names
+        self._by_unit: dict[str | None, ReadingSeries] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.series.timestamps, self.series.values, self.ids, self.units, self.sources)
+        return _ENTRY_OVERHEAD + sum(a.itemsize * len(a) for a in arrays)
+
+    def for_unit(self, unit: str | None) -> ReadingSeries:
+        """The readings in `unit` (case-insensitive; None for all) as a ReadingSeries."""
+        if unit is None:
+            return self.series
+        series = self._by_unit.get(unit)
+        if series is None:
+            codes = [c for c, name in enumerate(self.unit_names) if name is not None and name.lower() == unit]
+            if len(codes) == len(self.unit_names):
+                series = self.series
+            else:
+                keep = np.isin(np.frombuffer(self.units, dtype=np.uint16), codes)
+                ts = np.frombuffer(self.series.timestamps, dtype=np.int64)[keep]
+                vs = np.frombuffer(self.series.values, dtype=np.int64)[keep]
+                series = ReadingSeries.from_arrays(array("q", ts.tobytes()), array("q", vs.tobytes()))
+            self._by_unit[unit] = series
+        return series
+
+    def window(
+        self,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        after: tuple[datetime, int] | None = None,
+    ) -> tuple[int, int]:
+        """Index range [i, j) of the readings with start <= timestamp < end and (timestamp, id) > after."""
+        ts = self.series.timestamps
+        i = 0 if start is None else bisect_left(ts, to_epoch_us(start))
+        j = len(ts) if end is None else bisect_left(ts, to_epoch_us(end))
+        if after is not None:
+            us = to_epoch_us(after[0])
+            k = bisect_left(ts, us)
+            if k < len(ts) and ts[k] == us and self.ids[k] <= after[1]:
+                k += 1  # one reading per timestamp: only its id decides
+            i = max(i, k)
+        return i, max(i, j)
+
+    def rows(self, utility_id: int, i: int = 0, j: int | None = None) -> list[dict]:
+        """Readings i..j as the dicts the listing endpoints return."""
+        units, sources = self.unit_names, self.source_names
+        return [
+            {
+                "id": reading_id,
+                "timestamp": from_epoch_us(us),
+                "value": from_milli(milli),
+                "unit": units[u],
+                "source": sources[s],
+                "utility_id": utility_id,
+            }
+            for reading_id, us, milli, u, s in zip(
+                self.ids[i:j], self.series.timestamps[i:j], self.series.values[i:j], self.units[i:j], self.sources[i:j]
+            )
+        ]
+
+    def merged(self, fresh: CachedReadings, lo: datetime, hi: datetime) -> CachedReadings:
+        """A copy with the readings in [lo, hi] replaced by `fresh` (all readings of that span)."""
+        ts = self.series.timestamps
+        i, j = bisect_left(ts, to_epoch_us(lo)), bisect_right(ts, to_epoch_us(hi))
+
+        def recode(names, fresh_names, codes):
+            names = list(names)
+            remap = []
+            for name in fresh_names:
+                if name not in names:
+                    names.append(name)
+                remap.append(names.index(name))
+            return tuple(names), array("H", (remap[c] for c in codes))
+
+        unit_names, units = recode(self.unit_names, fresh.unit_names, fresh.units)
+        source_names, sources = recode(self.source_names, fresh.source_names, fresh.sources)
+        return CachedReadings(
+            ReadingSeries.from_arrays(
+                ts[:i] + fresh.series.timestamps + ts[j:],
+                self.series.values[:i] + fresh.series.values + self.series.values[j:],
+            ),
+            self.ids[:i] + fresh.ids + self.ids[j:],
+            self.units[:i] + units + self.units[j:],
+            self.sources[:i] + sources + self.sources[j:],
+            unit_names,
+            source_names,
+        )
+
+EMPTY = CachedReadings(ReadingSeries(), array("q"), array("H"), array("H"), (), ())
+
+def _load(db: Session, *where) -> dict[int, CachedReadings]:
+    # one row per (utility, unit, source) with its ids, timestamps and values packed as
+    # big-endian int8 bytea: no datetime, Decimal or row object per reading on the Python side
+    packed = literal(b"", LargeBinary)
+
+    def agg(expr):
+        return type_coerce(func.string_agg(func.int8send(cast(expr, BigInteger)), packed), LargeBinary)
+
+    parts: dict[int, list] = {}
+    for uid, unit, source, ids, ts, vs in db.execute(
+        select(
+            Reading.utility_id, Reading.unit, Reading.source,
+            agg(Reading.id),
+            agg(extract("epoch", Reading.timestamp) * 1_000_000),
+            agg(Reading.value * 1000),  # numeric(10, 3): exact thousandths
+        )
+        .where(*where)
+        .group_by(Reading.utility_id, Reading.unit, Reading.source)
+    ):
+        parts.setdefault(uid, []).append((unit, source, ids, ts, vs))
+
+    out = {}
+    for uid, groups in parts.items():
+        unit_names = tuple(dict.fromkeys(unit for unit, *_ in groups))
+        source_names = tuple(dict.fromkeys(source for _, source, *_ in groups))
+        cols = [np.concatenate([np.frombuffer(g[k], dtype=">i8") for g in groups]).astype(np.int64) for k in (2, 3, 4)]
+        lengths = [len(g[2]) // 8 for g in groups]
+        units = np.repeat([unit_names.index(g[0]) for g in groups], lengths).astype(np.uint16)
+        sources = np.repeat([source_names.index(g[1]) for g in groups], lengths).astype(np.uint16)
+        order = np.argsort(cols[1], kind="stable")
+        ids, ts, vs = (array("q", c[order].tobytes()) for c in cols)
+        out[uid] = CachedReadings(
+            ReadingSeries.from_arrays(ts, vs),
+            ids,
+            array("H", units[order].tobytes()),
+            array("H", sources[order].tobytes()),
+            unit_names,
+            source_names,
+        )
+    return out
+
+class ReadingCache:
+    def __init__(self, budget_bytes: int = READING_CACHE_MB << 20, ttl_s: float = READING_CACHE_TTL_S):
+        self.budget_bytes = budget_bytes
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[int, CachedReadings] = OrderedDict()
+        self._loaded_at: dict[int, float] = {}  # when each entry's full history was fetched
+        self._stale: dict[int, tuple[datetime, datetime]] = {}  # written span per cached utility
+        self._versions: dict[int, int] = {}  # bumped by every committed write of a utility
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.budget_bytes > 0
+
+    def get(self, db: Session, utility_id: int) -> CachedReadings:
+        return self.get_many(db, [utility_id])[utility_id]
+
+    def get_many(self, db: Session, utility_ids: Iterable[int]) -> dict[int, CachedReadings]:
+        """
+        The history of every utility; at most one query for the missing ones and one for
+        the stale spans of the cached ones. Read from a session without pending writes.
+        """
+        out: dict[int, CachedReadings] = {}
+        missing: list[int] = []
+        stale: dict[int, tuple[CachedReadings, tuple[datetime, datetime]]] = {}
+        now = time.monotonic()
+        loaded_at: dict[int, float] = {}  # load time of the stale entries
+        with self._lock:
+            for uid in dict.fromkeys(utility_ids):
+                entry = self._entries.get(uid)
+                if entry is not None and now - self._loaded_at[uid] >= self.ttl_s:
+                    entry = None  # may miss other workers' writes: load it again in full
+                    self.expirations += 1
+                if entry is None:
+                    missing.append(uid)
+                    self.misses += 1
+                elif uid in self._stale:
+                    stale[uid] = (entry, self._stale[uid])
+                    loaded_at[uid] = self._loaded_at[uid]
+                    self.refreshes += 1
+                else:
+                    out[uid] = entry
+                    self._entries.move_to_end(uid)
+                    self.hits += 1
+            versions = {uid: self._versions.get(uid, 0) for uid in (*missing, *stale)}
+
+        # queries run outside the lock; a write committed meanwhile bumps the version
+        # and the result is returned but not kept
+        if missing:
+            loaded = _load(db, Reading.utility_id.in_(missing))
+            for uid in missing:
+                out[uid] = loaded.get(uid, EMPTY)
+        if stale:
+            fresh = _load(db, or_(*(
+                and_(Reading.utility_id == uid, Reading.timestamp >= lo, Reading.timestamp <= hi)
+                for uid, (_, (lo, hi)) in stale.items()
+            )))
+            for uid, (entry, (lo, hi)) in stale.items():
+                out[uid] = entry.merged(fresh.get(uid, EMPTY), lo, hi)
+
+        with self._lock:
+            for uid, version in versions.items():
+                if self._versions.get(uid, 0) == version:
+                    self._stale.pop(uid, None)
+                    # a span refresh only brings in this process's writes: keep the load time
+                    self._store(uid, out[uid], loaded_at.get(uid, now))
+        return out
+
+    def _store(self, uid: int, entry: CachedReadings, loaded_at: float) -> None:
+        old = self._entries.pop(uid, None)
+        if old is not None:
+            self._bytes -= old.nbytes
+            del self._loaded_at[uid]
+        if entry.nbytes > self.budget_bytes:
+            return
+        self._entries[uid] = entry
+        self._loaded_at[uid] = loaded_at
+        self._bytes += entry.nbytes
+        while self._bytes > self.budget_bytes:
+            evicted_uid, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+            del self._loaded_at[evicted_uid]
+            self._stale.pop(evicted_uid, None)
+            self.evictions += 1
+
+    def invalidate(self, spans: ReadingSpans) -> None:
+        """Readings in `spans` were committed."""
+        with self._lock:
+            for uid, (lo, hi) in spans.items():
+                self._versions[uid] = self._versions.get(uid, 0) + 1
+                if uid in self._entries:
+                    prev = self._stale.get(uid)
+                    self._stale[uid] = (lo, hi) if prev is None else (min(prev[0], lo), max(prev[1], hi))
+
+    def clear(self) -> None:
+        with self._lock:
+            for uid in self._entries:
+                self._versions[uid] = self._versions.get(uid, 0) + 1
+            self._entries.clear()
+            self._loaded_at.clear()
+            self._stale.clear()
+            self._bytes = 0
+
+    def metrics(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.refreshes
+            return {
+                "entries": len(self._entries),
+                "readings": sum(len(e) for e in self._entries.values()),
+                "bytes": self._bytes,
+                "budget_bytes": self.budget_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+reading_cache = ReadingCache()
+
+# ---------- session hooks ----------
+
+_PENDING = "reading_cache_spans"
+
+def mark_stale(db: Session, spans: ReadingSpans) -> None:
+    """Queue the spans of readings written in this session; applied to the cache after commit."""
+    pending: ReadingSpans = db.info.setdefault(_PENDING, {})
+    for uid, (lo, hi) in spans.items():
+        prev = pending.get(uid)
+        pending[uid] = (lo, hi) if prev is None else (min(prev[0], lo), max(prev[1], hi))
+
+@event.listens_for(Session, "after_commit")
+def _apply_after_commit(session: Session) -> None:
+    pending = session.info.pop(_PENDING, None)
+    if pending:
+        reading_cache.invalidate(pending)
+
+@event.listens_for(Session, "after_rollback")
+def _drop_on_rollback(session: Session) -> None:
+    session.info.pop(_PENDING, None)
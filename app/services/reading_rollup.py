@@ -0,0 +1,66 @@
+# app/services/reading_rollup.py
+from __future__ import annotations
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import delete, exists, select, text
+from sqlalchemy.orm import Session
+
+from app.db.models.reading import Reading
+from app.db.models.reading_daily import ReadingDaily
+
+# utility_id -> (earliest, latest) reading timestamp written
+ReadingSpans = dict[int, tuple[datetime, datetime]]
+
+_ROLLUP_SQL = """
+INSERT INTO reading_daily (utility_id, unit, day, first_ts, first_value, last_ts, last_value, delta, reading_count)
+SELECT utility_id, unit, day, first_ts, first_value, last_ts, last_value, last_value - first_value, reading_count
+FROM (
+    SELECT utility_id,
+           coalesce(lower(unit), '') AS unit,
+           CAST(timestamp AS date) AS day,
+           min(timestamp) AS first_ts,
+           (array_agg(value ORDER BY timestamp, id))[1] AS first_value,
+           max(timestamp) AS last_ts,
+           (array_agg(value ORDER BY timestamp DESC, id DESC))[1] AS last_value,
+           count(*) AS reading_count
+    FROM readings
+    {where}
+    GROUP BY 1, 2, 3
+) AS days
+"""
+
+def note_span(spans: ReadingSpans, utility_id: int, ts: datetime) -> None:
+    lo_hi = spans.get(utility_id)
+    spans[utility_id] = (ts, ts) if lo_hi is None else (min(lo_hi[0], ts), max(lo_hi[1], ts))
+
+def refresh_daily_rollup(db: Session, spans: ReadingSpans) -> None:
+    """
+    Recompute the rollup for the whole days covered by `spans`. Call after the readings
+    are flushed and before commit, so the rollup lands in the same transaction.
+    """
+    for utility_id, (lo, hi) in spans.items():
+        day_lo = lo.date()
+        day_hi = hi.date() + timedelta(days=1)
+        db.execute(delete(ReadingDaily).where(
+            ReadingDaily.utility_id == utility_id,
+            ReadingDaily.day >= day_lo,
+            ReadingDaily.day < day_hi,
+        ))
+        db.execute(
+            text(_ROLLUP_SQL.format(where="WHERE utility_id = :utility_id AND timestamp >= :lo AND timestamp < :hi")),
+            {
+                "utility_id": utility_id,
+                "lo": datetime.combine(day_lo, time.min),
+                "hi": datetime.combine(day_hi, time.min),
+            },
+        )
+
+def ensure_daily_rollup(db: Session) -> None:
+    """Backfill the rollup from scratch when it is empty but readings exist (first start)."""
+    if db.scalar(select(exists().where(ReadingDaily.utility_id.is_not(None)))):
+        return
+    if not db.scalar(select(exists().where(Reading.id.is_not(None)))):
+        return
+    db.execute(text(_ROLLUP_SQL.format(where="")))
+    db.commit()
+    print("✅ Daily reading rollup backfilled.")
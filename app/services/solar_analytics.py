@@ -0,0 +1,157 @@
+# app/services/solar_analytics.py
+"""
+Per-panel solar production over a date range (both ends inclusive).
+
+Whole months inside the range come from `solar_panel_monthly`; only the partial months at
+its edges are summed from `solar_readings`, over at most two month-sized slices of the
+(production_date, panel) or (panel, production_date) index. The cost of a query therefore
+grows with the number of panels and months, not with the number of stored rows.
+
+Degradation is measured against the fleet rather than the calendar: each month a panel's
+average daily yield is divided by the median of all panels that month, which cancels the
+season and the weather, and the trend of that ratio is fitted by least squares.
+"""
+from __future__ import annotations
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from statistics import median
+
+from sqlalchemy import Date, cast, func, select
+from sqlalchemy.orm import Session
+
+from app.db.models.solar import SolarPanelMonthly, SolarReading
+from app.services.solar_rollup import month_of, next_month
+
+# (panel serial, month, energy, days with a reading)
+PanelMonth = tuple[str, date, Decimal, int]
+
+MIN_TREND_MONTHS = 3
+
+def _split(start: date, end: date) -> tuple[tuple[date, date] | None, list[tuple[date, date]]]:
+    # whole months [lo, hi) served by the rollup, and the [lo, hi) day slices left at the edges
+    stop = end + timedelta(days=1)
+    full_lo = start if start.day == 1 else next_month(month_of(start))
+    full_hi = month_of(stop)
+    if full_lo >= full_hi:
+        return None, [(start, stop)]
+    edges = [(lo, hi) for lo, hi in ((start, full_lo), (full_hi, stop)) if lo < hi]
+    return (full_lo, full_hi), edges
+
+def panel_months(db: Session, start: date, end: date, panel: str | None = None) -> list[PanelMonth]:
+    """Energy and reading days per panel and month, clipped to [start, end]."""
+    full, edges = _split(start, end)
+    rows: list[PanelMonth] = []
+
+    if full is not None:
+        q = select(SolarPanelMonthly.panel_serial_nbr, SolarPanelMonthly.month, SolarPanelMonthly.energy, SolarPanelMonthly.days).where(
+            SolarPanelMonthly.month >= full[0], SolarPanelMonthly.month < full[1]
+        )
+        if panel is not None:
+            q = q.where(SolarPanelMonthly.panel_serial_nbr == panel)
+        rows.extend(db.execute(q).all())
+
+    month = cast(func.date_trunc("month", SolarReading.production_date), Date)
+    for lo, hi in edges:
+        q = (
+            select(SolarReading.panel_serial_nbr, month, func.sum(SolarReading.energy_produced), func.count())
+            .where(SolarReading.production_date >= lo, SolarReading.production_date < hi)
+            .group_by(SolarReading.panel_serial_nbr, month)
+        )
+        if panel is not None:
+            q = q.where(SolarReading.panel_serial_nbr == panel)
+        rows.extend(db.execute(q).all())
+
+    return [tuple(r) for r in rows]
+
+def panel_totals(db: Session, start: date, end: date) -> list[dict]:
+    full, edges = _split(start, end)
+    parts = []
+    if full is not None:
+        parts.append(
+            select(SolarPanelMonthly.panel_serial_nbr, func.sum(SolarPanelMonthly.energy), func.sum(SolarPanelMonthly.days))
+            .where(SolarPanelMonthly.month >= full[0], SolarPanelMonthly.month < full[1])
+            .group_by(SolarPanelMonthly.panel_serial_nbr)
+        )
+    for lo, hi in edges:
+        parts.append(
+            select(SolarReading.panel_serial_nbr, func.sum(SolarReading.energy_produced), func.count())
+            .where(SolarReading.production_date >= lo, SolarReading.production_date < hi)
+            .group_by(SolarReading.panel_serial_nbr)
+        )
+
+    totals: dict[str, list] = {}
+    for q in parts:
+        for serial, energy, days in db.execute(q):
+            t = totals.setdefault(serial, [Decimal("0"), 0])
+            t[0] += energy
+            t[1] += days
+    return [
+        {
+            "panel_serial_nbr": serial,
+            "energy": energy,
+            "days": days,
+            "daily_average": (energy / days).quantize(Decimal("0.001")),
+        }
+        for serial, (energy, days) in sorted(totals.items())
+    ]
+
+def panel_ranking(db: Session, start: date, end: date, limit: int | None = None) -> list[dict]:
+    """Panels by average daily yield (days without a reading do not count against a panel), best first."""
+    totals = panel_totals(db, start, end)
+    if not totals:
+        return []
+    fleet = median(t["daily_average"] for t in totals)
+    totals.sort(key=lambda t: (-t["energy"] / t["days"], t["panel_serial_nbr"]))
+    return [
+        {**t, "rank": i, "relative_to_median": float(t["daily_average"] / fleet) if fleet else None}
+        for i, t in enumerate(totals[:limit], start=1)
+    ]
+
+def panel_daily(db: Session, panel: str, start: date, end: date) -> list[dict]:
+    rows = db.execute(
+        select(SolarReading.production_date, SolarReading.energy_produced)
+        .where(
+            SolarReading.panel_serial_nbr == panel,
+            SolarReading.production_date >= start,
+            SolarReading.production_date <= end,
+        )
+        .order_by(SolarReading.production_date)
+    ).all()
+    return [{"day": day, "energy": energy} for day, energy in rows]
+
+def _slope(xs: list[float], ys: list[float]) -> float:
+    mx, my = sum(xs) / len(xs), sum(ys) / len(ys)
+    sxx = sum((x - mx) ** 2 for x in xs)
+    return sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / sxx if sxx else 0.0
+
+def panel_degradation(db: Session, start: date, end: date) -> list[dict]:
+    """
+    Trend of every panel's yield relative to the fleet median, in percent per year.
+    Panels with fewer than MIN_TREND_MONTHS months of data get no trend.
+    """
+    by_month: dict[date, dict[str, float]] = defaultdict(dict)
+    for serial, month, energy, days in panel_months(db, start, end):
+        by_month[month][serial] = float(energy) / days
+
+    ratios: dict[str, list[tuple[float, float]]] = defaultdict(list)
+    for month, yields in sorted(by_month.items()):
+        fleet = median(yields.values())
+        if not fleet:
+            continue
+        x = month.year * 12 + month.month
+        for serial, y in yields.items():
+            ratios[serial].append((x, y / fleet))
+
+    result = []
+    for serial in sorted(ratios):
+        points = ratios[serial]
+        xs, ys = [x for x, _ in points], [y for _, y in points]
+        trend = _slope(xs, ys) * 12 * 100 if len(points) >= MIN_TREND_MONTHS else None
+        result.append({
+            "panel_serial_nbr": serial,
+            "months": len(points),
+            "relative_yield": sum(ys) / len(ys),
+            "trend_pct_per_year": trend,
+        })
+    return result
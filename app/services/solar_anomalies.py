@@ -0,0 +1,150 @@
+# app/services/solar_anomalies.py
+"""
+Daily detection of underperforming solar panels.
+
+The window is loaded from `solar_readings` into one float matrix (panels x days, NaN where
+a panel has no reading; Postgres packs each panel's values into one binary string) and
+everything below is whole-array NumPy:
+- ratio: a panel's energy divided by the median of all panels that day, which cancels
+  the weather and the season (days with a zero median carry no information: NaN);
+- z-score: the ratio against the mean and spread of the panel's own ratios over the
+  ANOMALY_WINDOW_DAYS before it, from cumulative sums, so it reacts to sudden drops;
+- a day is low when the ratio is under ANOMALY_RATIO or the z-score under ANOMALY_Z,
+  and a panel is flagged once it has stayed low for ANOMALY_MIN_DAYS days in a row.
+
+Only flagged panel-days are stored, in `solar_panel_anomalies`. A run replaces the stored
+results of its days, so detect_anomalies() can be re-run over any range.
+"""
+from __future__ import annotations
+import os
+import time
+import warnings
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Iterable
+
+import numpy as np
+from sqlalchemy import Float, Integer, LargeBinary, cast, delete, func, literal, select, text, type_coerce
+from sqlalchemy.orm import Session
+
+from app.db.models.solar import SolarPanelAnomaly, SolarReading
+
+ANOMALY_RATIO = float(os.getenv("SOLAR_ANOMALY_RATIO", "0.8"))
+ANOMALY_Z = float(os.getenv("SOLAR_ANOMALY_Z", "-3"))
+ANOMALY_WINDOW_DAYS = int(os.getenv("SOLAR_ANOMALY_WINDOW_DAYS", "14"))
+ANOMALY_MIN_DAYS = int(os.getenv("SOLAR_ANOMALY_MIN_DAYS", "3"))
+ANOMALY_RUN_DAYS = 365  # default range of a manual run
+MIN_HISTORY = ANOMALY_WINDOW_DAYS // 2  # trailing days needed before a z-score means anything
+
+_INSERT_SQL = """
+INSERT INTO solar_panel_anomalies (day, panel_serial_nbr, energy, ratio, z_score, low_days)
+SELECT * FROM unnest(
+    CAST(:day AS date[]), CAST(:panel AS varchar[]), CAST(:energy AS numeric[]),
+    CAST(:ratio AS float8[]), CAST(:z_score AS float8[]), CAST(:low_days AS int[])
+)
+"""
+
+@dataclass
+class PanelMatrix:
+    serials: list[str]
+    first_day: date
+    energy: np.ndarray  # [panels, days] float64, NaN where there is no reading
+
+def lookback(start: date) -> date:
+    """First day of data the results from `start` on depend on."""
+    return start - timedelta(days=ANOMALY_WINDOW_DAYS + ANOMALY_MIN_DAYS - 1)
+
+def load_matrix(db: Session, start: date, end: date) -> PanelMatrix:
+    """Readings in [start, end] as a panels x days matrix."""
+    # one row per panel with its day offsets and values packed as big-endian int4 / float8
+    # bytea: no date, Decimal or row object per reading on the Python side
+    packed = literal(b"", LargeBinary)
+    rows = db.execute(
+        select(
+            SolarReading.panel_serial_nbr,
+            type_coerce(func.string_agg(func.int4send(cast(SolarReading.production_date - literal(start), Integer)), packed), LargeBinary),
+            type_coerce(func.string_agg(func.float8send(cast(SolarReading.energy_produced, Float)), packed), LargeBinary),
+        )
+        .where(SolarReading.production_date >= start, SolarReading.production_date <= end)
+        .group_by(SolarReading.panel_serial_nbr)
+        .order_by(SolarReading.panel_serial_nbr)
+    ).all()
+    energy = np.full((len(rows), (end - start).days + 1), np.nan)
+    for p, (_, days, values) in enumerate(rows):
+        energy[p, np.frombuffer(days, dtype=">i4")] = np.frombuffer(values, dtype=">f8")
+    return PanelMatrix([serial for serial, *_ in rows], start, energy)
+
+def _trailing(x: np.ndarray, window: int) -> np.ndarray:
+    # sum over the `window` columns before each column (not including it)
+    c = np.zeros((x.shape[0], x.shape[1] + 1))
+    np.cumsum(x, axis=1, out=c[:, 1:])
+    hi = np.arange(x.shape[1])
+    return c[:, hi] - c[:, np.maximum(hi - window, 0)]
+
+def score(energy: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(ratio, z-score, consecutive low days) per panel and day."""
+    with warnings.catch_warnings():  # all-NaN days, 0/0: NaN is the intended result
+        warnings.simplefilter("ignore", RuntimeWarning)
+        median = np.nanmedian(energy, axis=0)
+        ratio = np.where(median > 0, energy / median, np.nan)
+
+        known = ~np.isnan(ratio)
+        r = np.where(known, ratio, 0.0)
+        n = _trailing(known.astype(np.float64), ANOMALY_WINDOW_DAYS)
+        mean = _trailing(r, ANOMALY_WINDOW_DAYS) / n
+        var = _trailing(r * r, ANOMALY_WINDOW_DAYS) / n - mean * mean
+        std = np.sqrt(np.maximum(var, 0.0))
+        z = np.where((n >= MIN_HISTORY) & (std > 1e-9), (ratio - mean) / std, np.nan)
+
+    low = known & ((ratio < ANOMALY_RATIO) | (z < ANOMALY_Z))
+    idx = np.arange(energy.shape[1])
+    last_ok = np.maximum.accumulate(np.where(low, -1, idx), axis=1)
+    return ratio, z, idx - last_ok
+
+def detect_anomalies(db: Session, start: date, end: date) -> dict:
+    """Score [start, end] and replace its stored anomalies; does not commit."""
+    t0 = time.perf_counter()
+    m = load_matrix(db, lookback(start), end)
+    ratio, z, low_days = score(m.energy)
+
+    offset = (start - m.first_day).days
+    panel, day = np.nonzero(low_days[:, offset:] >= ANOMALY_MIN_DAYS)
+    day += offset
+    flagged_z = z[panel, day]
+
+    db.execute(delete(SolarPanelAnomaly).where(SolarPanelAnomaly.day >= start, SolarPanelAnomaly.day <= end))
+    if panel.size:
+        # one statement of parallel arrays instead of a parameter set per flagged row
+        db.execute(text(_INSERT_SQL), {
+            "day": (np.datetime64(m.first_day, "D") + day).tolist(),
+            "panel": np.array(m.serials, dtype=object)[panel].tolist(),
+            "energy": np.round(m.energy[panel, day], 3).tolist(),
+            "ratio": ratio[panel, day].tolist(),
+            "z_score": [None if np.isnan(v) else v for v in flagged_z.tolist()],
+            "low_days": low_days[panel, day].tolist(),
+        })
+    return {
+        "start": start,
+        "end": end,
+        "panels": len(m.serials),
+        "flagged": int(panel.size),
+        "flagged_panels": int(np.unique(panel).size),
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000, 1),
+    }
+
+def latest_day(db: Session) -> date | None:
+    return db.scalar(select(func.max(SolarReading.production_date)))
+
+def refresh_anomalies(db: Session, days: Iterable[date]) -> None:
+    """Re-score every day whose result depends on one of `days` (write hook of the solar importer)."""
+    days = list(days)
+    if not days:
+        return
+    end = min(max(days) + timedelta(days=ANOMALY_WINDOW_DAYS + ANOMALY_MIN_DAYS - 1), latest_day(db))
+    detect_anomalies(db, min(days), end)
+
+def stored_anomalies(db: Session, start: date, end: date, panel: str | None = None) -> list[SolarPanelAnomaly]:
+    q = select(SolarPanelAnomaly).where(SolarPanelAnomaly.day >= start, SolarPanelAnomaly.day <= end)
+    if panel is not None:
+        q = q.where(SolarPanelAnomaly.panel_serial_nbr == panel)
+    return list(db.scalars(q.order_by(SolarPanelAnomaly.day.desc(), SolarPanelAnomaly.ratio)))
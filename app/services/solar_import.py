@@ -0,0 +1,232 @@
+# app/services/solar_import.py
+from __future__ import annotations
+import hashlib
+import logging
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Iterable
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.db.models.contract import Contract
+from app.db.models.reading import Reading
+from app.db.models.solar import SolarReading
+from app.db.models.utility import Utility
+from app.services.meter_import import CHUNK_SIZE, parse_decimal, parse_timestamp
+from app.services.cost_cache import readings_changed
+from app.services.import_ledger import record, seen
+from app.services.net_energy import refresh_net_energy
+from app.services.reading_cache import mark_stale
+from app.services.reading_rollup import ReadingSpans, note_span, refresh_daily_rollup
+from app.services.solar_anomalies import refresh_anomalies
+from app.services.solar_rollup import refresh_panel_monthly
+
+logger = logging.getLogger(__name__)
+
+class _SolarUtilityLookup:
+    """SOLAR utilities by contract span, resolved per timestamp like `start_date <= ts AND end_date >= ts`."""
+
+    def __init__(self, db: Session):
+        rows = db.execute(
+            select(Utility.id, Contract.start_date, Contract.end_date)
+            .join(Contract, Contract.id == Utility.contract_id)
+            .where(Utility.type == "SOLAR", Contract.start_date.is_not(None), Contract.end_date.is_not(None))
+            .order_by(Utility.id)
+        ).all()
+        self._spans = [
+            (uid, datetime.combine(s, time.min), datetime.combine(e, time.min)) for uid, s, e in rows
+        ]
+        # panel exports repeat one date per panel; answer each timestamp once
+        self._cache: dict[datetime, int | None] = {}
+
+    def utility_for(self, ts: datetime) -> int | None:
+        try:
+            return self._cache[ts]
+        except KeyError:
+            found = self._cache[ts] = next((uid for uid, s, e in self._spans if s <= ts <= e), None)
+            return found
+
+class SolarReadingImporter:
+    """
+    Idempotent importer for per-panel solar CSV rows. The SOLAR utility of every date
+    comes from contract spans loaded once. Rows are grouped into chunks (runs of rows
+    with one production date); a chunk whose content hash is in the import ledger is
+    skipped without touching the data, the others are upserted on (production_date,
+    panel_serial_nbr) in bounded batches. The skip goes by content only: a chunk seen
+    before is skipped even when a newer import has since overwritten its day (force=True
+    writes it again). On finish() the months of the touched days are
+    re-rolled into `solar_panel_monthly`, the panel anomalies depending on them are
+    re-scored, and their daily totals are re-summed from `solar_readings` and upserted
+    into `readings` in one statement.
+    """
+
+    KIND = "solar-readings"
+
+    def __init__(self, db: Session, chunk_size: int = CHUNK_SIZE, file_digest: str | None = None, force: bool = False):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.force = force
+        self.solar_rows = 0
+        self.skipped = 0
+        self.unchanged = 0  # rows in chunks (or a whole file) imported before
+        self._utilities = _SolarUtilityLookup(db)
+
+        self._run_day: date | None = None
+        self._run_utility: int | None = None
+        self._run: list[tuple[str, Decimal]] = []
+        self._chunks: list[tuple[str, date, int, list[tuple[str, Decimal]]]] = []
+        self._chunk_rows = 0
+        self._days: dict[date, int] = {}  # day written -> SOLAR utility
+
+        self.file_digest = file_digest
+        known = seen(db, self.KIND, "file", [file_digest]) if file_digest and not force else {}
+        self.unchanged_file = file_digest in known
+        if self.unchanged_file:
+            self.unchanged = known[file_digest]
+
+    def _feed(self, ts: datetime, panel_serial: str, energy: Decimal | None) -> None:
+        if energy is None:
+            self.skipped += 1
+            return
+
+        utility_id = self._utilities.utility_for(ts)
+        if utility_id is None:
+            self.skipped += 1
+            logger.warning("No SOLAR utility for %s; row skipped", ts.date())
+            return
+
+        day = ts.date()
+        if day != self._run_day:
+            self._close_run()
+            self._run_day, self._run_utility = day, utility_id
+        self._run.append((panel_serial, energy))
+
+    def _close_run(self) -> None:
+        if not self._run:
+            return
+        h = hashlib.sha256(self._run_day.isoformat().encode())
+        for serial, energy in self._run:
+            h.update(f"\n{serial}\t{energy}".encode())
+        self._chunks.append((h.hexdigest(), self._run_day, self._run_utility, self._run))
+        self._chunk_rows += len(self._run)
+        self._run = []
+
+    def feed(self, row: dict) -> None:
+        try:
+            ts = parse_timestamp(row["production_date"])
+            panel_serial = row.get("panel_serial_nbr", "").strip()
+            energy = parse_decimal(row.get("energy_produced"))
+            self._feed(ts, panel_serial, energy)
+        except Exception as e:
+            self.skipped += 1
+            logger.warning("Skipped solar row: %s; row=%s", e, row)
+
+        if self._chunk_rows >= self.chunk_size:
+            self.flush()
+
+    def feed_parsed(self, ts: datetime, panel_serial: str, energy: Decimal | None) -> None:
+        """Like feed(), for a row already parsed by app.services.parallel_parse."""
+        try:
+            self._feed(ts, panel_serial, energy)
+        except Exception as e:
+            self.skipped += 1
+            logger.warning("Skipped solar row: %s; ts=%s", e, ts)
+
+        if self._chunk_rows >= self.chunk_size:
+            self.flush()
+
+    def parse_error(self, message: str) -> None:
+        self.skipped += 1
+        logger.warning("Skipped solar row: %s", message)
+
+    def flush(self) -> None:
+        """Write the closed chunks that are not in the ledger yet (the open run stays buffered)."""
+        if not self._chunks:
+            return
+        known = {} if self.force else seen(self.db, self.KIND, "chunk", (c[0] for c in self._chunks))
+
+        pending: dict[tuple[date, str], Decimal] = {}  # last row per panel and day wins
+        written = []
+        for digest, day, utility_id, rows in self._chunks:
+            if digest in known:
+                self.unchanged += len(rows)
+                continue
+            for serial, energy in rows:
+                pending[(day, serial)] = energy
+            self._days[day] = utility_id
+            self.solar_rows += len(rows)
+            written.append((digest, len(rows)))
+        self._chunks = []
+        self._chunk_rows = 0
+
+        if pending:
+            # executemany parameters, like the meter importer: the statement compiles once
+            stmt = pg_insert(SolarReading)
+            self.db.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[SolarReading.production_date, SolarReading.panel_serial_nbr],
+                    set_={"energy_produced": stmt.excluded.energy_produced, "unit": stmt.excluded.unit},
+                ),
+                [
+                    {"production_date": day, "panel_serial_nbr": serial, "energy_produced": energy, "unit": "kWh"}
+                    for (day, serial), energy in pending.items()
+                ],
+            )
+        record(self.db, self.KIND, "chunk", written)
+
+    def finish(self) -> None:
+        if self.unchanged_file:
+            return
+        self._close_run()
+        self.flush()
+        # a file with skipped rows is not recorded: its missing contract or utility may exist next time
+        if self.file_digest and not self.skipped:
+            record(self.db, self.KIND, "file", [(self.file_digest, self.solar_rows + self.unchanged)])
+        if not self._days:
+            return
+        refresh_panel_monthly(self.db, self._days)
+        refresh_anomalies(self.db, self._days)
+
+        # daily solar totals into Reading for the utility, summed over every panel row of the day
+        totals = self.db.execute(
+            select(SolarReading.production_date, func.sum(SolarReading.energy_produced))
+            .where(SolarReading.production_date.in_(list(self._days)))
+            .group_by(SolarReading.production_date)
+        ).all()
+        spans: ReadingSpans = {}
+        rows = []
+        for day, total in totals:
+            ts = datetime.combine(day, time.min)
+            utility_id = self._days[day]
+            note_span(spans, utility_id, ts)
+            rows.append({"timestamp": ts, "value": total, "unit": "kWh", "source": "solar", "utility_id": utility_id})
+
+        stmt = pg_insert(Reading)
+        self.db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[Reading.utility_id, Reading.timestamp],
+                set_={"value": stmt.excluded.value, "unit": stmt.excluded.unit, "source": stmt.excluded.source},
+            ),
+            rows,
+        )
+        refresh_daily_rollup(self.db, spans)
+        refresh_net_energy(self.db, spans)
+        readings_changed(self.db, spans)
+        mark_stale(self.db, spans)
+
+    def feed_all(self, rows: Iterable[dict]) -> None:
+        if self.unchanged_file:
+            return
+        for row in rows:
+            self.feed(row)
+        self.finish()
+
+    def counts(self) -> dict[str, int]:
+        return {
+            "solar_rows": self.solar_rows,
+            "aggregated_days": len(self._days),
+            "skipped": self.skipped,
+            "unchanged": self.unchanged,
+        }
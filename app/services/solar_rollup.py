@@ -0,0 +1,48 @@
+# app/services/solar_rollup.py
+from __future__ import annotations
+from datetime import date
+from typing import Iterable
+
+from sqlalchemy import delete, exists, select, text
+from sqlalchemy.orm import Session
+
+from app.db.models.solar import SolarPanelMonthly, SolarReading
+
+_ROLLUP_SQL = """
+INSERT INTO solar_panel_monthly (panel_serial_nbr, month, energy, days)
+SELECT panel_serial_nbr,
+       CAST(date_trunc('month', production_date) AS date) AS month,
+       sum(energy_produced),
+       count(*)
+FROM solar_readings
+{where}
+GROUP BY 1, 2
+"""
+
+def month_of(day: date) -> date:
+    return day.replace(day=1)
+
+def next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+def refresh_panel_monthly(db: Session, days: Iterable[date]) -> None:
+    """
+    Recompute the rollup for every month containing one of `days`. Call after the solar
+    rows are written and before commit, so the rollup lands in the same transaction.
+    """
+    for month in sorted({month_of(d) for d in days}):
+        db.execute(delete(SolarPanelMonthly).where(SolarPanelMonthly.month == month))
+        db.execute(
+            text(_ROLLUP_SQL.format(where="WHERE production_date >= :lo AND production_date < :hi")),
+            {"lo": month, "hi": next_month(month)},
+        )
+
+def ensure_panel_monthly(db: Session) -> None:
+    """Backfill the rollup from scratch when it is empty but solar rows exist (first start)."""
+    if db.scalar(select(exists().where(SolarPanelMonthly.month.is_not(None)))):
+        return
+    if not db.scalar(select(exists().where(SolarReading.id.is_not(None)))):
+        return
+    db.execute(text(_ROLLUP_SQL.format(where="")))
+    db.commit()
+    print("✅ Monthly solar panel rollup backfilled.")
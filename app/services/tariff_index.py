@@ -0,0 +1,189 @@
+# app/services/tariff_index.py
+"""
+In-memory interval index over the active tariffs of one scope (a utility or a contract).
+
+A tariff is valid on [start_date, end_date + 1 day); a missing bound is open. Overlap with
+a requested [start, end) is answered in O(log n + k): the tariffs covering `start` come from
+a centered interval tree (stabbing query) and the ones beginning inside (start, end) from a
+bisect over the sorted start dates. Indexes are built per scope on first use, kept in a
+process-wide registry and dropped when a tariff of that scope is written.
+"""
+from __future__ import annotations
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Iterable
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.db.models.enums import Frequency, TariffSort
+from app.db.models.tariff import Tariff
+
+# other worker processes cannot invalidate this one's indexes; bound how stale they can get
+TARIFF_INDEX_TTL_S = float(os.getenv("TARIFF_INDEX_TTL_S", "300"))
+
+@dataclass(frozen=True, slots=True)
+class TariffSnapshot:
+    """Detached copy of the Tariff columns the calculators read."""
+    id: int
+    description: str
+    amount: Decimal
+    tariff_sort: TariffSort
+    frequency: Frequency
+    start_date: date | None
+    end_date: date | None
+    contract_id: int | None
+    utility_id: int | None
+
+    @classmethod
+    def of(cls, t: Tariff) -> TariffSnapshot:
+        return cls(
+            t.id, t.description, t.amount, t.tariff_sort, t.frequency,
+            t.start_date, t.end_date, t.contract_id, t.utility_id,
+        )
+
+    @property
+    def valid_from(self) -> date:
+        return self.start_date or date.min
+
+    @property
+    def valid_until(self) -> date:
+        # tariff end dates are inclusive
+        if self.end_date is None or self.end_date == date.max:
+            return date.max
+        return self.end_date + timedelta(days=1)
+
+# ---------- interval tree ----------
+
+class _Node:
+    __slots__ = ("center", "by_start", "by_end", "left", "right")
+
+    def __init__(self, items: list[tuple[date, date, int]]):
+        starts = sorted(s for s, _, _ in items)
+        self.center = starts[len(starts) // 2]
+        here, left, right = [], [], []
+        for item in items:
+            s, e, _ = item
+            if e <= self.center:
+                left.append(item)
+            elif s > self.center:
+                right.append(item)
+            else:
+                here.append(item)  # s <= center < e; never empty, the median start lands here
+        self.by_start = sorted(here, key=lambda i: i[0])
+        self.by_end = sorted(here, key=lambda i: i[1], reverse=True)
+        self.left = _Node(left) if left else None
+        self.right = _Node(right) if right else None
+
+    def stab(self, x: date, out: list[int]) -> None:
+        node = self
+        while node is not None:
+            if x < node.center:
+                for s, _, pos in node.by_start:
+                    if s > x:
+                        break
+                    out.append(pos)
+                node = node.left
+            else:
+                for _, e, pos in node.by_end:
+                    if e <= x:
+                        break
+                    out.append(pos)
+                node = node.right
+
+class TariffIndex:
+    """Active tariffs of one scope, in id order, with O(log n + k) overlap queries."""
+
+    def __init__(self, tariffs: Iterable[TariffSnapshot]):
+        self.tariffs = sorted(tariffs, key=lambda t: t.id)
+        items = [(t.valid_from, t.valid_until, pos) for pos, t in enumerate(self.tariffs) if t.valid_from < t.valid_until]
+        self._tree = _Node(items) if items else None
+        self._by_start = sorted((s, pos) for s, _, pos in items)
+        self._starts = [s for s, _ in self._by_start]
+
+    def overlapping(self, start: date, end: date) -> list[tuple[TariffSnapshot, date, date]]:
+        """(tariff, clipped start, clipped end) for every tariff overlapping [start, end), in id order."""
+        if self._tree is None or start >= end:
+            return []
+        hits: list[int] = []
+        self._tree.stab(start, hits)
+        lo = bisect_right(self._starts, start)
+        hi = bisect_left(self._starts, end, lo)
+        hits.extend(pos for _, pos in self._by_start[lo:hi])
+
+        out = []
+        for pos in sorted(hits):  # calculators are order-sensitive (PERCENTAGE applies to what precedes it)
+            t = self.tariffs[pos]
+            out.append((t, max(start, t.valid_from), min(end, t.valid_until)))
+        return out
+
+# ---------- registry ----------
+
+Scope = tuple[str, int]  # ("utility" | "contract", id)
+
+class TariffIndexRegistry:
+    def __init__(self, ttl_s: float = TARIFF_INDEX_TTL_S):
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._indexes: dict[Scope, tuple[float, TariffIndex]] = {}
+        self._generation = 0  # bumped on every invalidation
+
+    def get_many(self, db: Session, utility_ids: Iterable[int], contract_ids: Iterable[int]) -> dict[Scope, TariffIndex]:
+        """Indexes for all requested scopes; the missing or expired ones are loaded in one query."""
+        wanted = [("utility", uid) for uid in utility_ids] + [("contract", cid) for cid in contract_ids]
+        now = time.monotonic()
+        found: dict[Scope, TariffIndex] = {}
+        with self._lock:
+            generation = self._generation
+            for scope in wanted:
+                entry = self._indexes.get(scope)
+                if entry is not None and now - entry[0] < self.ttl_s:
+                    found[scope] = entry[1]
+
+        missing = [scope for scope in wanted if scope not in found]
+        if not missing:
+            return found
+
+        m_utils = [i for kind, i in missing if kind == "utility"]
+        m_contracts = [i for kind, i in missing if kind == "contract"]
+        loaded: dict[Scope, list[TariffSnapshot]] = {scope: [] for scope in missing}
+        for t in db.query(Tariff).filter(
+            Tariff.is_active == True,
+            or_(Tariff.utility_id.in_(m_utils), Tariff.contract_id.in_(m_contracts)),
+        ):
+            scope = ("utility", t.utility_id) if t.utility_id is not None else ("contract", t.contract_id)
+            if scope in loaded:
+                loaded[scope].append(TariffSnapshot.of(t))
+
+        with self._lock:
+            # a write that landed while we were loading may not be in `loaded`; use it, don't keep it
+            keep = generation == self._generation
+            for scope, tariffs in loaded.items():
+                index = TariffIndex(tariffs)
+                if keep:
+                    self._indexes[scope] = (now, index)
+                found[scope] = index
+        return found
+
+    def invalidate(self, utility_id: int | None = None, contract_id: int | None = None) -> None:
+        with self._lock:
+            self._generation += 1
+            if utility_id is not None:
+                self._indexes.pop(("utility", utility_id), None)
+            if contract_id is not None:
+                self._indexes.pop(("contract", contract_id), None)
+
+    def invalidate_tariff(self, tariff: Tariff) -> None:
+        self.invalidate(tariff.utility_id, tariff.contract_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._indexes.clear()
+
+tariff_indexes = TariffIndexRegistry()
@@ -1,19 +1,37 @@
 # app/services/usage_calculator.py
 from __future__ import annotations
+import os
 from datetime import date, datetime, time, timedelta
 from decimal import Decimal
 from typing import Dict, Literal, Iterable, Optional
-from sqlalchemy import and_, func, desc
+
+import numpy as np
+from sqlalchemy import Date, DateTime, Integer, String, and_, cast, column, func, or_, select, values
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
 
 from app.db.models.reading import Reading
+from app.db.models.reading_daily import ReadingDaily
 from app.db.models.utility import Utility
+from app.services.reading_cache import reading_cache
+from app.services.reading_series import ReadingSeries, from_milli, to_epoch_us
 
 TariffFrequency = Literal["DAY", "MONTH", "YEAR", "M3", "KWH"]
+# snap: the stand at a boundary is the last reading before it
+# interpolate: linear between the readings around the boundary
+UsageMode = Literal["snap", "interpolate"]
+USAGE_MODE: UsageMode = os.getenv("USAGE_MODE", "snap")
+
 # 👇 Add canonical type groups
+# Only these types have KWH / M3 usage. Any other type (HEAT, untyped, ...) has none, even
+# when it is metered in kWh: it used to count as electric for being "not GAS".
 ELECTRIC_TYPES = {"NORMAL", "REDUCED"}
 GAS_TYPES = {"GAS"}
+SOLAR_TYPES = {"SOLAR"}  # daily production totals, not meter stands
+
+# (utility_id, start_dt, end_dt, unit)
+UsageKey = tuple[int, datetime, datetime, Optional[str]]
+# (contract_id, utility_id, start, end, for_contract_scope) — the get_usage_for_period arguments
+UsagePeriod = tuple[Optional[int], Optional[int], date, date, bool]
 
 def _unit_for_type(util_type: str) -> str:
     return "m3" if util_type in GAS_TYPES else "kWh"
@@ -28,58 +46,243 @@ def _end_open(dt_date: date) -> datetime:
     # open interval endpoint: midnight of the *next* day
     return datetime.combine(dt_date + timedelta(days=1), time.min)
 
-def _sum_unit_filter(q, unit: str | None):
-    if unit:
-        # case-insensitive compare
-        return q.filter(func.lower(Reading.unit) == unit.lower())
-    return q
-
-def _delta_usage_for_utility(db: Session, utility_id: int, start_dt: datetime, end_dt: datetime, unit: str | None) -> Decimal:
-    # Baseline: latest reading strictly before start
-    q_base = db.query(Reading.value).filter(
-        Reading.utility_id == utility_id,
-        Reading.timestamp < start_dt,
-    )
-    q_base = _sum_unit_filter(q_base, unit)
-    baseline = q_base.order_by(Reading.timestamp.desc()).limit(1).scalar()
-
-    # Fallback baseline: first inside window
-    if baseline is None:
-        q_first = db.query(Reading.value).filter(
-            Reading.utility_id == utility_id,
-            Reading.timestamp >= start_dt,
-            Reading.timestamp <  end_dt,
+def _floor_day(dt: datetime) -> datetime:
+    return datetime.combine(dt.date(), time.min)
+
+def _ceil_day(dt: datetime) -> datetime:
+    floor = _floor_day(dt)
+    return floor if floor == dt else floor + timedelta(days=1)
+
+def _delta_usage_many(db: Session, keys: Iterable[UsageKey]) -> Dict[UsageKey, Decimal]:
+    """
+    Usage (final - baseline) for many (utility_id, start_dt, end_dt, unit) keys in ONE query.
+
+    Per key, like the old per-utility helper:
+      baseline = latest reading strictly before start, else first reading inside the window
+      final    = latest reading before end (end is open -> includes entire end date)
+
+    Whole days are answered from the reading_daily rollup; raw readings are only
+    probed on the partial days at the window edges (empty for midnight boundaries).
+    The keys travel as a VALUES list; each pick is a correlated ORDER BY ... LIMIT 1
+    subquery that Postgres runs as an index probe per row.
+    """
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return {}
+
+    p = values(
+        column("k", Integer),
+        column("utility_id", Integer),
+        column("unit", String),
+        column("start_dt", DateTime),
+        column("end_dt", DateTime),
+        column("start_floor", DateTime),  # midnight on/before start
+        column("start_ceil", DateTime),   # midnight on/after start
+        column("end_floor", DateTime),    # midnight on/before end
+        name="p",
+    ).data([
+        (
+            i, uid, unit.lower() if unit else None,
+            start_dt, end_dt, _floor_day(start_dt), min(_ceil_day(start_dt), end_dt), _floor_day(end_dt),
         )
-        q_first = _sum_unit_filter(q_first, unit)
-        baseline = q_first.order_by(Reading.timestamp.asc()).limit(1).scalar()
+        for i, (uid, start_dt, end_dt, unit) in enumerate(keys)
+    ])
 
-    # Final: latest reading before end (end is open -> includes entire end date)
-    q_final = db.query(Reading.value).filter(
-        Reading.utility_id == utility_id,
-        Reading.timestamp < end_dt,
+    def raw(*window, newest: bool):
+        return (
+            select(Reading.value)
+            .where(
+                Reading.utility_id == p.c.utility_id,
+                or_(p.c.unit.is_(None), func.lower(Reading.unit) == p.c.unit),  # case-insensitive unit
+                *window,
+            )
+            .order_by(Reading.timestamp.desc() if newest else Reading.timestamp.asc())
+            .limit(1)
+            .correlate(p)
+            .scalar_subquery()
+        )
+
+    def daily(value_col, *window, newest: bool):
+        return (
+            select(value_col)
+            .where(
+                ReadingDaily.utility_id == p.c.utility_id,
+                or_(p.c.unit.is_(None), ReadingDaily.unit == p.c.unit),
+                *window,
+            )
+            .order_by(ReadingDaily.day.desc() if newest else ReadingDaily.day.asc())
+            .limit(1)
+            .correlate(p)
+            .scalar_subquery()
+        )
+
+    def latest_before(bound, bound_floor):
+        return func.coalesce(
+            raw(Reading.timestamp >= bound_floor, Reading.timestamp < bound, newest=True),
+            daily(ReadingDaily.last_value, ReadingDaily.day < cast(bound_floor, Date), newest=True),
+        )
+
+    baseline = func.coalesce(
+        latest_before(p.c.start_dt, p.c.start_floor),
+        # fallback baseline: first inside window
+        raw(Reading.timestamp >= p.c.start_dt, Reading.timestamp < p.c.start_ceil, newest=False),
+        daily(
+            ReadingDaily.first_value,
+            ReadingDaily.day >= cast(p.c.start_ceil, Date),
+            ReadingDaily.day < cast(p.c.end_floor, Date),
+            newest=False,
+        ),
+        raw(Reading.timestamp >= func.greatest(p.c.end_floor, p.c.start_dt), Reading.timestamp < p.c.end_dt, newest=False),
     )
-    q_final = _sum_unit_filter(q_final, unit)
-    final = q_final.order_by(Reading.timestamp.desc()).limit(1).scalar()
+    final = latest_before(p.c.end_dt, p.c.end_floor)
 
-    if baseline is None or final is None:
-        return Decimal("0")
+    out: Dict[UsageKey, Decimal] = {}
+    for k, base, fin in db.execute(select(p.c.k, baseline, final)):
+        if base is None or fin is None:
+            usage = Decimal("0")
+        else:
+            usage = _to_decimal(fin) - _to_decimal(base)
+        out[keys[k]] = usage if usage >= 0 else Decimal("0")
+    return out
 
-    usage = _to_decimal(final) - _to_decimal(baseline)
-    return usage if usage >= 0 else Decimal("0")
+SeriesKey = tuple[int, Optional[str]]  # (utility_id, lower-cased unit or None for any)
 
-def get_usage_for_period(
+def load_series(db: Session, spans: Dict[SeriesKey, tuple[datetime, datetime]]) -> Dict[SeriesKey, ReadingSeries]:
+    """
+    The readings of many meters in ONE query: per (utility, unit) every reading in its
+    (lo, hi) span plus the nearest one on either side, so any instant in the span has
+    both neighbours for interpolation. With the reading cache on, the cached histories
+    (loaded in one query when missing).
+    """
+    if not spans:
+        return {}
+    if reading_cache.enabled:
+        entries = reading_cache.get_many(db, (uid for uid, _ in spans))
+        return {key: entries[key[0]].for_unit(key[1]) for key in spans}
+    b = values(
+        column("utility_id", Integer),
+        column("unit", String),
+        column("lo", DateTime),
+        column("hi", DateTime),
+        name="b",
+    ).data([(uid, unit, lo, hi) for (uid, unit), (lo, hi) in spans.items()])
+
+    def same_meter():
+        return and_(Reading.utility_id == b.c.utility_id, or_(b.c.unit.is_(None), func.lower(Reading.unit) == b.c.unit))
+
+    before = select(func.max(Reading.timestamp)).where(same_meter(), Reading.timestamp < b.c.lo).correlate(b).scalar_subquery()
+    after = select(func.min(Reading.timestamp)).where(same_meter(), Reading.timestamp > b.c.hi).correlate(b).scalar_subquery()
+    bounds = select(
+        b.c.utility_id, b.c.unit,
+        func.coalesce(before, b.c.lo).label("lo"),
+        func.coalesce(after, b.c.hi).label("hi"),
+    ).subquery()
+
+    rows: Dict[SeriesKey, list] = {key: [] for key in spans}
+    for uid, unit, ts, value in db.execute(
+        select(bounds.c.utility_id, bounds.c.unit, Reading.timestamp, Reading.value)
+        .join(Reading, and_(
+            Reading.utility_id == bounds.c.utility_id,
+            or_(bounds.c.unit.is_(None), func.lower(Reading.unit) == bounds.c.unit),
+            Reading.timestamp >= bounds.c.lo,
+            Reading.timestamp <= bounds.c.hi,
+        ))
+        .order_by(bounds.c.utility_id, bounds.c.unit, Reading.timestamp)
+    ):
+        rows[(uid, unit)].append((ts, value))
+    return {key: ReadingSeries(r) for key, r in rows.items()}
+
+def _interpolated_usage_many(db: Session, keys: Iterable[UsageKey]) -> Dict[UsageKey, Decimal]:
+    """
+    Usage (stand at end - stand at start) for many keys, with both stands interpolated
+    linearly between the neighbouring readings. One fetch for all meters, then one
+    searchsorted per meter over every boundary of its keys.
+    """
+    keys = list(dict.fromkeys(keys))
+    by_meter: Dict[SeriesKey, list[UsageKey]] = {}
+    for key in keys:
+        by_meter.setdefault((key[0], key[3].lower() if key[3] else None), []).append(key)
+
+    series = load_series(db, {
+        meter: (min(k[1] for k in ks), max(k[2] for k in ks)) for meter, ks in by_meter.items()
+    })
+
+    out: Dict[UsageKey, Decimal] = {}
+    for meter, ks in by_meter.items():
+        bounds = np.array([to_epoch_us(t) for k in ks for t in (k[1], k[2])], dtype=np.int64)
+        stands = series[meter].stands_at(bounds)
+        for key, milli in zip(ks, (stands[1::2] - stands[0::2]).tolist()):
+            out[key] = from_milli(max(milli, 0))
+    return out
+
+def _cached_usage_many(
     db: Session,
-    contract_id: int | None,
-    utility_id: int | None,
-    start: date,
-    end: date,
-    for_contract_scope: bool,
-) -> Dict[TariffFrequency, Decimal]:
+    keys: Iterable[UsageKey],
+    mode: UsageMode,
+    production: set[int] = frozenset(),
+) -> Dict[UsageKey, Decimal]:
+    """
+    Usage for many keys from the reading cache: no query for cached utilities, one for the
+    rest, then one searchsorted per meter over every window of its keys. Utilities in
+    `production` (SOLAR) sum their readings like _production_many; meters follow `mode`.
+    """
+    keys = list(dict.fromkeys(keys))
+    entries = reading_cache.get_many(db, (key[0] for key in keys))
+    by_meter: Dict[SeriesKey, list[UsageKey]] = {}
+    for key in keys:
+        unit = None if key[0] in production or not key[3] else key[3].lower()
+        by_meter.setdefault((key[0], unit), []).append(key)
+
+    out: Dict[UsageKey, Decimal] = {}
+    for (uid, unit), ks in by_meter.items():
+        series = entries[uid].for_unit(unit)
+        starts = np.array([to_epoch_us(k[1]) for k in ks], dtype=np.int64)
+        ends = np.array([to_epoch_us(k[2]) for k in ks], dtype=np.int64)
+        if uid in production:
+            milli = series.sum_between(starts, ends)
+        elif mode == "interpolate":
+            stands = series.stands_at(np.stack([starts, ends], axis=1).ravel())
+            milli = np.maximum(stands[1::2] - stands[0::2], 0)
+        else:
+            milli = series.usage_between(starts, ends)
+        for key, m in zip(ks, milli.tolist()):
+            out[key] = from_milli(m)
+    return out
+
+def _production_many(db: Session, keys: Iterable[UsageKey]) -> Dict[UsageKey, Decimal]:
+    """
+    Production for many (utility_id, start_dt, end_dt, unit) keys of SOLAR utilities in ONE
+    query: their readings are the energy produced per day, so the usage of a window is the
+    sum of the readings inside it (an index range scan per key), not a stand difference.
+    """
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return {}
+
+    p = values(
+        column("k", Integer),
+        column("utility_id", Integer),
+        column("start_dt", DateTime),
+        column("end_dt", DateTime),
+        name="p",
+    ).data([(i, uid, start_dt, end_dt) for i, (uid, start_dt, end_dt, _) in enumerate(keys)])
+
+    produced = (
+        select(func.sum(Reading.value))
+        .where(Reading.utility_id == p.c.utility_id, Reading.timestamp >= p.c.start_dt, Reading.timestamp < p.c.end_dt)
+        .correlate(p)
+        .scalar_subquery()
+    )
+    return {keys[k]: _to_decimal(total or 0) for k, total in db.execute(select(p.c.k, produced))}
+
+def _period_bounds(start: date, end: date) -> tuple[datetime, datetime]:
     start_dt = datetime.combine(start, time.min)
     end_dt   = datetime.combine(end + timedelta(days=1), time.min)  # open interval → include end date
+    return start_dt, end_dt
 
+def _time_usage(start: date, end: date) -> Dict[TariffFrequency, Decimal]:
     days = (end - start).days
-    out: Dict[TariffFrequency, Decimal] = {
+    return {
         "DAY":   _to_decimal(days),
         "MONTH": _to_decimal(days) / Decimal("30"),
         "YEAR":  _to_decimal(days) / Decimal("365"),
@@ -87,30 +290,83 @@ def get_usage_for_period(
         "KWH":   Decimal("0"),
     }
 
-    if for_contract_scope and contract_id is not None:
-        # ✅ Treat NON-GAS as electric
-        elec_ids = [uid for (uid,) in db.query(Utility.id)
-            .filter(Utility.contract_id == contract_id, Utility.type != "GAS")]
-        gas_ids = [uid for (uid,) in db.query(Utility.id)
-            .filter(Utility.contract_id == contract_id, Utility.type == "GAS")]
-
-        if elec_ids:
-            out["KWH"] = sum(
-                (_delta_usage_for_utility(db, uid, start_dt, end_dt, "kWh") for uid in elec_ids),
-                Decimal("0"),
-            )
-        if gas_ids:
-            out["M3"] = sum(
-                (_delta_usage_for_utility(db, uid, start_dt, end_dt, "m3") for uid in gas_ids),
-                Decimal("0"),
-            )
+def get_usage_for_periods(
+    db: Session,
+    periods: Iterable[UsagePeriod],
+    mode: UsageMode | None = None,
+) -> list[Dict[TariffFrequency, Decimal]]:
+    """
+    Batch form of get_usage_for_period: one utility lookup plus one readings query
+    for any number of (contract_id, utility_id, start, end, for_contract_scope) periods
+    (none when the reading cache holds all their utilities).
+    `mode` (default USAGE_MODE) picks how meter stands at the boundaries are read.
 
-    elif utility_id is not None:
-        util = db.get(Utility, utility_id)
-        if util:
-            if util.type in GAS_TYPES:
-                out["M3"]  = _delta_usage_for_utility(db, utility_id, start_dt, end_dt, "m3")
-            else:  # ✅ NORMAL/REDUCED/etc. count as electric
-                out["KWH"] = _delta_usage_for_utility(db, utility_id, start_dt, end_dt, "kWh")
+    KWH comes from ELECTRIC_TYPES meters and M3 from GAS_TYPES meters; a single SOLAR
+    utility counts its production as KWH, a contract does not. Utilities of other types
+    add no usage in either scope, so their KWH / M3 tariffs cost nothing.
+    """
+    mode = mode or USAGE_MODE
+    periods = list(periods)
+    if not periods:
+        return []
 
-    return out
\ No newline at end of file
+    contract_ids = {c for c, u, s, e, scope in periods if scope and c is not None}
+    utility_ids = {u for c, u, s, e, scope in periods if not (scope and c is not None) and u is not None}
+
+    types: dict[int, str | None] = {}
+    by_contract: dict[int, list[tuple[int, str | None]]] = {}
+    if contract_ids or utility_ids:
+        for uid, type_, cid in db.query(Utility.id, Utility.type, Utility.contract_id).filter(
+            or_(Utility.id.in_(utility_ids), Utility.contract_id.in_(contract_ids))
+        ):
+            types[uid] = type_
+            by_contract.setdefault(cid, []).append((uid, type_))
+
+    # per period: (usage key, output bucket) pairs to sum
+    plans: list[list[tuple[UsageKey, str]]] = []
+    for contract_id, utility_id, start, end, for_contract_scope in periods:
+        start_dt, end_dt = _period_bounds(start, end)
+        plan: list[tuple[UsageKey, str]] = []
+        if for_contract_scope and contract_id is not None:
+            for uid, type_ in by_contract.get(contract_id, []):
+                # consumption meters only: SOLAR production and untyped/unknown utilities are skipped
+                if type_ in GAS_TYPES:
+                    plan.append(((uid, start_dt, end_dt, "m3"), "M3"))
+                elif type_ in ELECTRIC_TYPES:
+                    plan.append(((uid, start_dt, end_dt, "kWh"), "KWH"))
+        elif utility_id is not None and utility_id in types:
+            type_ = types[utility_id]
+            if type_ in GAS_TYPES:
+                plan.append(((utility_id, start_dt, end_dt, "m3"), "M3"))
+            elif type_ in ELECTRIC_TYPES or type_ in SOLAR_TYPES:  # SOLAR counts its production
+                plan.append(((utility_id, start_dt, end_dt, "kWh"), "KWH"))
+        plans.append(plan)
+
+    keys = [key for plan in plans for key, _ in plan]
+    if reading_cache.enabled:
+        production = {uid for uid, type_ in types.items() if type_ in SOLAR_TYPES}
+        usage = _cached_usage_many(db, keys, mode, production)
+    else:
+        solar = [key for key in keys if types.get(key[0]) in SOLAR_TYPES]
+        meters = (key for key in keys if types.get(key[0]) not in SOLAR_TYPES)
+        usage = _interpolated_usage_many(db, meters) if mode == "interpolate" else _delta_usage_many(db, meters)
+        usage.update(_production_many(db, solar))
+
+    results = []
+    for (contract_id, utility_id, start, end, for_contract_scope), plan in zip(periods, plans):
+        out = _time_usage(start, end)
+        for key, bucket in plan:
+            out[bucket] += usage[key]
+        results.append(out)
+    return results
+
+def get_usage_for_period(
+    db: Session,
+    contract_id: int | None,
+    utility_id: int | None,
+    start: date,
+    end: date,
+    for_contract_scope: bool,
+    mode: UsageMode | None = None,
+) -> Dict[TariffFrequency, Decimal]:
+    return get_usage_for_periods(db, [(contract_id, utility_id, start, end, for_contract_scope)], mode)[0]
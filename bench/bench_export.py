@@ -0,0 +1,92 @@
+# bench/bench_export.py
+"""
+Pulling every reading of a utility through the JSON listing, the NDJSON stream and the
+Arrow / Parquet export, in rows per second including the client-side decode.
+
+    python -m bench.bench_export [rows]
+
+Needs the POSTGRES_* settings of the app and pyarrow. The app runs in-process under
+TestClient (its lifespan included), so the figures leave out the network but include
+everything the server does per row. The rows go to a scratch utility (2040 onwards)
+and must be committed for the endpoints' own connections to see them; they are deleted
+again at the end. One run per endpoint: at the default million rows the JSON listing
+alone takes a while.
+"""
+from __future__ import annotations
+import io
+import json
+import sys
+import time
+from datetime import date, datetime
+
+import pyarrow.ipc
+import pyarrow.parquet as pq
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, text
+
+from app.db.database import SessionLocal
+from app.db.models.contract import Contract
+from app.db.models.reading import Reading
+from app.db.models.utility import Utility
+from app.main import app
+
+def add_utility(rows: int) -> tuple[int, int]:
+    """(contract id, utility id) of a scratch utility with `rows` hourly readings, committed."""
+    with SessionLocal() as db:
+        contract = Contract(name="bench contract", start_date=date(2040, 1, 1), end_date=date(2999, 12, 31))
+        util = Utility(type="NORMAL", text="bench export", contract=contract)
+        db.add_all([contract, util])
+        db.flush()
+        db.execute(text("""
+            INSERT INTO readings (timestamp, value, unit, source, utility_id)
+            SELECT :start + make_interval(hours => i), i * 0.125, 'kWh', 'bench', :utility_id
+            FROM generate_series(0, :rows - 1) AS i
+        """), {"start": datetime(2040, 1, 1), "utility_id": util.id, "rows": rows})
+        db.commit()
+        return contract.id, util.id
+
+def remove_utility(contract_id: int, utility_id: int) -> None:
+    with SessionLocal() as db:
+        db.execute(delete(Reading).where(Reading.utility_id == utility_id))
+        db.execute(delete(Utility).where(Utility.id == utility_id))
+        db.execute(delete(Contract).where(Contract.id == contract_id))
+        db.commit()
+
+def json_list(client, utility_id):
+    r = client.get(f"/readings/utility/{utility_id}")
+    return len(r.json()), len(r.content)
+
+def ndjson_stream(client, utility_id):
+    n = size = 0
+    with client.stream("GET", "/readings/stream", params={"utility_id": utility_id}) as r:
+        for line in r.iter_lines():
+            if line:
+                json.loads(line)
+                n += 1
+                size += len(line) + 1
+    return n, size
+
+def arrow_export(client, utility_id):
+    r = client.get("/export/readings", params={"utility_id": utility_id, "format": "arrow"})
+    return pyarrow.ipc.open_stream(r.content).read_all().num_rows, len(r.content)
+
+def parquet_export(client, utility_id):
+    r = client.get("/export/readings", params={"utility_id": utility_id, "format": "parquet"})
+    return pq.read_table(io.BytesIO(r.content)).num_rows, len(r.content)
+
+def main(rows: int = 1_000_000) -> None:
+    contract_id, utility_id = add_utility(rows)
+    try:
+        with TestClient(app) as client:
+            for name, fetch in (
+                ("json", json_list), ("ndjson", ndjson_stream), ("arrow", arrow_export), ("parquet", parquet_export),
+            ):
+                t0 = time.perf_counter()
+                n, size = fetch(client, utility_id)
+                took = time.perf_counter() - t0
+                print(f"{name:8} {n:>9} rows  {took:7.2f} s  {n / took:>10,.0f} rows/s  {size / 2**20:8.1f} MiB")
+    finally:
+        remove_utility(contract_id, utility_id)
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:2]))
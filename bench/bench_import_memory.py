@@ -0,0 +1,96 @@
+# bench/bench_import_memory.py
+"""
+Peak memory (RSS) of a meter-reading import: the whole upload decoded into one string
+(what the importer route did before it streamed) against the streaming line reader it
+uses now, at growing file sizes.
+
+    python -m bench.bench_import_memory [rows ...]
+
+Needs the POSTGRES_* settings of the app. The file is a smart-meter style export, one
+row of three stands every 15 minutes from 2040 on. Every run is a fresh process (peak RSS
+only grows) that imports into a scratch contract inside a transaction that is rolled back,
+so the database is left as it was. "base" is the RSS of that process once the app is
+imported and the contract created; "peak" is its maximum RSS over the import. What the
+streaming import still grows with is MeterReadingImporter's history of every utility it
+writes (a ReadingSeries, 16 bytes per stand), not the file.
+"""
+from __future__ import annotations
+import csv
+import io
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+def write_csv(path: str, rows: int, seed: int = 1) -> None:
+    rng = random.Random(seed)
+    ts = datetime(2040, 1, 1)
+    stands = [42039.0, 40723.0, 36653.068]
+    with open(path, "w", newline="") as f:
+        out = csv.writer(f)
+        out.writerow(["id", "consumption_date", "stand_i", "stand_ii", "gas"])
+        for i in range(rows):
+            stands = [s + rng.randrange(0, 400) / 1000 for s in stands]
+            out.writerow([i + 1, ts.isoformat(), f"{stands[0]:.3f}", f"{stands[1]:.3f}", f"{stands[2]:.3f}"])
+            ts += timedelta(minutes=15)
+
+def _rss_mib() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+def run_one(path: str, mode: str) -> None:
+    """Import `path` in this process and print base RSS, peak RSS, seconds and the counts."""
+    from datetime import date
+
+    import app.main  # noqa: F401  (registers every model)
+    from app.db.database import SessionLocal
+    from app.db.models.contract import Contract
+    from app.db.models.utility import Utility
+    from app.services.csv_stream import iter_text_lines
+    from app.services.meter_import import MeterReadingImporter
+
+    with SessionLocal() as db:
+        contract = Contract(name="bench contract", start_date=date(2040, 1, 1), end_date=date(2999, 12, 31))
+        db.add_all([contract] + [Utility(type=t, text=f"bench {t}", contract=contract) for t in ("NORMAL", "REDUCED", "GAS")])
+        db.flush()
+        base = _rss_mib()
+        t0 = time.perf_counter()
+        try:
+            with open(path, "rb") as f:
+                if mode == "whole":
+                    rows = csv.DictReader(io.StringIO(f.read().decode("utf-8")))
+                else:
+                    rows = csv.DictReader(iter_text_lines(f))
+                importer = MeterReadingImporter(db)
+                importer.feed_all(rows)
+            took = time.perf_counter() - t0
+        finally:
+            db.rollback()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+    print(f"{base:.1f} {peak:.1f} {took:.1f} {importer.counts()}")
+
+def main(sizes: tuple[int, ...] = (10_000, 1_000_000, 10_000_000)) -> None:
+    print(f"{'rows':>10} {'file':>9}  mode    {'base':>9} {'peak':>9}  {'time':>7}  counts")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            path = os.path.join(tmp, f"readings-{rows}.csv")
+            write_csv(path, rows)
+            mib = os.path.getsize(path) / 2**20
+            for mode in ("whole", "stream"):
+                out = subprocess.run(
+                    [sys.executable, "-m", "bench.bench_import_memory", "--one", path, mode],
+                    check=True, capture_output=True, text=True,
+                ).stdout.strip().splitlines()[-1]
+                base, peak, took, counts = out.split(" ", 3)
+                print(f"{rows:>10} {mib:5.0f} MiB  {mode:6} {base:>5} MiB {peak:>5} MiB  {took:>5} s  {counts}", flush=True)
+            os.remove(path)
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--one"]:
+        run_one(sys.argv[2], sys.argv[3])
+    else:
+        main(*([tuple(int(a) for a in sys.argv[1:])] if len(sys.argv) > 1 else []))
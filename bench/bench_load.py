@@ -0,0 +1,92 @@
+# bench/bench_load.py
+"""
+Closed-loop load test of the read routes against a running server.
+
+    python -m bench.bench_load URL [URL ...] [--clients 50 200 1000] [--seconds 10] [--path PATH ...]
+
+Every client sends one request, waits for the answer and sends the next, for `--seconds`
+per concurrency level; the paths (default: a mix of the routes ported to async) are taken
+in turn. Prints requests per second, latency percentiles and failures (non-2xx, timeouts,
+refused connections) per URL and level.
+
+To compare sync with async handlers, start the same app from two trees, e.g.
+
+    git worktree add /tmp/sync <commit before the async routes>
+    (cd /tmp/sync && uvicorn app.main:app --port 8001) &
+    uvicorn app.main:app --port 8002 &
+    python -m bench.bench_load http://127.0.0.1:8001 http://127.0.0.1:8002
+
+Run the client on another machine where possible: on the server's host it competes with
+the server for CPU.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import time
+
+import httpx
+
+def default_paths(base_url: str) -> list[str]:
+    utilities = httpx.get(f"{base_url}/utilities/", timeout=30).json()
+    paths = ["/suppliers", "/tariffs", "/readings/page?limit=100"]
+    if utilities:
+        u = utilities[0]["id"]
+        paths += [f"/utilities/{u}/readings", f"/utilities/{u}/cost?start=2024-01-01&end=2024-12-31"]
+    return paths
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+async def run_level(base_url: str, paths: list[str], clients: int, seconds: float) -> tuple[list[float], int]:
+    latencies: list[float] = []
+    failures = 0
+    deadline = time.perf_counter() + seconds
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as http:
+        async def client(i: int) -> None:
+            nonlocal failures
+            n = i
+            while time.perf_counter() < deadline:
+                path = paths[n % len(paths)]
+                n += 1
+                t0 = time.perf_counter()
+                try:
+                    r = await http.get(path)
+                    ok = r.is_success
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - t0)
+                else:
+                    failures += 1
+
+        await asyncio.gather(*(client(i) for i in range(clients)))
+    return latencies, failures
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("urls", nargs="+")
+    parser.add_argument("--clients", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--path", dest="paths", action="append")
+    args = parser.parse_args()
+
+    print(f"{'url':30} {'clients':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'failed':>7}")
+    for url in args.urls:
+        paths = args.paths or default_paths(url)
+        for clients in args.clients:
+            t0 = time.perf_counter()
+            latencies, failures = asyncio.run(run_level(url, paths, clients, args.seconds))
+            took = time.perf_counter() - t0
+            latencies.sort()
+            print(
+                f"{url:30} {clients:>7} {len(latencies) / took:8.1f} "
+                f"{percentile(latencies, 0.50) * 1000:8.1f} {percentile(latencies, 0.95) * 1000:8.1f} "
+                f"{percentile(latencies, 0.99) * 1000:8.1f} {failures:>7}"
+            )
+
+if __name__ == "__main__":
+    main()
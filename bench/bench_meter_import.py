@@ -0,0 +1,129 @@
+# bench/bench_meter_import.py
+"""
+Meter-reading import throughput: the row-by-row loop /import/meter-readings ran before
+MeterReadingImporter (copied below as legacy_import) against the importer, on the same file.
+
+    python -m bench.bench_meter_import [rows]
+
+Needs the POSTGRES_* settings of the app. The file is the smart-meter style export of
+bench.bench_import_memory (three stands every 15 minutes from 2040 on). Each engine imports
+it into a scratch contract of its own inside a transaction that is rolled back, so both
+start from an empty history and the database is left as it was. Both run on the current
+schema, so the legacy loop's per-row lookups already get the (utility_id, timestamp)
+index, which the schema it was written for did not have. The importer's time includes
+the rollup, net energy and cache upkeep it does per chunk.
+"""
+from __future__ import annotations
+import csv
+import os
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+from datetime import time as dtime
+from decimal import Decimal
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+import app.main  # noqa: F401  (registers every model)
+from app.db.database import SessionLocal
+from app.db.models.contract import Contract
+from app.db.models.reading import Reading
+from app.db.models.utility import Utility
+from app.services.csv_stream import iter_text_lines
+from app.services.meter_import import MeterReadingImporter, parse_decimal
+from bench.bench_import_memory import write_csv
+
+# ---------- the importer route before MeterReadingImporter ----------
+
+def _get_contract_for_timestamp(db: Session, ts: datetime) -> Contract | None:
+    return (
+        db.query(Contract)
+        .filter(Contract.start_date <= ts, Contract.end_date >= ts)
+        .order_by(Contract.start_date.desc())
+        .first()
+    )
+
+def _get_utility(db: Session, contract_id: int, type_: str) -> Utility | None:
+    return (
+        db.query(Utility)
+        .filter(Utility.contract_id == contract_id, func.upper(Utility.type) == func.upper(type_))
+        .first()
+    )
+
+def _upsert_reading(db: Session, utility: Utility, ts: datetime, value: Decimal) -> bool:
+    unit = "m3" if utility.type == "GAS" else "kWh"
+    prev = (
+        db.query(Reading)
+        .filter(Reading.utility_id == utility.id, Reading.timestamp < ts)
+        .order_by(Reading.timestamp.desc())
+        .first()
+    )
+    if prev and value < prev.value:
+        return False
+    existing = db.query(Reading).filter(Reading.utility_id == utility.id, Reading.timestamp == ts).first()
+    if existing:
+        existing.value = value
+        existing.unit = unit
+        existing.source = existing.source or "import"
+        db.add(existing)
+        return False
+    db.add(Reading(timestamp=ts, value=value, unit=unit, source="import", utility_id=utility.id))
+    return True
+
+def legacy_import(db: Session, rows) -> dict[str, int]:
+    inserted = updated = skipped = 0
+    for row in rows:
+        raw_ts = row.get("consumption_date", "").strip()
+        ts = datetime.fromisoformat(raw_ts) if "T" in raw_ts else datetime.combine(datetime.fromisoformat(raw_ts).date(), dtime.min)
+        contract = _get_contract_for_timestamp(db, ts)
+        if not contract:
+            skipped += 1
+            continue
+        utilities = {t: _get_utility(db, contract.id, t) for t in ("NORMAL", "REDUCED", "GAS")}
+        for column, type_ in (("stand_i", "REDUCED"), ("stand_ii", "NORMAL"), ("gas", "GAS")):
+            value = parse_decimal(row.get(column))
+            if value is None:
+                continue
+            if utilities[type_] is None:
+                skipped += 1
+                continue
+            ok = _upsert_reading(db, utilities[type_], ts, value)
+            inserted += 1 if ok else 0
+            updated += 0 if ok else 1
+    db.flush()
+    return {"inserted": inserted, "updated": updated, "skipped": skipped}
+
+# ---------- bench ----------
+
+def importer_import(db: Session, rows) -> dict[str, int]:
+    importer = MeterReadingImporter(db)
+    importer.feed_all(rows)
+    return importer.counts()
+
+def run(path: str, engine) -> tuple[float, dict]:
+    with SessionLocal() as db:
+        contract = Contract(name="bench contract", start_date=date(2040, 1, 1), end_date=date(2999, 12, 31))
+        db.add_all([contract] + [Utility(type=t, text=f"bench {t}", contract=contract) for t in ("NORMAL", "REDUCED", "GAS")])
+        db.flush()
+        t0 = time.perf_counter()
+        try:
+            with open(path, "rb") as f:
+                counts = engine(db, csv.DictReader(iter_text_lines(f)))
+            return time.perf_counter() - t0, counts
+        finally:
+            db.rollback()
+
+def main(rows: int = 100_000) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "readings.csv")
+        write_csv(path, rows)
+        new, new_counts = run(path, importer_import)
+        print(f"importer  {rows:>8} rows  {new:8.1f} s  {rows / new:8.0f} rows/s  {new_counts}", flush=True)
+        old, old_counts = run(path, legacy_import)
+        print(f"legacy    {rows:>8} rows  {old:8.1f} s  {rows / old:8.0f} rows/s  {old_counts}")
+        print(f"speed-up  x{old / new:.1f}")
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:2]))
@@ -0,0 +1,80 @@
+# bench/bench_parallel_parse.py
+"""
+Parse-stage scaling of app.services.parallel_parse on a synthetic meter-reading CSV. No
+database is touched, but the POSTGRES_* settings must be set for the app modules to import.
+
+    python -m bench.bench_parallel_parse [rows] [workers ...]
+
+Times the row-by-row DictReader parse the streaming import does, then parse_file with each
+worker count (1 = in process, no pool) plus iter_meter_rows, which rebuilds the rows in the
+importing process. The pool is started and warmed up before its runs, so pool start-up is
+not counted. Prints the best of 3 runs; scaling needs as many CPUs as workers.
+"""
+from __future__ import annotations
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from app.services import parallel_parse
+from app.services.meter_import import STAND_COLUMNS, parse_decimal, parse_timestamp
+
+def write_csv(path: str, rows: int, seed: int = 1, start: datetime = datetime(2018, 10, 29, 7, 30)) -> None:
+    """Rows like reading_seed.csv: one stand per column, a reading every day from `start`."""
+    rng = random.Random(seed)
+    ts = start
+    stands = [42039.0, 40723.0, 36653.068]
+    with open(path, "w", newline="") as f:
+        out = csv.writer(f)
+        out.writerow(["id", "consumption_date", "stand_i", "stand_ii", "gas"])
+        for i in range(rows):
+            stands = [s + rng.randrange(0, 9000) / 1000 for s in stands]
+            out.writerow([i + 1, ts.strftime("%Y-%m-%d %H:%M:%S.%f"), f"{stands[0]:.0f}", f"{stands[1]:.0f}", f"{stands[2]:.3f}"])
+            ts += timedelta(days=1)
+
+def dictreader_parse(path: str) -> int:
+    n = 0
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            parse_timestamp(row["consumption_date"])
+            for column, _ in STAND_COLUMNS:
+                parse_decimal(row.get(column))
+            n += 1
+    return n
+
+def pooled_parse(path: str, workers: int) -> int:
+    n = 0
+    for _ in parallel_parse.iter_meter_rows(parallel_parse.parse_file("meter-readings", path, workers)):
+        n += 1
+    return n
+
+def best_of(fn, *args, runs: int = 3) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def main(rows: int = 1_000_000, workers: tuple[int, ...] = (1, 2, 4, 8)) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "readings.csv")
+        write_csv(path, rows)
+        print(f"{rows} rows, {os.path.getsize(path) / 2**20:.1f} MiB, {os.cpu_count()} CPUs")
+        base = best_of(dictreader_parse, path)
+        print(f"DictReader       {base:7.2f} s")
+        for n in workers:
+            # parse_file sizes its ranges by `workers`; the pool by PARSE_WORKERS
+            parallel_parse.shutdown()
+            parallel_parse.PARSE_WORKERS = n
+            if n > 1:
+                parallel_parse.parse_file("meter-readings", path, n)  # start and warm up the pool
+            took = best_of(pooled_parse, path, n)
+            print(f"parse_file x{n:<3}  {took:7.2f} s  x{base / took:.2f}")
+        parallel_parse.shutdown()
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:2]), *([tuple(int(a) for a in sys.argv[2:])] if len(sys.argv) > 2 else []))
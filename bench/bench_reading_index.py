@@ -0,0 +1,117 @@
+# bench/bench_reading_index.py
+"""
+Latency of the hot reading queries with and without ux_readings_utility_timestamp, at
+growing sizes of the readings table.
+
+    python -m bench.bench_reading_index [rows ...]
+
+Needs the POSTGRES_* settings of the app. Everything runs in one transaction that is
+rolled back: the rows go to scratch utilities (2040 onwards), and the index is dropped
+inside the transaction for the "no index" timings, which holds an exclusive lock on
+readings until the run ends, so do not point this at a database that is in use.
+
+Per size it times (best of 5, milliseconds):
+  page      one keyset page (1000 rows) of a utility, as GET /readings/page serves it
+  usage     a year of monthly usage for one utility in one _delta_usage_many query
+  before    the latest reading before a moment (the importer and cost cache probe)
+  upsert    a 1000-row INSERT ... ON CONFLICT DO UPDATE chunk, as the meter importer writes it
+            (needs the unique index, so only timed with it)
+"""
+from __future__ import annotations
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+import app.main  # noqa: F401  (registers every model)
+from app.crud.reading import _readings_select
+from app.db.database import SessionLocal
+from app.db.models.contract import Contract
+from app.db.models.reading import Reading
+from app.db.models.utility import Utility
+from app.services.usage_calculator import _delta_usage_many
+
+UTILITIES = 20
+START = datetime(2040, 1, 1, 0, 17)
+
+def best_of(n: int, fn) -> float:
+    best = float("inf")
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+def add_rows(db, utility_ids: list[int], first: int, last: int) -> None:
+    # readings first..last-1 of every utility, one an hour from START
+    db.execute(text("""
+        INSERT INTO readings (timestamp, value, unit, source, utility_id)
+        SELECT :start + make_interval(hours => i), i * 0.125, 'kWh', 'bench', u
+        FROM unnest(CAST(:utility_ids AS int[])) AS u, generate_series(:first, :last - 1) AS i
+    """), {"start": START, "utility_ids": utility_ids, "first": first, "last": last})
+    db.execute(text("ANALYZE readings"))
+
+def queries(db, utility_id: int, per_utility: int) -> dict:
+    middle = START + timedelta(hours=per_utility // 2, minutes=30)
+    year = middle.year
+    months = [datetime(year, m, 1, 6) for m in range(1, 13)] + [datetime(year + 1, 1, 1, 6)]
+    keys = [(utility_id, a, b, "kWh") for a, b in zip(months, months[1:])]
+    page = _readings_select(utility_id, start=middle).limit(1000)
+    before = select(func.max(Reading.timestamp)).where(Reading.utility_id == utility_id, Reading.timestamp < middle)
+    return {
+        "page": lambda: db.execute(page).all(),
+        "usage": lambda: _delta_usage_many(db, keys),
+        "before": lambda: db.execute(before).scalar(),
+    }
+
+def upsert(db, utility_id: int, per_utility: int):
+    # updates (up to) 1000 existing rows in the middle of the utility's history
+    n = min(1000, per_utility)
+    first = START + timedelta(hours=(per_utility - n) // 2)
+    rows = [
+        {"timestamp": first + timedelta(hours=i), "value": Decimal(i), "unit": "kWh", "source": "import", "utility_id": utility_id}
+        for i in range(n)
+    ]
+
+    def run():
+        stmt = pg_insert(Reading)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[Reading.utility_id, Reading.timestamp],
+            set_={"value": stmt.excluded.value, "unit": stmt.excluded.unit},
+        ), rows)
+    return run
+
+def main(sizes: tuple[int, ...] = (1_000_000, 10_000_000, 50_000_000)) -> None:
+    print(f"{'rows':>10}  {'page':>8}  {'usage':>8}  {'before':>8}  {'upsert':>8}   (ms, with the index)", flush=True)
+    with SessionLocal() as db:
+        try:
+            contract = Contract(name="bench contract", start_date=date(2040, 1, 1), end_date=date(2999, 12, 31))
+            utils = [Utility(type="NORMAL", text=f"bench {i}", contract=contract) for i in range(UTILITIES)]
+            db.add_all([contract, *utils])
+            db.flush()
+            utility_ids = [u.id for u in utils]
+            probe = utility_ids[UTILITIES // 2]
+
+            done = 0
+            for size in sorted(sizes):
+                per_utility = size // UTILITIES
+                add_rows(db, utility_ids, done, per_utility)
+                done = per_utility
+                total = db.execute(select(func.count()).select_from(Reading)).scalar()
+                t = {name: best_of(5, fn) for name, fn in queries(db, probe, per_utility).items()}
+                t["upsert"] = best_of(5, upsert(db, probe, per_utility))
+                print(f"{total:>10}  {t['page']:8.2f}  {t['usage']:8.2f}  {t['before']:8.2f}  {t['upsert']:8.2f}", flush=True)
+
+            # the largest size again without the index; these scans take minutes, so best of 3
+            db.execute(text("DROP INDEX ux_readings_utility_timestamp"))
+            db.execute(text("ANALYZE readings"))
+            t = {name: best_of(3, fn) for name, fn in queries(db, probe, done).items()}
+            print(f"{total:>10}  {t['page']:8.2f}  {t['usage']:8.2f}  {t['before']:8.2f}  {'-':>8}   (ms, index dropped)")
+        finally:
+            db.rollback()
+
+if __name__ == "__main__":
+    main(*([tuple(int(a) for a in sys.argv[1:])] if len(sys.argv) > 1 else []))
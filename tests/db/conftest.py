@@ -0,0 +1,131 @@
+# tests/db/conftest.py
+import os
+import random
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+import psycopg2
+import pytest
+from psycopg2 import sql
+from sqlalchemy import event
+
+def _recreate_database(name: str) -> None:
+    conn = psycopg2.connect(
+        dbname="postgres",
+        user=os.environ["POSTGRES_USER"],
+        password=os.environ["POSTGRES_PASSWORD"],
+        host=os.environ["POSTGRES_HOST"],
+        port=os.getenv("POSTGRES_PORT", "5432"),
+    )
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL("DROP DATABASE IF EXISTS {} WITH (FORCE)").format(sql.Identifier(name)))
+        cur.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(name)))
+    conn.close()
+
+@pytest.fixture(scope="session")
+def client():
+    """The app on a fresh database: migrations and seed data from its lifespan."""
+    _recreate_database(os.environ["POSTGRES_DB"])
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as c:
+        yield c
+
+@pytest.fixture(scope="session")
+def tariffed(client):
+    """
+    A contract for 2024 with a NORMAL and a GAS utility, a reading per utility at an odd
+    time of every day, and tariffs of every frequency and sort on both scopes. Returns
+    {"contract": id, "electric": id, "gas": id}.
+    """
+    from app.db.database import SessionLocal
+    from app.db.models.contract import Contract
+    from app.db.models.reading import Reading
+    from app.db.models.tariff import Tariff
+    from app.db.models.utility import Utility
+    from app.services.net_energy import refresh_net_energy
+    from app.services.reading_rollup import refresh_daily_rollup
+
+    rng = random.Random(11)
+    with SessionLocal() as db:
+        contract = Contract(name="test contract", start_date=date(2024, 1, 1), end_date=date(2024, 12, 31))
+        electric = Utility(type="NORMAL", text="test electric", contract=contract)
+        gas = Utility(type="GAS", text="test gas", contract=contract)
+        db.add_all([contract, electric, gas])
+        db.flush()
+
+        spans = {}
+        for util, unit, step in ((electric, "kWh", 9000), (gas, "m3", 3000)):
+            stand = 1000 * 1000
+            day = date(2023, 12, 1)
+            while day <= date(2025, 1, 31):
+                ts = datetime.combine(day, time(rng.randrange(24), rng.randrange(60)))
+                stand += rng.randrange(step)
+                db.add(Reading(timestamp=ts, value=Decimal(stand).scaleb(-3), unit=unit, source="test", utility_id=util.id))
+                day += timedelta(days=1)
+            spans[util.id] = (datetime(2023, 12, 1), datetime(2025, 2, 1))
+
+        def tariff(description, amount, sort, frequency, start, end, **scope):
+            return Tariff(
+                description=description, amount=Decimal(amount), tariff_sort=sort, frequency=frequency,
+                start_date=start, end_date=end, is_active=True, **scope,
+            )
+
+        h1, h2 = (date(2024, 1, 1), date(2024, 6, 30)), (date(2024, 7, 1), date(2024, 12, 31))
+        db.add_all([
+            tariff("power h1", "0.2513", "SINGLE", "KWH", *h1, utility_id=electric.id),
+            tariff("power h2", "0.2871", "SINGLE", "KWH", *h2, utility_id=electric.id),
+            tariff("standing", "0.4167", "FIXED", "DAY", *h1, utility_id=electric.id),
+            tariff("standing", "0.4333", "FIXED", "DAY", *h2, utility_id=electric.id),
+            tariff("meter rent", "2.9900", "NETWORK", "MONTH", date(2024, 1, 1), date(2024, 12, 31), utility_id=electric.id),
+            tariff("grid", "215.0000", "NETWORK", "YEAR", date(2024, 1, 1), date(2024, 12, 31), utility_id=electric.id),
+            tariff("gas", "1.3377", "SINGLE", "M3", date(2024, 1, 1), date(2024, 12, 31), utility_id=gas.id),
+            tariff("gas standing", "7.1000", "FIXED", "MONTH", date(2024, 1, 1), date(2024, 12, 31), utility_id=gas.id),
+            tariff("energy tax", "0.1088", "TAX", "KWH", date(2024, 1, 1), date(2024, 12, 31), contract_id=contract.id),
+            tariff("gas tax", "0.5710", "TAX", "M3", date(2024, 1, 1), date(2024, 12, 31), contract_id=contract.id),
+            tariff("tax credit", "-1.6400", "TAX", "DAY", date(2024, 1, 1), date(2024, 12, 31), contract_id=contract.id),
+            tariff("loyalty", "-3.5000", "PERCENTAGE", "MONTH", date(2024, 3, 1), date(2024, 12, 31), contract_id=contract.id),
+        ])
+        db.flush()
+        refresh_daily_rollup(db, spans)
+        refresh_net_energy(db, spans)
+        db.commit()
+        return {"contract": contract.id, "electric": electric.id, "gas": gas.id}
+
+@pytest.fixture
+def cold_caches():
+    """Empty cost and reading caches, restored to empty afterwards."""
+    from app.services.cost_cache import cost_cache
+    from app.services.reading_cache import reading_cache
+
+    cost_cache.clear()
+    reading_cache.clear()
+    yield
+    cost_cache.clear()
+    reading_cache.clear()
+
+@contextmanager
+def _recording_statements():
+    from app.db.database import async_engine, engine
+
+    statements: list[str] = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engines = (engine, async_engine.sync_engine)
+    for e in engines:
+        event.listen(e, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        for e in engines:
+            event.remove(e, "before_cursor_execute", record)
+
+@pytest.fixture
+def count_statements():
+    """Context manager collecting every SQL statement the sync and async engines send inside it."""
+    return _recording_statements
@@ -0,0 +1,53 @@
+# /contracts/{id}/cost against per-utility costs and the contract tariffs applied one by one
+from datetime import date, timedelta
+from decimal import Decimal
+
+from app.services.reading_cache import reading_cache
+from app.services.tariff_index import tariff_indexes
+
+FIELDS = ("gas", "stand_i", "stand_ii", "single", "fixed", "variable", "tax", "network", "discount", "total")
+PERIOD = {"start": "2024-01-01", "end": "2024-12-31"}
+
+def _contract_cost(client, contract_id: int) -> dict:
+    r = client.get(f"/contracts/{contract_id}/cost", params=PERIOD)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+def test_per_utility_costs_equal_the_utility_endpoint(client, tariffed, cold_caches):
+    body = _contract_cost(client, tariffed["contract"])
+    assert {u["utility_id"] for u in body["utilities"]} == {tariffed["electric"], tariffed["gas"]}
+    for u in body["utilities"]:
+        own = client.get(f"/utilities/{u['utility_id']}/cost", params={**PERIOD, "include_contract": "false"}).json()
+        assert u["cost"] == own
+
+def test_combined_is_the_utilities_plus_each_contract_tariff_once(client, tariffed, cold_caches):
+    from app.db.database import SessionLocal
+    from app.db.models.tariff import Tariff
+    from app.services.tariff_calculators import Cost, TariffCalculatorFactory
+    from app.services.usage_calculator import get_usage_for_period
+
+    body = _contract_cost(client, tariffed["contract"])
+    expected = Cost()
+    for u in body["utilities"]:
+        for field in FIELDS[:-1]:
+            setattr(expected, field, getattr(expected, field) + Decimal(u["cost"][field]))
+
+    start, end = date(2024, 1, 1), date(2024, 12, 31)
+    with SessionLocal() as db:
+        for t in db.query(Tariff).filter(Tariff.contract_id == tariffed["contract"], Tariff.is_active == True).order_by(Tariff.id):
+            p_start = max(start, t.start_date) if t.start_date else start
+            p_end = min(end, t.end_date + timedelta(days=1)) if t.end_date else end
+            if p_start < p_end:
+                usage = get_usage_for_period(db, tariffed["contract"], None, p_start, p_end, True)
+                TariffCalculatorFactory.get_calculator(t.tariff_sort).calculate(t, expected, usage, p_start, p_end)
+
+    for field in FIELDS:
+        assert abs(Decimal(body["combined"][field]) - getattr(expected, field)) < Decimal("1e-12"), field
+
+def test_one_usage_and_one_tariff_query_for_the_whole_contract(client, tariffed, cold_caches, count_statements, monkeypatch):
+    monkeypatch.setattr(reading_cache, "budget_bytes", 0)  # usage straight from Postgres
+    tariff_indexes.clear()
+    with count_statements() as statements:
+        _contract_cost(client, tariffed["contract"])
+    assert len([s for s in statements if "FROM readings" in s or "FROM reading_daily" in s]) == 1
+    assert len([s for s in statements if "FROM tariffs" in s]) == 1
@@ -0,0 +1,53 @@
+# cost cells cut by split_period add up to the cost of the whole range
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from app.services.cost_calculator import split_period
+
+FIELDS = ("gas", "stand_i", "stand_ii", "single", "fixed", "variable", "tax", "network", "discount")
+
+def test_split_period_buckets_share_boundaries():
+    assert split_period(date(2024, 2, 15), date(2024, 5, 10), "month") == [
+        (date(2024, 2, 15), date(2024, 3, 1)),
+        (date(2024, 3, 1), date(2024, 4, 1)),
+        (date(2024, 4, 1), date(2024, 5, 1)),
+        (date(2024, 5, 1), date(2024, 5, 10)),
+    ]
+    assert split_period(date(2024, 2, 15), date(2025, 1, 10), "quarter")[1:3] == [
+        (date(2024, 4, 1), date(2024, 7, 1)),
+        (date(2024, 7, 1), date(2024, 10, 1)),
+    ]
+
+@pytest.mark.parametrize("bucket", ["month", "quarter"])
+@pytest.mark.parametrize("utility", ["electric", "gas"])
+def test_bucket_cells_add_up_to_the_aggregate(client, tariffed, cold_caches, bucket, utility):
+    uid = tariffed[utility]
+    # from March on the contract PERCENTAGE covers every cell; the KWH price changes on July 1
+    start, end = "2024-03-10", "2024-11-20"
+    cells = client.post("/utilities/cost/batch", json={
+        "utility_ids": [uid], "start": start, "end": end, "bucket": bucket,
+    }).json()["cells"]
+    whole = client.get(f"/utilities/{uid}/cost", params={"start": start, "end": end}).json()
+
+    assert len(cells) > 1
+    for field in FIELDS:
+        summed = sum(Decimal(c["cost"][field]) for c in cells)
+        # per-cell MONTH/YEAR fractions are rounded to 28 digits; anything visible must match
+        assert abs(summed - Decimal(whole[field])) < Decimal("1e-12"), field
+
+    # the metered part (KWH / M3 specification lines) adds up exactly
+    def used(spec):
+        return sum(Decimal(s["amount_used"]) for s in spec if s["frequency"] in ("KWH", "M3"))
+    assert sum(used(c["cost"]["specification"]) for c in cells) == used(whole["specification"])
+
+def test_cells_of_a_repeated_batch_come_from_the_cache(client, tariffed, cold_caches):
+    body = {"utility_ids": [tariffed["electric"]], "start": "2024-01-01", "end": "2024-07-01", "bucket": "month"}
+    first = client.post("/utilities/cost/batch", json=body).json()
+    assert client.post("/utilities/cost/batch", json=body).json() == first
+    # an open-ended cell is not served for the same explicit period
+    jan = client.post("/utilities/cost/batch", json={
+        "utility_ids": [tariffed["electric"]], "periods": [{"start": "2024-01-01", "end": "2024-02-01"}],
+    }).json()["cells"][0]
+    assert jan["cost"] != first["cells"][0]["cost"]
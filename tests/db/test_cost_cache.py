@@ -0,0 +1,30 @@
+from datetime import date
+
+from app.services.cost_cache import CostCache, LRUBackend
+from app.services.tariff_calculators import Cost
+
+def _cache(**kw) -> CostCache:
+    return CostCache(LRUBackend(**kw))
+
+def test_a_reading_drops_the_windows_ending_on_its_day():
+    cache = _cache()
+    for end in (date(2024, 3, 9), date(2024, 3, 10), date(2024, 3, 11)):
+        cache.put((1, date(2024, 3, 1), end, False, False), Cost(), None, cache.generation())
+
+    cache.invalidate_readings([(1, None, date(2024, 3, 10))])
+    assert cache.get((1, date(2024, 3, 1), date(2024, 3, 9), False, False)) is not None
+    assert cache.get((1, date(2024, 3, 1), date(2024, 3, 10), False, False)) is None
+    assert cache.get((1, date(2024, 3, 1), date(2024, 3, 11), False, False)) is None
+
+def test_in_process_entries_expire(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("app.services.cost_cache.time.monotonic", lambda: clock[0])
+    cache = _cache(ttl_s=60)
+    key = (1, date(2024, 1, 1), date(2024, 2, 1), True, False)
+    cache.put(key, Cost(), 7, cache.generation())
+
+    clock[0] += 59
+    assert cache.get(key) is not None
+    clock[0] += 1
+    assert cache.get(key) is None
+    assert cache.backend.size() == 0
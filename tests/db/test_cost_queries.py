@@ -0,0 +1,32 @@
+# statements per /utilities/{id}/cost request: fixed, whatever the number of tariffs and periods
+from app.services.reading_cache import reading_cache
+
+PERIOD = {"start": "2024-01-01", "end": "2024-12-31"}
+
+def _usage_statements(statements: list[str]) -> list[str]:
+    return [s for s in statements if "FROM readings" in s or "FROM reading_daily" in s]
+
+def test_cost_request_runs_one_usage_query(client, tariffed, cold_caches, count_statements, monkeypatch):
+    monkeypatch.setattr(reading_cache, "budget_bytes", 0)  # usage straight from Postgres
+    with count_statements() as statements:
+        r = client.get(f"/utilities/{tariffed['electric']}/cost", params=PERIOD)
+    assert r.status_code == 200
+    # 10 clipped tariff periods (own + contract), all resolved by one usage statement
+    assert len(r.json()["specification"]) == 10
+    assert len(_usage_statements(statements)) == 1
+
+def test_statement_count_does_not_grow_with_tariffs(client, tariffed, cold_caches, count_statements):
+    counts = {}
+    for utility, params in (
+        ("gas", {"start": "2024-05-01", "end": "2024-05-31", "include_contract": "false"}),
+        ("electric", PERIOD),
+    ):
+        client.get(f"/utilities/{tariffed[utility]}/cost", params=params)  # warm the tariff index
+        with count_statements() as statements:
+            r = client.get(f"/utilities/{tariffed[utility]}/cost", params={**params, "end": "2030-12-31"})
+        assert r.status_code == 200
+        counts[utility] = (len(r.json()["specification"]), len(statements))
+
+    (few_tariffs, few_statements), (many_tariffs, many_statements) = counts["gas"], counts["electric"]
+    assert many_tariffs > few_tariffs
+    assert many_statements == few_statements
@@ -0,0 +1,51 @@
+# the per-step timeline adds up to the aggregate cost, and its usage to the meter deltas
+from datetime import datetime
+from decimal import Decimal
+from itertools import accumulate
+
+import pytest
+from sqlalchemy import select
+
+FIELDS = ("gas", "stand_i", "stand_ii", "single", "fixed", "variable", "tax", "network", "discount")
+RANGES = {
+    # the KWH price and the standing charge change on July 1, the contract PERCENTAGE starts on March 1
+    "day": ("2024-01-01", "2024-12-31"),
+    "hour": ("2024-06-20", "2024-07-10"),
+}
+
+def _timeline(client, utility_id: int, resolution: str) -> list[dict]:
+    start, end = RANGES[resolution]
+    r = client.get(f"/utilities/{utility_id}/cost/timeline", params={"start": start, "end": end, "resolution": resolution})
+    assert r.status_code == 200, r.text
+    return r.json()["points"]
+
+@pytest.mark.parametrize("resolution", ["day", "hour"])
+@pytest.mark.parametrize("utility", ["electric", "gas"])
+def test_the_steps_add_up_to_the_aggregate(client, tariffed, cold_caches, utility, resolution):
+    uid = tariffed[utility]
+    points = _timeline(client, uid, resolution)
+    start, end = RANGES[resolution]
+    whole = client.get(f"/utilities/{uid}/cost", params={"start": start, "end": end}).json()
+
+    assert len(points) == (datetime.fromisoformat(end) - datetime.fromisoformat(start)).days * (24 if resolution == "hour" else 1)
+    for field in FIELDS:
+        summed = sum(Decimal(p[field]) for p in points)
+        assert abs(summed - Decimal(whole[field])) < Decimal("1e-12"), field
+    assert round(sum(Decimal(p["total"]) for p in points), 2) == Decimal(whole["total"])
+
+@pytest.mark.parametrize("resolution", ["day", "hour"])
+def test_cumulative_usage_equals_the_recomputed_meter_delta(client, tariffed, cold_caches, resolution):
+    from app.db.database import SessionLocal
+    from app.db.models.reading import Reading
+
+    uid = tariffed["electric"]
+    points = _timeline(client, uid, resolution)
+    with SessionLocal() as db:
+        readings = db.execute(select(Reading.timestamp, Reading.value).where(Reading.utility_id == uid).order_by(Reading.timestamp)).all()
+
+    def stand_before(ts: datetime) -> Decimal:
+        return [v for t, v in readings if t < ts][-1]
+
+    first = stand_before(datetime.fromisoformat(points[0]["start"]))
+    for point, used in zip(points, accumulate(Decimal(p["usage"]) for p in points)):
+        assert used == stand_before(datetime.fromisoformat(point["end"])) - first, point["end"]
@@ -0,0 +1,31 @@
+from datetime import date
+
+import pytest
+
+@pytest.fixture(scope="module")
+def utility_id(client):
+    from app.db.database import SessionLocal
+    from app.db.models.contract import Contract
+    from app.db.models.utility import Utility
+
+    with SessionLocal() as db:
+        contract = Contract(name="create reading contract", start_date=date(2034, 1, 1), end_date=date(2034, 12, 31))
+        util = Utility(type="NORMAL", text="create reading", contract=contract)
+        db.add_all([contract, util])
+        db.commit()
+        return util.id
+
+def _post(client, utility_id: int):
+    return client.post("/readings/", json={
+        "timestamp": "2034-02-01T08:00:00", "value": "12.5", "unit": "kWh", "source": "test", "utility_id": utility_id,
+    })
+
+def test_a_second_reading_at_the_same_timestamp_conflicts(client, utility_id):
+    assert _post(client, utility_id).status_code == 200
+    response = _post(client, utility_id)
+    assert response.status_code == 409
+
+def test_a_reading_for_an_unknown_utility_is_not_found(client):
+    response = _post(client, 10**9)
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Utility not found"
@@ -0,0 +1,82 @@
+# the import ledger skips content it has seen, whatever was imported in between
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+@pytest.fixture(scope="module")
+def solar_utility(client):
+    from app.db.database import SessionLocal
+    from app.db.models.contract import Contract
+    from app.db.models.utility import Utility
+
+    with SessionLocal() as db:
+        contract = Contract(name="ledger contract", start_date=date(2031, 1, 1), end_date=date(2031, 12, 31))
+        db.add_all([contract, Utility(type="SOLAR", text="ledger solar", contract=contract)])
+        db.commit()
+
+def _upload(client, energy: str, force: bool = False) -> dict:
+    csv = f"id,production_date,panel_serial_nbr,energy_produced\n1,2031-06-01,ledger-panel,{energy}\n"
+    response = client.post(
+        "/import/solar-readings", params={"force": force}, files={"file": ("panels.csv", csv.encode(), "text/csv")},
+    )
+    assert response.status_code == 200
+    return response.json()
+
+def _stored() -> Decimal:
+    from app.db.database import SessionLocal
+    from app.db.models.solar import SolarReading
+
+    with SessionLocal() as db:
+        return db.query(SolarReading.energy_produced).filter(SolarReading.panel_serial_nbr == "ledger-panel").scalar()
+
+def test_an_older_file_imported_again_is_skipped_unless_forced(client, solar_utility):
+    assert _upload(client, "1.5")["solar_rows"] == 1
+    assert _upload(client, "2.5")["solar_rows"] == 1
+    assert _stored() == Decimal("2.5")
+
+    # the first file is known to the ledger: skipped, the newer values stay
+    assert _upload(client, "1.5")["unchanged"] == 1
+    assert _stored() == Decimal("2.5")
+
+    assert _upload(client, "1.5", force=True)["solar_rows"] == 1
+    assert _stored() == Decimal("1.5")
+
+def _add_contract(name: str, year: int, utility_type: str) -> None:
+    from app.db.database import SessionLocal
+    from app.db.models.contract import Contract
+    from app.db.models.utility import Utility
+
+    with SessionLocal() as db:
+        contract = Contract(name=name, start_date=date(year, 1, 1), end_date=date(year, 12, 31))
+        db.add_all([contract, Utility(type=utility_type, text=name, contract=contract)])
+        db.commit()
+
+def _post(client, kind: str, csv: str) -> dict:
+    response = client.post(f"/import/{kind}", files={"file": ("upload.csv", csv.encode(), "text/csv")})
+    assert response.status_code == 200
+    return response.json()
+
+def test_a_solar_file_with_skipped_rows_is_read_again(client, solar_utility):
+    csv = (
+        "id,production_date,panel_serial_nbr,energy_produced\n"
+        "1,2031-06-02,ledger-panel,3.5\n"
+        "2,2032-06-02,ledger-panel,4.5\n"  # no SOLAR utility for 2032 yet
+    )
+    first = _post(client, "solar-readings", csv)
+    assert (first["solar_rows"], first["skipped"]) == (1, 1)
+
+    _add_contract("ledger contract 2032", 2032, "SOLAR")
+    again = _post(client, "solar-readings", csv)
+    # the 2031 chunk is known; the 2032 row is imported now
+    assert (again["solar_rows"], again["unchanged"], again["skipped"]) == (1, 1, 0)
+
+    assert _post(client, "solar-readings", csv)["unchanged"] == 2
+
+def test_a_meter_file_with_skipped_rows_is_read_again(client):
+    csv = "id,consumption_date,stand_i,stand_ii,gas\n1,2033-03-01T08:00:00,,1234.5,\n"
+    assert _post(client, "meter-readings", csv) == {"inserted": 0, "updated": 0, "skipped": 1, "unchanged": 0}
+
+    _add_contract("ledger contract 2033", 2033, "NORMAL")
+    assert _post(client, "meter-readings", csv) == {"inserted": 1, "updated": 0, "skipped": 0, "unchanged": 0}
+    assert _post(client, "meter-readings", csv) == {"inserted": 0, "updated": 0, "skipped": 0, "unchanged": 1}
@@ -0,0 +1,38 @@
+# a fresh database gets its schema from the frozen baseline plus every migration
+from sqlalchemy import inspect
+
+def test_the_migrations_build_the_models_schema(client):
+    from app.db.database import Base, engine
+    from app.db.migrations import MIGRATIONS
+
+    db = inspect(engine)
+    assert set(Base.metadata.tables) <= set(db.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        assert {c.name for c in table.columns} == {c["name"] for c in db.get_columns(table.name)}, table.name
+        indexes = {i["name"]: i for i in db.get_indexes(table.name)}
+        for index in table.indexes:
+            assert index.name in indexes, index.name
+            assert indexes[index.name]["column_names"] == [c.name for c in index.columns], index.name
+            assert bool(indexes[index.name]["unique"]) == bool(index.unique), index.name
+
+    # replaced by ix_solar_readings_panel_date in 0004
+    assert "ix_solar_readings_panel_serial_nbr" not in {i["name"] for i in db.get_indexes("solar_readings")}
+    with engine.connect() as conn:
+        applied = conn.exec_driver_sql("SELECT version FROM schema_migrations ORDER BY version").scalars().all()
+    assert applied == [version for version, _ in MIGRATIONS]
+
+def test_the_baseline_creates_only_the_pre_migration_tables(client):
+    from app.db.database import engine
+    from app.db.migrations import MIGRATIONS
+
+    baseline = dict(MIGRATIONS)["0001_baseline"]
+    with engine.connect() as conn:
+        conn.exec_driver_sql("CREATE SCHEMA baseline_check")
+        conn.exec_driver_sql("SET LOCAL search_path TO baseline_check")
+        baseline(conn)
+        db = inspect(conn)
+        assert set(db.get_table_names(schema="baseline_check")) == {
+            "solar_readings", "suppliers", "ui_components", "users", "contract", "utilities", "readings", "tariffs",
+        }
+        assert db.get_indexes("readings", schema="baseline_check") == []
+        conn.rollback()
@@ -0,0 +1,88 @@
+# the stored daily balance across a contract switch and a utility type change
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+DETAILS = dict(
+    description="", start_reading=0, end_reading=0, start_reading_reduced=0, end_reading_reduced=0, estimated_use=0,
+)
+
+def _write(db, utility_id: int, stands: dict[date, str]) -> None:
+    from app.db.models.reading import Reading
+    from app.services.net_energy import refresh_net_energy
+    from app.services.reading_rollup import refresh_daily_rollup
+
+    for day, value in stands.items():
+        db.add(Reading(timestamp=datetime(day.year, day.month, day.day, 22), value=Decimal(value), unit="kWh", source="test", utility_id=utility_id))
+    db.flush()
+    spans = {utility_id: (datetime.combine(min(stands), datetime.min.time()), datetime.combine(max(stands), datetime.min.time()))}
+    refresh_daily_rollup(db, spans)
+    refresh_net_energy(db, spans)
+
+@pytest.fixture(scope="module")
+def switch(client):
+    """
+    A NORMAL meter through two contracts of 2037 (the second contract's utility written
+    first) and a SOLAR utility in a contract of its own. Returns {"first", "second", "solar"}
+    contract ids and the second contract's NORMAL utility as "meter".
+    """
+    from app.db.database import SessionLocal
+    from app.db.models.contract import Contract
+    from app.db.models.utility import Utility
+
+    with SessionLocal() as db:
+        first = Contract(name="net first", start_date=date(2037, 1, 1), end_date=date(2037, 6, 30))
+        second = Contract(name="net second", start_date=date(2037, 7, 1), end_date=date(2037, 12, 31))
+        solar = Contract(name="net solar", start_date=date(2037, 1, 1), end_date=date(2037, 12, 31))
+        old = Utility(type="NORMAL", text="net old meter", contract=first, **DETAILS)
+        new = Utility(type="NORMAL", text="net new meter", contract=second, **DETAILS)
+        panels = Utility(type="SOLAR", text="net panels", contract=solar, **DETAILS)
+        db.add_all([first, second, solar, old, new, panels])
+        db.flush()
+        _write(db, new.id, {date(2037, 7, 1): "110", date(2037, 7, 2): "112"})
+        _write(db, old.id, {date(2037, 6, 29): "103", date(2037, 6, 30): "107"})
+        _write(db, panels.id, {date(2037, 7, 1): "5"})
+        db.commit()
+        return {"first": first.id, "second": second.id, "solar": solar.id, "meter": new.id}
+
+def _net(client, start: str, end: str, contract_id: int | None = None) -> dict:
+    params = {"start": start, "end": end} | ({"contract_id": contract_id} if contract_id else {})
+    r = client.get("/energy/net", params=params)
+    assert r.status_code == 200, r.text
+    return {p["day"]: {k: Decimal(v) for k, v in p.items() if k != "day"} for p in r.json()["points"]}
+
+def test_the_first_day_of_a_contract_reads_on_from_the_previous_one(client, switch):
+    second = _net(client, "2037-07-01", "2037-07-02", switch["second"])
+    assert [p["net_import"] for p in second.values()] == [3, 2]
+    first = _net(client, "2037-06-29", "2037-07-01", switch["first"])
+    assert [p["net_import"] for p in first.values()] == [0, 4, 0]
+
+    household = _net(client, "2037-07-01", "2037-07-01")["2037-07-01"]
+    assert household == {
+        "net_import": 3, "production": 5, "consumption": 8, "self_consumption": 5, "grid_import": 3, "export": 0,
+    }
+
+def test_the_stored_days_equal_a_recompute(client, switch):
+    from app.db.database import SessionLocal
+    from app.db.models.energy_net_daily import EnergyNetDaily
+    from app.services.net_energy import compute_net_days
+    from sqlalchemy import select
+
+    with SessionLocal() as db:
+        stored = {
+            (r.contract_id, r.day): (r.net_import, r.production)
+            for r in db.scalars(select(EnergyNetDaily).where(EnergyNetDaily.day.between(date(2037, 1, 1), date(2037, 12, 31))))
+        }
+        recomputed = {(r["contract_id"], r["day"]): (r["net_import"], r["production"]) for r in compute_net_days(db, date(2037, 1, 1), date(2037, 12, 31))}
+    assert stored == recomputed
+    assert stored[(switch["second"], date(2037, 7, 1))] == (3, 0)
+
+def test_a_utility_type_change_refreshes_the_balance(client, switch):
+    r = client.put(f"/utilities/{switch['meter']}", json={"type": "HEAT"})
+    assert r.status_code == 200, r.text
+    assert all(p["net_import"] == 0 for p in _net(client, "2037-07-01", "2037-07-02").values())
+
+    r = client.put(f"/utilities/{switch['meter']}", json={"type": "NORMAL"})
+    assert r.status_code == 200, r.text
+    assert [p["net_import"] for p in _net(client, "2037-07-01", "2037-07-02").values()] == [3, 2]
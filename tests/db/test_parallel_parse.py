@@ -0,0 +1,47 @@
+# the pooled parse stage returns exactly the rows the streaming DictReader parse does
+import csv
+
+import pytest
+
+from app.services import parallel_parse
+from app.services.meter_import import STAND_COLUMNS, parse_decimal, parse_timestamp
+
+RAW_VALUES = ["42039", "36653.068", "-0.50", "00012.3400", "1,234.5", " 7 ", "", "n/a", "1e3", "12.", ".5"]
+
+@pytest.fixture
+def meter_csv(tmp_path):
+    path = tmp_path / "readings.csv"
+    with open(path, "w", newline="") as f:
+        out = csv.writer(f)
+        out.writerow(["id", "consumption_date", "stand_i", "stand_ii", "gas"])
+        for i in range(600):
+            ts = f"2024-01-{1 + (i * 7) % 28:02d} {i % 24:02d}:30:00"  # out of order, repeated timestamps
+            out.writerow([i, ts, *(RAW_VALUES[(i + k) % len(RAW_VALUES)] for k in range(3))])
+    return str(path)
+
+def _expected(path: str) -> list:
+    with open(path, newline="") as f:
+        rows = [
+            (parse_timestamp(row["consumption_date"]), [(t, parse_decimal(row[c])) for c, t in STAND_COLUMNS])
+            for row in csv.DictReader(f)
+        ]
+    return sorted(rows, key=lambda r: r[0])  # stable: equal timestamps keep file order
+
+def _same(a: list, b: list) -> bool:
+    # Decimal == ignores the exponent; compare the text too
+    return [(ts, [(t, str(v)) for t, v in vs]) for ts, vs in a] == [(ts, [(t, str(v)) for t, v in vs]) for ts, vs in b]
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_parse_file_matches_the_row_parser(meter_csv, monkeypatch, workers):
+    monkeypatch.setattr(parallel_parse, "PARSE_WORKERS", workers)
+    parallel_parse.shutdown()
+    try:
+        rows = list(parallel_parse.iter_meter_rows(parallel_parse.parse_file("meter-readings", meter_csv, workers)))
+    finally:
+        parallel_parse.shutdown()
+    assert _same(rows, _expected(meter_csv))
+
+def test_values_beyond_int64_come_back_missing():
+    # the row parser returns them, but no numeric(10, 3) column can store them either
+    assert parallel_parse._encode("9" * 20) == (parallel_parse.MISSING, 0)
+    assert parallel_parse._encode("-" + "9" * 18) == (-int("9" * 18), 0)
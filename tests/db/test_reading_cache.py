@@ -0,0 +1,85 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import insert
+
+from app.db.database import SessionLocal, engine
+from app.db.models.contract import Contract
+from app.db.models.reading import Reading
+from app.db.models.utility import Utility
+from app.services.reading_cache import ReadingCache, mark_stale
+
+START = datetime(2031, 1, 1, 8)
+
+@pytest.fixture
+def utility_id(client):
+    """A utility of its own with readings on three days, committed."""
+    with SessionLocal() as db:
+        contract = Contract(name="reading cache test", start_date=date(2031, 1, 1), end_date=date(2031, 12, 31))
+        util = Utility(type="NORMAL", text="reading cache test", contract=contract)
+        db.add_all([contract, util])
+        db.flush()
+        db.add_all([
+            Reading(timestamp=START + timedelta(days=i), value=Decimal(100 + i), unit="kWh", source="test", utility_id=util.id)
+            for i in range(3)
+        ])
+        db.commit()
+        return util.id
+
+@pytest.fixture
+def cache(monkeypatch):
+    """A fresh cache that the session hooks invalidate, on a clock the test moves."""
+    clock = [1000.0]
+    monkeypatch.setattr("app.services.reading_cache.time.monotonic", lambda: clock[0])
+    cache = ReadingCache(budget_bytes=1 << 20, ttl_s=300)
+    monkeypatch.setattr("app.services.reading_cache.reading_cache", cache)
+    cache.clock = clock
+    return cache
+
+def _write(utility_id: int, day: int, commit: bool) -> None:
+    ts = START + timedelta(days=day)
+    with SessionLocal() as db:
+        db.add(Reading(timestamp=ts, value=Decimal(100 + day), unit="kWh", source="test", utility_id=utility_id))
+        db.flush()
+        mark_stale(db, {utility_id: (ts, ts)})
+        if commit:
+            db.commit()
+        else:
+            db.rollback()
+
+def test_a_write_committed_in_another_session_is_seen(cache, utility_id):
+    with SessionLocal() as reader:
+        assert len(cache.get(reader, utility_id)) == 3
+
+        _write(utility_id, 5, commit=False)
+        assert len(cache.get(reader, utility_id)) == 3
+        assert cache.hits == 1  # a rolled back write marks nothing stale
+
+        _write(utility_id, 5, commit=True)
+        assert [r["value"] for r in cache.get(reader, utility_id).rows(utility_id)] == [100, 101, 102, 105]
+        assert (cache.misses, cache.refreshes) == (1, 1)
+
+def test_writes_the_hooks_never_see_show_up_after_the_ttl(cache, utility_id):
+    def unseen_write(day: int) -> None:
+        # another worker: committed, but nothing marks this process's cache stale
+        with engine.begin() as conn:
+            conn.execute(insert(Reading).values(
+                timestamp=START + timedelta(days=day), value=Decimal(100 + day), unit="kWh", source="test", utility_id=utility_id,
+            ))
+
+    with SessionLocal() as reader:
+        assert len(cache.get(reader, utility_id)) == 3
+        unseen_write(7)
+        cache.clock[0] += 200
+        assert len(cache.get(reader, utility_id)) == 3
+
+        # refreshing this process's own write keeps the entry's load time
+        _write(utility_id, 8, commit=True)
+        assert len(cache.get(reader, utility_id)) == 4
+
+        cache.clock[0] += 100
+        assert len(cache.get(reader, utility_id)) == 5
+        assert cache.expirations == 1
+        assert len(cache.get(reader, utility_id)) == 5
+        assert cache.expirations == 1
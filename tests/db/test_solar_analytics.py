@@ -0,0 +1,127 @@
+# per-panel analytics from the monthly rollup equal direct sums over the imported rows
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from statistics import median
+
+import pytest
+from sqlalchemy import text
+
+FIRST, LAST = date(2021, 1, 10), date(2021, 5, 20)
+PANELS = [f"analytics-{i}" for i in range(6)]
+RANGES = [
+    ("2021-01-15", "2021-04-10"),  # partial months at both edges
+    ("2021-02-01", "2021-04-30"),  # whole months only
+    ("2021-03-05", "2021-03-25"),  # inside one month
+    ("2021-01-01", "2021-12-31"),  # wider than the data
+]
+
+def _production(seed: int) -> dict[tuple[date, str], Decimal]:
+    # a panel now and then has no reading for a day
+    rng = random.Random(seed)
+    data = {}
+    day = FIRST
+    while day <= LAST:
+        for serial in PANELS:
+            if rng.random() < 0.95:
+                data[(day, serial)] = Decimal(rng.randrange(0, 2500)).scaleb(-3)
+        day += timedelta(days=1)
+    return data
+
+def _upload(client, data: dict[tuple[date, str], Decimal]) -> dict:
+    lines = ["production_date,panel_serial_nbr,energy_produced"]
+    lines += [f"{day.isoformat()},{serial},{energy}" for (day, serial), energy in sorted(data.items())]
+    r = client.post("/import/solar-readings", files={"file": ("panels.csv", "\n".join(lines).encode(), "text/csv")})
+    assert r.status_code == 200, r.text
+    return r.json()
+
+@pytest.fixture(scope="module")
+def production(client):
+    from app.db.database import SessionLocal
+    from app.db.models.contract import Contract
+    from app.db.models.utility import Utility
+
+    with SessionLocal() as db:
+        contract = Contract(name="solar analytics", start_date=date(2021, 1, 1), end_date=date(2021, 12, 31))
+        db.add_all([contract, Utility(type="SOLAR", text="solar analytics", contract=contract)])
+        db.commit()
+    data = _production(21)
+    assert _upload(client, data)["skipped"] == 0
+    return data
+
+def _expected_totals(data, start: str, end: str) -> dict[str, tuple[Decimal, int]]:
+    lo, hi = date.fromisoformat(start), date.fromisoformat(end)
+    totals: dict[str, tuple[Decimal, int]] = {}
+    for (day, serial), energy in data.items():
+        if lo <= day <= hi:
+            e, n = totals.get(serial, (Decimal("0"), 0))
+            totals[serial] = (e + energy, n + 1)
+    return totals
+
+def _totals(client, start: str, end: str) -> dict[str, tuple[Decimal, int]]:
+    r = client.get("/solar/panels", params={"start": start, "end": end})
+    assert r.status_code == 200, r.text
+    return {p["panel_serial_nbr"]: (Decimal(p["energy"]), p["days"]) for p in r.json()}
+
+@pytest.mark.parametrize("start,end", RANGES)
+def test_panel_totals_equal_the_rows_in_the_range(client, production, start, end):
+    assert _totals(client, start, end) == _expected_totals(production, start, end)
+
+@pytest.mark.parametrize("start,end", RANGES)
+def test_the_ranking_orders_by_daily_average(client, production, start, end):
+    expected = _expected_totals(production, start, end)
+    order = sorted(expected, key=lambda s: (-expected[s][0] / expected[s][1], s))
+    fleet = median((e / n).quantize(Decimal("0.001")) for e, n in expected.values())
+
+    r = client.get("/solar/panels/ranking", params={"start": start, "end": end, "limit": 4})
+    assert r.status_code == 200, r.text
+    ranked = r.json()
+    assert [p["panel_serial_nbr"] for p in ranked] == order[:4]
+    assert [p["rank"] for p in ranked] == [1, 2, 3, 4]
+    for p in ranked:
+        assert p["relative_to_median"] == pytest.approx(float(Decimal(p["daily_average"]) / fleet))
+
+def test_the_daily_series_is_the_panel_rows(client, production):
+    serial = PANELS[2]
+    r = client.get(f"/solar/panels/{serial}/daily", params={"start": "2021-02-20", "end": "2021-03-10"})
+    assert r.status_code == 200, r.text
+    points = [(date.fromisoformat(p["day"]), Decimal(p["energy"])) for p in r.json()["points"]]
+    expected = sorted(
+        (day, energy) for (day, s), energy in production.items() if s == serial and date(2021, 2, 20) <= day <= date(2021, 3, 10)
+    )
+    assert points == expected
+
+    assert client.get("/solar/panels/no-such-panel/daily", params={"start": "2021-01-01", "end": "2021-12-31"}).status_code == 404
+
+def test_a_reimport_keeps_the_rollup_equal_to_a_full_recompute(client, production):
+    from app.db.database import SessionLocal
+
+    changed = dict(production)
+    for key in list(changed)[::7]:  # every seventh row, spread over every month
+        changed[key] += Decimal("0.250")
+    assert _upload(client, changed)["solar_rows"] > 0
+    production.update(changed)  # later tests see the new values
+
+    for start, end in RANGES:
+        assert _totals(client, start, end) == _expected_totals(changed, start, end)
+
+    with SessionLocal() as db:
+        stored = db.execute(text(
+            "SELECT panel_serial_nbr, month, energy, days FROM solar_panel_monthly ORDER BY 1, 2"
+        )).all()
+        recomputed = db.execute(text(
+            "SELECT panel_serial_nbr, CAST(date_trunc('month', production_date) AS date), sum(energy_produced), count(*)"
+            " FROM solar_readings GROUP BY 1, 2 ORDER BY 1, 2"
+        )).all()
+    assert stored == recomputed
+
+def test_a_panel_range_can_use_the_panel_date_index(client, production):
+    from app.db.database import SessionLocal
+
+    with SessionLocal() as db:
+        db.execute(text("SET LOCAL enable_seqscan = off"))
+        plan = db.execute(text(
+            "EXPLAIN SELECT production_date, energy_produced FROM solar_readings"
+            " WHERE panel_serial_nbr = :serial AND production_date BETWEEN :lo AND :hi ORDER BY production_date"
+        ), {"serial": PANELS[0], "lo": date(2021, 2, 1), "hi": date(2021, 2, 28)}).scalars().all()
+    assert "ix_solar_readings_panel_date" in "\n".join(plan)
@@ -0,0 +1,51 @@
+# tariff writes through every route drop the cached tariff index of their scope
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+PERIOD = {"start": "2019-01-01", "end": "2019-01-11"}  # 10 days
+
+@pytest.fixture(scope="module")
+def scope(client):
+    from app.db.database import SessionLocal
+    from app.db.models.contract import Contract
+    from app.db.models.utility import Utility
+
+    with SessionLocal() as db:
+        contract = Contract(name="tariff writes", start_date=date(2019, 1, 1), end_date=date(2019, 12, 31))
+        util = Utility(type="NORMAL", text="tariff writes", contract=contract)
+        db.add_all([contract, util])
+        db.commit()
+        return {"contract": contract.id, "utility": util.id}
+
+def _total(client, utility_id: int) -> Decimal:
+    r = client.get(f"/utilities/{utility_id}/cost", params=PERIOD)
+    assert r.status_code == 200, r.text
+    return Decimal(r.json()["total"])
+
+def _tariff(description: str, amount: str, sort: str) -> dict:
+    return {
+        "description": description, "amount": amount, "tariff_sort": sort, "frequency": "DAY",
+        "start_date": "2019-01-01", "end_date": "2019-12-31",
+    }
+
+def test_every_tariff_route_refreshes_the_index(client, scope):
+    assert _total(client, scope["utility"]) == 0  # the empty index is cached now
+
+    r = client.post(f"/utilities/{scope['utility']}/tariffs", json=_tariff("standing", "1.0000", "FIXED") | {"utility_id": scope["utility"]})
+    assert r.status_code == 201, r.text
+    tariff_id = r.json()["id"]
+    assert _total(client, scope["utility"]) == 10
+
+    r = client.put(f"/tariffs/{tariff_id}", json={"amount": "2.0000"})
+    assert r.status_code == 200, r.text
+    assert _total(client, scope["utility"]) == 20
+
+    r = client.post(f"/contracts/{scope['contract']}/tariffs", json=_tariff("levy", "0.5000", "TAX") | {"contract_id": scope["contract"]})
+    assert r.status_code == 201, r.text
+    assert _total(client, scope["utility"]) == 25
+
+    r = client.delete(f"/{tariff_id}")
+    assert r.status_code == 204, r.text
+    assert _total(client, scope["utility"]) == 5
@@ -0,0 +1,110 @@
+# USAGE_MODE=interpolate: stands at any boundary, linear between sparse readings, as computed by hand
+from datetime import date, datetime, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from fractions import Fraction
+
+import pytest
+
+from app.services.reading_cache import reading_cache
+
+# weeks apart, at odd hours, two of them a few hours apart around a boundary
+ELECTRIC = [
+    (datetime(2026, 1, 1, 6, 0), Decimal("1000.000")),
+    (datetime(2026, 1, 15, 18, 30), Decimal("1100.000")),
+    (datetime(2026, 3, 2, 12, 0), Decimal("1400.500")),
+    (datetime(2026, 3, 3, 0, 0), Decimal("1401.000")),
+    (datetime(2026, 5, 30, 23, 0), Decimal("2000.125")),
+]
+GAS = [
+    (datetime(2026, 1, 10, 9, 0), Decimal("500.000")),
+    (datetime(2026, 4, 1, 21, 0), Decimal("731.333")),
+]
+
+US = timedelta(microseconds=1)
+
+def _stand(readings, ts: datetime) -> Decimal:
+    # held at the first / last reading outside them, rounded to the thousandth like numeric
+    if ts <= readings[0][0]:
+        return readings[0][1]
+    if ts >= readings[-1][0]:
+        return readings[-1][1]
+    for (t0, v0), (t1, v1) in zip(readings, readings[1:]):
+        if t0 <= ts < t1:
+            exact = Fraction(v0) + Fraction(v1 - v0) * Fraction((ts - t0) // US, (t1 - t0) // US)
+            return (Decimal(exact.numerator) / Decimal(exact.denominator)).quantize(Decimal("0.001"), ROUND_HALF_UP)
+
+def _usage(readings, start: date, end: date) -> Decimal:
+    # [start 00:00, end + 1 day 00:00)
+    lo, hi = datetime.combine(start, datetime.min.time()), datetime.combine(end + timedelta(days=1), datetime.min.time())
+    return max(_stand(readings, hi) - _stand(readings, lo), Decimal("0"))
+
+@pytest.fixture(scope="module")
+def meters(client):
+    from app.db.database import SessionLocal
+    from app.db.models.contract import Contract
+    from app.db.models.reading import Reading
+    from app.db.models.utility import Utility
+
+    with SessionLocal() as db:
+        contract = Contract(name="interpolation", start_date=date(2026, 1, 1), end_date=date(2026, 6, 30))
+        electric = Utility(type="NORMAL", text="interpolation electric", contract=contract)
+        gas = Utility(type="GAS", text="interpolation gas", contract=contract)
+        db.add_all([contract, electric, gas])
+        db.flush()
+        for util, unit, readings in ((electric, "kWh", ELECTRIC), (gas, "m3", GAS)):
+            db.add_all(Reading(timestamp=ts, value=v, unit=unit, source="test", utility_id=util.id) for ts, v in readings)
+        db.commit()
+        return {"contract": contract.id, "electric": electric.id, "gas": gas.id}
+
+@pytest.fixture(params=["cached", "uncached"])
+def cache(request, cold_caches, monkeypatch):
+    if request.param == "uncached":
+        monkeypatch.setattr(reading_cache, "budget_bytes", 0)
+    return request.param
+
+DAYS = [date(2026, 1, 1) + timedelta(days=i) for i in range(181)]
+
+def test_every_day_of_the_half_year_in_one_call(meters, cache, count_statements):
+    from app.db.database import SessionLocal
+    from app.services.usage_calculator import get_usage_for_periods
+
+    periods = [(None, meters["electric"], d, d, False) for d in DAYS]
+    with SessionLocal() as db, count_statements() as statements:
+        usages = get_usage_for_periods(db, periods, mode="interpolate")
+    assert [u["KWH"] for u in usages] == [_usage(ELECTRIC, d, d) for d in DAYS]
+    assert sum(u["KWH"] for u in usages) == ELECTRIC[-1][1] - ELECTRIC[0][1]
+    # the utility lookup and one fetch of the readings (none from a warm cache)
+    assert len([s for s in statements if "FROM readings" in s]) == 1
+    assert len(statements) == 2
+
+@pytest.mark.parametrize("start,end", [
+    (date(2026, 1, 1), date(2026, 1, 31)),   # from before the first reading
+    (date(2026, 1, 16), date(2026, 3, 1)),   # both ends between readings
+    (date(2026, 3, 2), date(2026, 3, 2)),    # the day around the two close readings
+    (date(2026, 2, 14), date(2026, 6, 30)),  # to after the last one
+])
+def test_windows_between_sparse_readings(meters, cache, start, end):
+    from app.db.database import SessionLocal
+    from app.services.usage_calculator import get_usage_for_period
+
+    with SessionLocal() as db:
+        own = get_usage_for_period(db, None, meters["electric"], start, end, False, mode="interpolate")
+        contract = get_usage_for_period(db, meters["contract"], None, start, end, True, mode="interpolate")
+        snapped = get_usage_for_period(db, None, meters["electric"], start, end, False, mode="snap")
+    assert own["KWH"] == _usage(ELECTRIC, start, end)
+    assert (contract["KWH"], contract["M3"]) == (_usage(ELECTRIC, start, end), _usage(GAS, start, end))
+    assert snapped["KWH"] != own["KWH"]  # the boundaries really do fall between readings
+
+def test_the_timeline_steps_are_the_interpolated_stand_differences(client, meters, cold_caches, monkeypatch):
+    from app.services import cost_timeline, usage_calculator
+
+    monkeypatch.setattr(usage_calculator, "USAGE_MODE", "interpolate")
+    monkeypatch.setattr(cost_timeline, "USAGE_MODE", "interpolate")
+    r = client.get(
+        f"/utilities/{meters['electric']}/cost/timeline",
+        params={"start": "2026-01-10", "end": "2026-03-10", "resolution": "day"},
+    )
+    assert r.status_code == 200, r.text
+    for point in r.json()["points"]:
+        lo, hi = datetime.fromisoformat(point["start"]), datetime.fromisoformat(point["end"])
+        assert Decimal(point["usage"]) == _stand(ELECTRIC, hi) - _stand(ELECTRIC, lo), point["start"]
@@ -0,0 +1,52 @@
+# which utilities feed contract-scope KWH/M3 usage
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+@pytest.fixture(scope="module")
+def mixed_contract(client):
+    """A contract with one utility of every kind plus an unknown type, each metering 10 units in January 2024."""
+    from app.db.database import SessionLocal
+    from app.db.models.contract import Contract
+    from app.db.models.reading import Reading
+    from app.db.models.utility import Utility
+    from app.services.net_energy import refresh_net_energy
+    from app.services.reading_rollup import refresh_daily_rollup
+
+    with SessionLocal() as db:
+        contract = Contract(name="mixed contract", start_date=date(2024, 1, 1), end_date=date(2024, 12, 31))
+        utils = {t: Utility(type=t, text=f"mixed {t}", contract=contract) for t in ("NORMAL", "REDUCED", "GAS", "SOLAR", "HEAT")}
+        db.add_all([contract, *utils.values()])
+        db.flush()
+        for t, util in utils.items():
+            unit = "m3" if t == "GAS" else "kWh"
+            for ts, value in ((datetime(2024, 1, 1, 6), "100"), (datetime(2024, 1, 31, 6), "110")):
+                db.add(Reading(timestamp=ts, value=Decimal(value), unit=unit, source="test", utility_id=util.id))
+        db.flush()
+        spans = {u.id: (datetime(2024, 1, 1), datetime(2024, 2, 1)) for u in utils.values()}
+        refresh_daily_rollup(db, spans)
+        refresh_net_energy(db, spans)
+        db.commit()
+        return contract.id, {t: u.id for t, u in utils.items()}
+
+@pytest.mark.parametrize("use_cache", [True, False])
+def test_contract_usage_counts_electric_and_gas_meters_only(mixed_contract, cold_caches, monkeypatch, use_cache):
+    from app.db.database import SessionLocal
+    from app.services.reading_cache import reading_cache
+    from app.services.usage_calculator import get_usage_for_periods
+
+    if not use_cache:
+        monkeypatch.setattr(reading_cache, "budget_bytes", 0)
+    contract_id, ids = mixed_contract
+    with SessionLocal() as db:
+        whole, heat, solar = get_usage_for_periods(db, [
+            (contract_id, None, date(2024, 1, 1), date(2024, 2, 1), True),
+            (None, ids["HEAT"], date(2024, 1, 1), date(2024, 2, 1), False),
+            (None, ids["SOLAR"], date(2024, 1, 1), date(2024, 2, 1), False),
+        ])
+    # NORMAL + REDUCED; SOLAR production and the unknown HEAT meter (metered in kWh) stay out
+    assert whole["KWH"] == Decimal("20")
+    assert whole["M3"] == Decimal("10")
+    assert heat["KWH"] == heat["M3"] == 0
+    assert solar["KWH"] == Decimal("210")  # a production meter sums its values
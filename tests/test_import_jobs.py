@@ -0,0 +1,29 @@
+import io
+import os
+import threading
+
+from app.services.import_jobs import ImportJobRunner
+
+def test_shutdown_removes_the_spool_files_of_queued_jobs(tmp_path, monkeypatch):
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow_run(self, job):
+        started.set()
+        release.wait(5)
+        job.status = "done"
+        os.remove(job.path)
+
+    monkeypatch.setattr(ImportJobRunner, "_run", slow_run)
+    runner = ImportJobRunner(workers=1, spool_dir=str(tmp_path))
+    running = runner.submit("meter-readings", "a.csv", io.BytesIO(b"consumption_date\n"))
+    assert started.wait(5)
+    queued = [runner.submit("meter-readings", f"{i}.csv", io.BytesIO(b"consumption_date\n")) for i in range(3)]
+
+    runner.shutdown()
+    release.set()
+    runner._executor.shutdown(wait=True)
+
+    assert running.status == "done"
+    assert [(j.status, j.error) for j in queued] == [("failed", "cancelled at shutdown")] * 3
+    assert os.listdir(tmp_path) == []
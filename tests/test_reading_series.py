@@ -0,0 +1,38 @@
+import random
+from datetime import datetime, timedelta
+
+from app.services.reading_series import ReadingSeries, to_epoch_us
+
+BASE = datetime(2024, 1, 1)
+
+def _reference_last_before(model: dict[int, int], us: int) -> int | None:
+    earlier = [k for k in model if k < us]
+    return model[max(earlier)] if earlier else None
+
+def test_out_of_order_puts_match_a_sorted_reference(monkeypatch):
+    monkeypatch.setattr(ReadingSeries, "MERGE_EVERY", 50)  # merge several times during the run
+    rng = random.Random(7)
+    series = ReadingSeries()
+    model: dict[int, int] = {}
+    for _ in range(2000):
+        ts = BASE + timedelta(minutes=rng.randrange(5000))
+        milli = rng.randrange(10**6)
+        us = to_epoch_us(ts)
+        assert series.has(ts) == (us in model)
+        series.put(ts, milli)
+        model[us] = milli
+
+        probe = BASE + timedelta(minutes=rng.randrange(-10, 5010), seconds=30)
+        assert series.last_before(probe) == _reference_last_before(model, to_epoch_us(probe))
+
+    series.merge()
+    assert list(series.timestamps) == sorted(model)
+    assert list(series.values) == [model[k] for k in sorted(model)]
+    assert len(series) == len(model)
+
+def test_in_order_puts_append_without_an_overlay():
+    series = ReadingSeries()
+    for i in range(100):
+        series.put(BASE + timedelta(hours=i), i)
+    assert not series._late
+    assert list(series.values) == list(range(100))
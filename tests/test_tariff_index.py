@@ -0,0 +1,40 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from app.services.tariff_index import TariffIndex, TariffSnapshot
+
+BASE = date(2024, 1, 1)
+
+def _clip_period(req_start: date, req_end: date, t_start: date | None, t_end: date | None):
+    # the linear scan compute_utility_cost did before the index
+    eff_start = max(req_start, t_start) if t_start else req_start
+    eff_end = min(req_end, (t_end + timedelta(days=1)) if t_end else req_end)
+    return (eff_start, eff_end) if eff_start < eff_end else None
+
+def _tariffs(rng: random.Random, n: int) -> list[TariffSnapshot]:
+    out = []
+    for i in rng.sample(range(1, 10 * n), n):  # ids out of start order
+        start = BASE + timedelta(days=rng.randrange(-400, 800)) if rng.random() < 0.9 else None
+        end = (start or BASE) + timedelta(days=rng.randrange(-5, 400)) if rng.random() < 0.8 else None
+        out.append(TariffSnapshot(i, f"t{i}", Decimal("0.1"), "SINGLE", "KWH", start, end, None, 1))
+    return out
+
+def test_overlapping_matches_a_scan_of_every_tariff():
+    rng = random.Random(11)
+    for n in (1, 2, 7, 50, 400):
+        tariffs = _tariffs(rng, n)
+        index = TariffIndex(tariffs)
+        for _ in range(200):
+            start = BASE + timedelta(days=rng.randrange(-500, 900))
+            end = start + timedelta(days=rng.randrange(0, 400))
+            expected = []
+            for t in sorted(tariffs, key=lambda t: t.id):
+                clipped = _clip_period(start, end, t.start_date, t.end_date)
+                if clipped:
+                    expected.append((t, *clipped))
+            assert index.overlapping(start, end) == expected
+
+def test_a_tariff_ending_the_day_before_it_starts_never_applies():
+    t = TariffSnapshot(1, "empty", Decimal("1"), "FIXED", "DAY", date(2024, 3, 1), date(2024, 2, 29), None, 1)
+    assert TariffIndex([t]).overlapping(date(2024, 1, 1), date(2025, 1, 1)) == []